@@ -6,11 +6,12 @@ from app.core.base.component import MCPComponent
 from app.core.base.observer import Observable, Observer
 from app.core.base.prompt import MCPPrompt
 from app.core.base.resource import MCPResource
-from app.core.base.tool import MCPTool
+from app.core.base.tool import CPUBoundTool, MCPTool
 
 __all__ = [
     "MCPComponent",
     "MCPTool",
+    "CPUBoundTool",
     "MCPResource",
     "MCPPrompt",
     "Observable",
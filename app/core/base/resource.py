@@ -44,6 +44,7 @@ class MCPResource(MCPComponent, Observable):
         self.description = description
         self.mime_type = mime_type
         self._content: Optional[str] = None
+        self._notify_scheduled = False
 
     @property
     def content(self) -> Optional[str]:
@@ -58,15 +59,35 @@ class MCPResource(MCPComponent, Observable):
     @content.setter
     def content(self, value: str) -> None:
         """
-        Устанавливает содержимое ресурса и уведомляет наблюдателей.
+        Устанавливает содержимое ресурса и уведомляет подписчиков и наблюдателей.
 
         Args:
             value: Новое содержимое ресурса
         """
         import asyncio
 
+        from app.services.subscriptions import resource_subscriptions
+
         self._content = value
-        asyncio.create_task(self.notify_observers(self.uri, self))
+        resource_subscriptions.publish(
+            self.uri,
+            {
+                "uri": self.uri,
+                "name": self.name,
+                "mime_type": self.mime_type,
+                "content": value,
+            },
+        )
+        # Частые изменения объединяются в одно уведомление наблюдателей,
+        # которые получают актуальное состояние ресурса
+        if self._observers and not self._notify_scheduled:
+            self._notify_scheduled = True
+            asyncio.create_task(self._notify_latest())
+
+    async def _notify_latest(self) -> None:
+        """Уведомляет наблюдателей о последнем состоянии ресурса."""
+        self._notify_scheduled = False
+        await self.notify_observers(self.uri, self)
 
     async def initialize(self) -> bool:
         """
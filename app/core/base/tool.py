@@ -2,10 +2,17 @@
 Базовый класс для инструментов MCP.
 """
 
+import asyncio
+import multiprocessing
 from abc import abstractmethod
-from typing import Any, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
 
 from app.core.base.component import MCPComponent
+from app.core.config import settings
+
+# Общий пул процессов для инструментов с вычислениями на CPU
+_process_pool: Optional[ProcessPoolExecutor] = None
 
 
 class MCPTool(MCPComponent):
@@ -15,12 +22,19 @@ class MCPTool(MCPComponent):
     Инструменты предоставляют функциональность, которую можно вызывать
     через MCP API.
 
+    Атрибуты класса max_concurrency, max_queue и timeout переопределяют
+    ограничения исполнителя инструментов (None — значения из настроек).
+
     Attributes:
         name: Имя инструмента
         description: Описание инструмента
         input_schema: JSON Schema для входных параметров
     """
 
+    max_concurrency: Optional[int] = None
+    max_queue: Optional[int] = None
+    timeout: Optional[float] = None
+
     def __init__(self) -> None:
         """Инициализирует инструмент с пустыми атрибутами."""
         self.name: str = ""
@@ -39,3 +53,70 @@ class MCPTool(MCPComponent):
             Dict[str, Any]: Результат выполнения инструмента
         """
         pass
+
+
+class CPUBoundTool(MCPTool):
+    """
+    Базовый класс для инструментов с вычислениями на CPU.
+
+    Метод compute выполняется в общем пуле процессов и не блокирует
+    цикл событий. Он должен быть статическим, а параметры и результат —
+    сериализуемыми pickle. Отмена вызова (например, по таймауту) не
+    прерывает уже начатое вычисление в рабочем процессе.
+    """
+
+    async def execute(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполняет compute в пуле процессов.
+
+        Args:
+            parameters: Параметры для выполнения инструмента
+
+        Returns:
+            Dict[str, Any]: Результат выполнения инструмента
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_process_pool(), type(self).compute, parameters
+        )
+
+    @staticmethod
+    @abstractmethod
+    def compute(parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполняет вычисление в рабочем процессе.
+
+        Args:
+            parameters: Параметры для выполнения инструмента
+
+        Returns:
+            Dict[str, Any]: Результат выполнения инструмента
+        """
+        pass
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Возвращает общий пул процессов инструментов, создавая его при первом вызове.
+
+    Returns:
+        ProcessPoolExecutor: Пул процессов
+    """
+    global _process_pool
+
+    if _process_pool is None:
+        # spawn не наследует потоки и соединения родительского процесса
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.TOOL_PROCESS_WORKERS or None,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Останавливает общий пул процессов инструментов."""
+    global _process_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
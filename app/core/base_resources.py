@@ -5,6 +5,8 @@ from typing import Any, Dict, Optional
 
 import aiofiles
 
+from app.services.subscriptions import resource_subscriptions
+
 from .base_mcp import MCPResource
 
 
@@ -13,7 +15,7 @@ class FileResource(MCPResource):
 
     def __init__(self, name: str, path: str, mime_type: str = "text/plain"):
         uri = f"file://{path}"
-        super().__init__(name, uri, mime_type)
+        super().__init__(uri=uri, name=name, mime_type=mime_type)
         self.path = path
 
     async def read(self) -> Any:
@@ -63,7 +65,7 @@ class MemoryResource(MCPResource):
 
     def __init__(self, name: str, mime_type: str = "application/json"):
         uri = f"memory://{name}"
-        super().__init__(name, uri, mime_type)
+        super().__init__(uri=uri, name=name, mime_type=mime_type)
         self._data: Any = None
         self._last_modified: Optional[datetime] = None
 
@@ -78,6 +80,15 @@ class MemoryResource(MCPResource):
         """Запись данных в память"""
         self._data = data
         self._last_modified = datetime.now()
+        resource_subscriptions.publish(
+            self.uri,
+            {
+                "uri": self.uri,
+                "name": self.name,
+                "mime_type": self.mime_type,
+                "content": data,
+            },
+        )
         await self.log_event("write", {"timestamp": self._last_modified})
 
     async def initialize(self) -> None:
@@ -96,7 +107,7 @@ class APIResource(MCPResource):
 
     def __init__(self, name: str, base_url: str, mime_type: str = "application/json"):
         uri = f"api://{base_url}"
-        super().__init__(name, uri, mime_type)
+        super().__init__(uri=uri, name=name, mime_type=mime_type)
         self.base_url = base_url
         self._headers: Dict[str, str] = {}
 
@@ -1,11 +1,16 @@
+import asyncio
+import logging
 from abc import abstractmethod
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, AsyncGenerator, Dict, List
 
+from app.services.llm_client import llm_client
 from app.utils.prompt_loader import prompt_loader
 
 from .base_mcp import BaseMCPComponent
 
+logger = logging.getLogger(__name__)
+
 
 class BaseSampler(BaseMCPComponent):
     """Базовый класс для сэмплинга"""
@@ -37,9 +42,9 @@ class BaseSampler(BaseMCPComponent):
             # Определяем тип задачи
             task_type = await self.determine_task_type(request.get("messages", []))
 
-            # Получаем системный промпт
-            if task_type in self._system_prompts:
-                request["systemPrompt"] = self._system_prompts[task_type]
+            # Системный промпт задачи, если клиент не передал свой
+            if not request.get("systemPrompt") and task_type in self._system_prompts:
+                request["systemPrompt"] = prompt_loader.format_system_prompt(task_type)
 
             # Добавляем предпочтения модели
             if self._model_preferences:
@@ -65,6 +70,73 @@ class BaseSampler(BaseMCPComponent):
             await self.handle_error(e)
             raise
 
+    @abstractmethod
+    def stream(self, request: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """Потоковая генерация ответа
+
+        Отдает фрагменты ответа по мере генерации: {"text": ...}, последний
+        фрагмент может содержать "stop_reason". Следующий фрагмент
+        запрашивается, только когда клиент принял предыдущий, а закрытие
+        генератора (отключение клиента) должно прерывать генерацию.
+        """
+
+    async def handle_error(self, error: Exception) -> None:
+        """Логирование ошибки и вызов обработчиков ошибок"""
+        logger.error(f"Ошибка сэмплера {self.name}: {str(error)}")
+        for handler in self._error_handlers:
+            handler(error)
+
+    async def subscribe(self, event_type: str) -> AsyncGenerator:
+        """Подписка на события сэмплера (например, log)"""
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def receive() -> AsyncGenerator:
+            while True:
+                queue.put_nowait((yield))
+
+        receiver = receive()
+        await receiver.asend(None)
+        self._subscribers.setdefault(event_type, []).append(receiver)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[event_type].remove(receiver)
+            await receiver.aclose()
+
+    async def _complete(
+        self, request: Dict[str, Any]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Генерация ответа моделью sampling API
+
+        Запрос дополняется системным промптом и контекстом задачи (execute),
+        фрагменты читаются из llm_client по мере запроса потребителем.
+        """
+        deltas = llm_client.stream(await self.execute(request))
+        try:
+            async for delta in deltas:
+                yield delta
+        finally:
+            await deltas.aclose()
+
+    async def sample(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Генерация полного ответа из фрагментов stream"""
+        parts: List[str] = []
+        stop_reason = None
+        deltas = self.stream(request)
+        try:
+            async for delta in deltas:
+                parts.append(delta.get("text", ""))
+                stop_reason = delta.get("stop_reason", stop_reason)
+        finally:
+            await deltas.aclose()
+
+        return {
+            "role": "assistant",
+            "content": {"type": "text", "text": "".join(parts)},
+            "stopReason": stop_reason,
+        }
+
 
 class KeywordSampler(BaseSampler):
     """Сэмплер на основе ключевых слов"""
@@ -101,6 +173,10 @@ class KeywordSampler(BaseSampler):
 
         return "code_assistant"  # По умолчанию
 
+    def stream(self, request: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """Потоковая генерация с промптом задачи, выбранной по ключевым словам"""
+        return self._complete(request)
+
     async def initialize(self) -> None:
         """Initialize the keyword sampler"""
         pass  # No initialization needed for keyword-based sampling
@@ -154,6 +230,10 @@ class MLSampler(BaseSampler):
         # Здесь должна быть реализация классификации с помощью ML
         return "code_assistant"
 
+    def stream(self, request: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """Потоковая генерация с промптом задачи, выбранной моделью"""
+        return self._complete(request)
+
     async def prepare_context(
         self, messages: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
@@ -69,6 +69,97 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    # Настройки Elasticsearch
+    ELASTICSEARCH_URL: str = "http://elasticsearch:9200"
+    ELASTICSEARCH_MAX_CONNECTIONS: int = 100  # Размер общего пула соединений
+    ELASTICSEARCH_MAX_KEEPALIVE: int = 20  # Простаивающих соединений в пуле
+    ELASTICSEARCH_KEEPALIVE_EXPIRY: float = 30.0  # Секунд до закрытия простоя
+    ELASTICSEARCH_TIMEOUT: float = 30.0  # Таймаут запроса по умолчанию
+    ELASTICSEARCH_CONNECT_TIMEOUT: float = 5.0
+    ELASTICSEARCH_POOL_TIMEOUT: float = 5.0  # Ожидание свободного соединения
+
+    # Настройки кэша результатов поиска
+    SEARCH_CACHE_TTL: int = 60  # Секунд, 0 отключает кэш
+    SEARCH_CACHE_SIZE: int = 1000  # Записей во внутрипроцессном кэше
+
+    # Настройки потокового поиска
+    SEARCH_STREAM_PAGE_SIZE: int = 1000  # Документов в странице
+    SEARCH_STREAM_KEEP_ALIVE: str = "1m"  # Время жизни point-in-time
+
+    # Ближний кэш Redis с инвалидацией через pub/sub
+    NEAR_CACHE_ENABLED: bool = False
+    NEAR_CACHE_SIZE: int = 10000  # Ключей в памяти процесса
+    NEAR_CACHE_TTL: int = 300  # Секунд, страховка от потерянных инвалидаций
+
+    # Read-through кэш хранилища (промпты, ресурсы, поиск промптов)
+    READ_THROUGH_TTL: int = 300  # Секунд свежести значения
+    READ_THROUGH_STALE_TTL: int = 60  # Секунд отдачи устаревшего значения
+    READ_THROUGH_LOCK_TTL: float = 5.0  # Секунд блокировки загрузки ключа
+    READ_THROUGH_BETA: float = 1.0  # Коэффициент XFetch, 0 отключает
+    READ_THROUGH_LOCAL_SIZE: int = 1000  # Записей в памяти процесса
+    READ_THROUGH_LOCAL_TTL: float = 5.0  # Секунд жизни в памяти процесса
+
+    # Исполнитель инструментов (значения по умолчанию для каждого инструмента)
+    TOOL_MAX_CONCURRENCY: int = 8  # Одновременных вызовов инструмента
+    TOOL_MAX_QUEUE: int = 32  # Вызовов, ожидающих свободного слота
+    TOOL_TIMEOUT: float = 30.0  # Секунд на вызов, включая ожидание в очереди
+    TOOL_PROCESS_WORKERS: int = 0  # Процессов для CPU-инструментов, 0 — по числу CPU
+    TOOL_BATCH_MAX_CALLS: int = 100  # Вызовов в одном пакетном запросе
+
+    # WebSocket: запросы одного соединения выполняются параллельно
+    WS_MAX_CONCURRENT_REQUESTS: int = 8  # Одновременно выполняемых запросов
+    WS_MAX_PENDING_REQUESTS: int = 64  # Выполняемых и ожидающих запросов
+    WS_SEND_QUEUE_SIZE: int = 256  # Сообщений в очереди отправки соединения
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # drop_oldest или disconnect
+    WS_BROADCAST_REDIS: bool = True  # Рассылка между процессами через Redis
+    SUBSCRIPTION_MAX_PER_SUBSCRIBER: int = 100  # Подписок на ресурсы у соединения
+
+    # Ограничение частоты запросов ("N/second", "N/minute", "N/hour", "N/day")
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_DEFAULT: str = ""  # Пустая строка — без общего лимита
+    RATE_LIMIT_ROUTES: dict[str, str] = {"/sampling": "10/second"}
+    RATE_LIMIT_TOOLS: dict[str, str] = {"search": "20/second"}
+    # Адреса и подсети прокси, которым доверяется заголовок X-Forwarded-For
+    RATE_LIMIT_TRUSTED_PROXIES: list[str] = []
+
+    # Генерация текста для сэмплирования: OpenAI-совместимый API
+    SAMPLING_API_URL: str = "http://localhost:11434/v1"  # Например, Ollama
+    SAMPLING_API_KEY: Optional[str] = None
+    SAMPLING_MODEL: str = "llama3.1"
+    SAMPLING_TIMEOUT: float = 60.0  # Секунд ожидания очередного фрагмента
+
+    # Настройки массовой загрузки
+    INGEST_BULK_SIZE: int = 500  # Документов в одном запросе _bulk
+    INGEST_QUEUE_SIZE: int = 1000  # Емкость очереди между стадиями
+    INGEST_MAX_RETRIES: int = 5  # Повторов документа после ответа 429
+    INGEST_RETRY_BACKOFF: float = 0.5  # Начальная пауза между повторами
+
+    # Настройки эмбеддингов
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    EMBEDDING_BACKEND: str = "torch"  # torch, torch_int8 или onnx
+    EMBEDDING_ONNX_FILE: str = "onnx/model_qint8_avx2.onnx"
+    EMBEDDING_WARMUP_ON_STARTUP: bool = True  # Фоновая загрузка модели при старте
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_WAIT_MS: float = 5.0  # Окно накопления микробатча
+    EMBEDDING_CACHE_TTL: int = 3600 * 24  # 24 часа
+    EMBEDDING_EXECUTOR: str = "thread"  # thread или process
+    EMBEDDING_WORKERS: int = 1
+    EMBEDDING_TORCH_THREADS: int = 0  # 0 — число потоков torch по умолчанию
+    EMBEDDING_MAX_QUEUE: int = 64  # Батчей в очереди пула инференса
+    EMBEDDING_CACHE_DTYPE: str = "float32"  # float32, float16 или int8
+    EMBEDDING_LOCAL_CACHE_SIZE: int = 10000  # Записей во внутрипроцессном кэше
+    EMBEDDING_LOCAL_CACHE_TTL: int = 3600
+
+    # Настройки векторного поиска
+    VECTOR_SEARCH_BACKEND: str = "elasticsearch"  # elasticsearch или local
+    VECTOR_SEARCH_MODE: str = "knn"  # knn, exact или hybrid
+    VECTOR_SEARCH_NUM_CANDIDATES: int = 100  # Кандидатов HNSW на шард
+    VECTOR_SEARCH_FIELD: str = "embedding"  # Поле с вектором документа
+    VECTOR_INDEX_DIR: str = "data/vector_index"  # Относительно BASE_DIR
+    VECTOR_INDEX_DIM: int = 384  # Размерность векторов пустого индекса
+    VECTOR_INDEX_N_PROBE: int = 8  # Просматриваемых списков IVF на запрос
+    VECTOR_INDEX_MERGE_THRESHOLD: int = 4096  # Размер дельты до слияния
+
     # Настройки логирования
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -85,4 +176,4 @@ class Settings(BaseSettings):
 
 
 # Создание экземпляра настроек
-settings = Settings()
\ No newline at end of file
+settings = Settings()
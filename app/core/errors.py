@@ -66,6 +66,42 @@ class ToolError(MCPError):
         super().__init__("tool_error", message, details)
 
 
+class ToolTimeoutError(ToolError):
+    """Инструмент не завершился за отведенное время."""
+
+    def __init__(
+        self,
+        message: str,
+        details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Инициализирует ошибку превышения времени выполнения.
+
+        Args:
+            message: Сообщение об ошибке
+            details: Дополнительные детали ошибки
+        """
+        MCPError.__init__(self, "tool_timeout", message, details)
+
+
+class ToolOverloadedError(ToolError):
+    """Очередь вызовов инструмента заполнена."""
+
+    def __init__(
+        self,
+        message: str,
+        details: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Инициализирует ошибку перегрузки инструмента.
+
+        Args:
+            message: Сообщение об ошибке
+            details: Дополнительные детали ошибки
+        """
+        MCPError.__init__(self, "tool_overloaded", message, details)
+
+
 class ResourceError(MCPError):
     """Ошибка, связанная с ресурсами MCP."""
 
@@ -0,0 +1,412 @@
+"""
+Ограничение частоты запросов.
+
+Лимиты задаются в виде "N/период" (например, "20/second" или "600/minute")
+и реализуются алгоритмом token bucket: емкость корзины — N запросов,
+пополнение — N запросов за период.
+
+Запрос проверяется в два этапа:
+- локальная корзина процесса отклоняет всплески без обращения к Redis;
+- общая корзина в Redis (Lua-скрипт) ограничивает суммарную частоту
+  по всем процессам. Если Redis недоступен, действует только локальный лимит.
+
+Клиент определяется по адресу подключения. За обратным прокси адрес
+берется из X-Forwarded-For, если подключение пришло с адреса из
+RATE_LIMIT_TRUSTED_PROXIES; иначе все клиенты прокси делили бы одну корзину.
+
+RateLimitMiddleware применяет лимиты к HTTP маршрутам и инструментам
+и отвечает 429 с заголовком Retry-After.
+"""
+
+import ipaddress
+import logging
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from prometheus_client import Counter
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.storage.redis import redis_storage
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_REQUESTS = Counter(
+    "rate_limit_requests_total",
+    "Проверки ограничения частоты запросов",
+    ["rule", "result"],
+)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@lru_cache(maxsize=16)
+def _networks(proxies: Tuple[str, ...]) -> Tuple[Any, ...]:
+    """Подсети доверенных прокси."""
+    return tuple(ipaddress.ip_network(proxy, strict=False) for proxy in proxies)
+
+
+def _is_trusted(address: str, networks: Tuple[Any, ...]) -> bool:
+    """Входит ли адрес в подсети доверенных прокси."""
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_address(
+    scope: Scope, trusted_proxies: Optional[Sequence[str]] = None
+) -> str:
+    """
+    Определяет адрес клиента HTTP запроса или WebSocket для лимитов.
+
+    Если подключение пришло от доверенного прокси, адрес берется из
+    X-Forwarded-For: адреса проверяются справа налево, и первый адрес не
+    из доверенных прокси считается клиентом. Заголовок от остальных
+    подключений игнорируется, иначе клиент мог бы подставить любой адрес.
+
+    Args:
+        scope: ASGI scope запроса
+        trusted_proxies: Адреса и подсети доверенных прокси
+            (по умолчанию settings.RATE_LIMIT_TRUSTED_PROXIES)
+
+    Returns:
+        str: Адрес клиента или "unknown"
+    """
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    proxies = (
+        settings.RATE_LIMIT_TRUSTED_PROXIES
+        if trusted_proxies is None
+        else trusted_proxies
+    )
+    if not proxies:
+        return peer
+
+    networks = _networks(tuple(proxies))
+    if not _is_trusted(peer, networks):
+        return peer
+
+    forwarded = [
+        address.strip()
+        for name, value in scope.get("headers", [])
+        if name == b"x-forwarded-for"
+        for address in value.decode("latin-1").split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded):
+        if not _is_trusted(address, networks):
+            return address
+    # Все адреса цепочки принадлежат прокси: клиент — самый левый
+    return forwarded[0] if forwarded else peer
+
+
+class RateLimit:
+    """
+    Лимит частоты запросов.
+
+    Attributes:
+        capacity: Емкость корзины (допустимый всплеск)
+        rate: Скорость пополнения в запросах в секунду
+    """
+
+    def __init__(self, capacity: int, period: float) -> None:
+        """
+        Инициализирует лимит.
+
+        Args:
+            capacity: Число запросов за период
+            period: Период в секундах
+
+        Raises:
+            ValueError: Если лимит не положительный
+        """
+        if capacity <= 0 or period <= 0:
+            raise ValueError("Лимит и период должны быть положительными")
+
+        self.capacity = capacity
+        self.rate = capacity / period
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """
+        Создает лимит из строки вида "N/период".
+
+        Args:
+            value: Описание лимита, например "20/second"
+
+        Returns:
+            RateLimit: Лимит
+
+        Raises:
+            ValueError: Если строка имеет неверный формат
+        """
+        count, _, period = value.partition("/")
+        if period not in _PERIODS or not count.strip().isdigit():
+            raise ValueError(
+                f"Неверный формат лимита: {value}. "
+                f"Ожидается N/период, доступные периоды: {', '.join(_PERIODS)}"
+            )
+        return cls(int(count), _PERIODS[period])
+
+
+class LocalTokenBucket:
+    """
+    Корзины token bucket в памяти процесса.
+
+    Хранит ограниченное число корзин, вытесняя давно не использованные.
+    Не потокобезопасен: рассчитан на использование из одного цикла событий.
+    """
+
+    def __init__(
+        self, maxsize: int = 10000, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Инициализирует хранилище корзин.
+
+        Args:
+            maxsize: Максимальное число корзин
+            clock: Источник времени
+        """
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: str, limit: RateLimit, cost: int = 1) -> Tuple[bool, float]:
+        """
+        Списывает токены из корзины.
+
+        Args:
+            key: Ключ корзины
+            limit: Лимит корзины
+            cost: Число списываемых токенов
+
+        Returns:
+            Tuple[bool, float]: Списаны ли токены и через сколько секунд
+                их станет достаточно
+        """
+        now = self._clock()
+        tokens, updated = self._buckets.pop(key, (float(limit.capacity), now))
+        tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+
+        allowed = tokens >= cost
+        retry_after = 0.0
+        if allowed:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / limit.rate
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def refund(self, key: str, limit: RateLimit, cost: int = 1) -> None:
+        """
+        Возвращает в корзину списанные токены.
+
+        Args:
+            key: Ключ корзины
+            limit: Лимит корзины
+            cost: Число возвращаемых токенов
+        """
+        entry = self._buckets.get(key)
+        if entry is not None:
+            tokens, updated = entry
+            self._buckets[key] = (min(limit.capacity, tokens + cost), updated)
+
+
+class RateLimiter:
+    """
+    Двухуровневый ограничитель частоты: локальная корзина и Redis.
+
+    Attributes:
+        local: Локальные корзины процесса
+        tool_limits: Лимиты по именам инструментов
+    """
+
+    def __init__(
+        self,
+        storage: Any = None,
+        local_size: int = 10000,
+        tools: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Инициализирует ограничитель.
+
+        Args:
+            storage: Хранилище с методом acquire_tokens (None — только
+                локальный лимит)
+            local_size: Максимальное число локальных корзин
+            tools: Лимиты по именам инструментов
+                (по умолчанию settings.RATE_LIMIT_TOOLS)
+        """
+        self.storage = storage
+        self.local = LocalTokenBucket(maxsize=local_size)
+        tools = settings.RATE_LIMIT_TOOLS if tools is None else tools
+        self.tool_limits = {
+            name: RateLimit.parse(value) for name, value in tools.items()
+        }
+
+    async def acquire(
+        self, rule: str, client: str, limit: RateLimit, cost: int = 1
+    ) -> Tuple[bool, float]:
+        """
+        Проверяет, укладывается ли запрос в лимит.
+
+        Args:
+            rule: Имя правила (маршрут или инструмент)
+            client: Идентификатор клиента
+            limit: Лимит правила
+            cost: Стоимость запроса в токенах
+
+        Returns:
+            Tuple[bool, float]: Разрешен ли запрос и через сколько секунд
+                его можно повторить
+        """
+        key = f"{rule}:{client}"
+        allowed, retry_after = self.local.acquire(key, limit, cost)
+        if not allowed:
+            RATE_LIMIT_REQUESTS.labels(rule, "rejected_local").inc()
+            return False, retry_after
+
+        if self.storage is not None:
+            try:
+                allowed, retry_after = await self.storage.acquire_tokens(
+                    key, limit.rate, limit.capacity, cost
+                )
+            except Exception as e:
+                # Без Redis продолжаем работать с локальным лимитом
+                logger.warning(f"Общий лимит частоты недоступен: {str(e)}")
+                allowed = True
+            if not allowed:
+                # Запрос не выполнен: локальный токен не должен сгорать
+                self.local.refund(key, limit, cost)
+                RATE_LIMIT_REQUESTS.labels(rule, "rejected").inc()
+                return False, retry_after
+
+        RATE_LIMIT_REQUESTS.labels(rule, "allowed").inc()
+        return True, 0.0
+
+    async def acquire_tool(self, tool_name: str, client: str) -> Tuple[bool, float]:
+        """
+        Проверяет лимит вызова инструмента вне HTTP (например, из WebSocket).
+
+        Args:
+            tool_name: Имя инструмента
+            client: Идентификатор клиента
+
+        Returns:
+            Tuple[bool, float]: Разрешен ли вызов и через сколько секунд
+                его можно повторить
+        """
+        limit = self.tool_limits.get(tool_name)
+        if limit is None:
+            return True, 0.0
+        return await self.acquire(f"tool:{tool_name}", client, limit)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware ограничения частоты HTTP запросов.
+
+    Правило выбирается в порядке: лимит инструмента для /tools/{name},
+    лимит маршрута с самым длинным совпадающим префиксом, лимит по
+    умолчанию. Клиент определяется функцией client_address.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Optional[RateLimiter] = None,
+        routes: Optional[Dict[str, str]] = None,
+        tools: Optional[Dict[str, str]] = None,
+        default: Optional[str] = None,
+    ) -> None:
+        """
+        Инициализирует middleware.
+
+        Args:
+            app: ASGI приложение
+            limiter: Ограничитель частоты
+                (по умолчанию общий rate_limiter)
+            routes: Лимиты по префиксам путей
+                (по умолчанию settings.RATE_LIMIT_ROUTES)
+            tools: Лимиты по именам инструментов
+                (по умолчанию лимиты инструментов ограничителя)
+            default: Лимит остальных маршрутов
+                (по умолчанию settings.RATE_LIMIT_DEFAULT)
+        """
+        self.app = app
+        self.limiter = limiter or rate_limiter
+        routes = settings.RATE_LIMIT_ROUTES if routes is None else routes
+        default = settings.RATE_LIMIT_DEFAULT if default is None else default
+
+        # Более длинные префиксы проверяются первыми
+        self.routes = sorted(
+            ((prefix, RateLimit.parse(value)) for prefix, value in routes.items()),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self.tools = (
+            self.limiter.tool_limits
+            if tools is None
+            else {name: RateLimit.parse(value) for name, value in tools.items()}
+        )
+        self.default = RateLimit.parse(default) if default else None
+
+    def match(self, path: str) -> Optional[Tuple[str, RateLimit]]:
+        """
+        Находит правило для пути запроса.
+
+        Args:
+            path: Путь запроса
+
+        Returns:
+            Optional[Tuple[str, RateLimit]]: Имя и лимит правила или None
+        """
+        if path.startswith("/tools/"):
+            tool_name = path[len("/tools/") :].split("/", 1)[0]
+            if tool_name in self.tools:
+                return f"tool:{tool_name}", self.tools[tool_name]
+
+        for prefix, limit in self.routes:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return f"route:{prefix}", limit
+
+        if self.default is not None:
+            return "default", self.default
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        name, limit = rule
+        client = client_address(scope)
+        allowed, retry_after = await self.limiter.acquire(name, client, limit)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": "Too Many Requests"},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
+
+
+# Создаем глобальный экземпляр
+rate_limiter = RateLimiter(storage=redis_storage)
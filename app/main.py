@@ -1,13 +1,31 @@
+import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import logging
+from typing import Any, AsyncGenerator, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from prometheus_fastapi_instrumentator import Instrumentator
 from pydantic import BaseModel
 
+from app.core.base.tool import shutdown_process_pool
+from app.core.base_sampling import KeywordSampler
+from app.core.config import settings
+from app.core.errors import ToolOverloadedError, ToolTimeoutError
+from app.core.rate_limit import RateLimitMiddleware, client_address
 from app.models.graphql import graphql_router  # Импорт GraphQL маршрутизатора
+from app.services.llm_client import llm_client
 from app.services.mcp_service import mcp_service
+from app.storage.es_client import es_http_client
+from app.storage.vector_index import vector_indexes
+from app.tools.search import get_search_tool
+from app.utils.embeddings import embeddings_manager
+from app.websocket import WebSocketSession
+from app.websocket.broadcast import manager
+from app.websocket.handlers import HANDLERS
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="MCP Server", docs_url="/docs", redoc_url="/redoc")
 Instrumentator().instrument(app).expose(app)
@@ -20,11 +38,47 @@ async def startup_event():
 
     await register_tools()
 
+    # Сэмплер по умолчанию для /sampling и sampling_request
+    mcp_service.registry.register_sampler("default", KeywordSampler())
+
     print("MCP Server started with the following tools:")
     tools = await mcp_service.list_tools()
     for tool_name, tool in tools.items():
         print(f"- {tool_name}: {tool.description}")
 
+    # Локальный векторный индекс — состояние одного процесса: второй
+    # процесс с этим бэкендом не запускается
+    if settings.VECTOR_SEARCH_BACKEND == "local":
+        vector_indexes.acquire()
+
+    # Модель эмбеддингов прогревается в фоне, не задерживая старт сервера
+    if settings.EMBEDDING_WARMUP_ON_STARTUP:
+        app.state.embeddings_warmup = asyncio.create_task(_warmup_embeddings())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Сохраняем инкрементальные изменения локальных векторных индексов
+    await asyncio.to_thread(vector_indexes.save_all)
+    vector_indexes.release()
+    # Закрываем общий пул соединений с Elasticsearch
+    await es_http_client.close()
+    # Закрываем клиент API генерации текста
+    await llm_client.close()
+    # Останавливаем пул процессов CPU-инструментов
+    shutdown_process_pool()
+    # Закрываем соединения WebSocket и подписку на рассылку
+    await manager.close()
+
+
+async def _warmup_embeddings() -> None:
+    """Фоновая загрузка модели эмбеддингов"""
+    try:
+        await embeddings_manager.warmup()
+        logger.info("Модель эмбеддингов загружена")
+    except Exception as e:
+        logger.error(f"Не удалось загрузить модель эмбеддингов: {str(e)}")
+
 
 # CORS middleware
 app.add_middleware(
@@ -35,24 +89,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-
-manager = ConnectionManager()
+# Ограничение частоты запросов к маршрутам и инструментам
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
 
 
 @app.get("/")
@@ -65,6 +104,17 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Готовность к обслуживанию запросов: модель эмбеддингов загружена"""
+    if not embeddings_manager.is_ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "embeddings_model": "loading"},
+        )
+    return {"status": "ready", "embeddings_model": "loaded"}
+
+
 # Добавляем GraphQL маршрутизатор
 app.include_router(graphql_router, prefix="/graphql")
 
@@ -117,6 +167,18 @@ async def create_resource(resource: ResourceCreate):
     }
 
 
+@app.exception_handler(ToolTimeoutError)
+async def tool_timeout_handler(request, exc: ToolTimeoutError):
+    return JSONResponse(status_code=504, content=exc.to_dict())
+
+
+@app.exception_handler(ToolOverloadedError)
+async def tool_overloaded_handler(request, exc: ToolOverloadedError):
+    return JSONResponse(
+        status_code=503, content=exc.to_dict(), headers={"Retry-After": "1"}
+    )
+
+
 # Tools API
 @app.get("/tools")
 async def list_tools():
@@ -145,6 +207,91 @@ class ToolParameters(BaseModel):
     model_config = {"extra": "allow"}  # Разрешаем дополнительные поля
 
 
+class ToolCall(BaseModel):
+    """Вызов инструмента в пакетном запросе"""
+
+    name: str
+    parameters: Dict[str, Any] = {}
+
+
+class ToolBatchRequest(BaseModel):
+    """Модель пакетного вызова инструментов"""
+
+    calls: List[ToolCall]
+    stream: bool = False
+
+
+class SearchStreamRequest(BaseModel):
+    """Модель запроса потокового поиска"""
+
+    operation: str = "text"
+    query: str
+    index: str
+    params: Optional[Dict[str, Any]] = None
+
+
+async def _search_ndjson(pages: AsyncGenerator[List[Dict[str, Any]], None]):
+    """Преобразует страницы потокового поиска в строки NDJSON"""
+    try:
+        async for hits in pages:
+            yield "".join(json.dumps(hit, default=str) + "\n" for hit in hits)
+    except Exception as e:
+        # Заголовки уже отправлены, ошибка передается последней строкой
+        logger.error(f"Ошибка потокового поиска: {str(e)}")
+        yield json.dumps({"error": str(e)}) + "\n"
+    finally:
+        # Закрывает point-in-time, если клиент отключился раньше
+        await pages.aclose()
+
+
+async def _batch_ndjson(results: AsyncGenerator[Dict[str, Any], None]):
+    """Преобразует результаты пакетного вызова в строки NDJSON"""
+    try:
+        async for result in results:
+            yield json.dumps(result, default=str) + "\n"
+    finally:
+        # Отменяет незавершенные вызовы, если клиент отключился раньше
+        await results.aclose()
+
+
+# Объявлен до /tools/{tool_name}, чтобы путь не совпал с именем инструмента
+@app.post("/tools/batch")
+async def execute_tools(request: ToolBatchRequest, http_request: Request):
+    """Выполнить несколько вызовов инструментов одним запросом
+
+    Вызовы выполняются параллельно. При stream=true результаты отдаются
+    в формате NDJSON по мере завершения, иначе — списком в порядке вызовов.
+    """
+    client = client_address(http_request.scope)
+    try:
+        results = mcp_service.execute_tools(
+            [call.model_dump() for call in request.calls], client
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    if request.stream:
+        return StreamingResponse(
+            _batch_ndjson(results), media_type="application/x-ndjson"
+        )
+
+    collected = [result async for result in results]
+    return {"results": sorted(collected, key=lambda result: result["index"])}
+
+
+# Объявлен до /tools/{tool_name}, чтобы путь не совпал с именем инструмента
+@app.post("/tools/search/stream")
+async def stream_search(request: SearchStreamRequest):
+    """Выгрузить все результаты поиска в формате NDJSON"""
+    try:
+        pages = get_search_tool().stream(
+            request.operation, request.query, request.index, request.params
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    return StreamingResponse(_search_ndjson(pages), media_type="application/x-ndjson")
+
+
 @app.post("/tools/{tool_name}")
 async def execute_tool(tool_name: str, parameters: ToolParameters):
     try:
@@ -154,8 +301,8 @@ async def execute_tool(tool_name: str, parameters: ToolParameters):
         }
         result = await mcp_service.execute_tool(tool_name, params_dict)
         return result
-    except HTTPException as e:
-        raise e
+    except (HTTPException, ToolTimeoutError, ToolOverloadedError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -214,23 +361,27 @@ class SamplingRequest(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+def _to_mcp_sampling_request(request: SamplingRequest):
+    """Преобразование запроса в формат MCP"""
+    from app.models.mcp import SamplingRequest as MCPSamplingRequest
+
+    return MCPSamplingRequest(
+        messages=request.messages,
+        modelPreferences=request.model_preferences,
+        systemPrompt=request.system_prompt,
+        includeContext=request.include_context,
+        temperature=request.temperature,
+        maxTokens=request.max_tokens or 1024,
+        stopSequences=request.stop_sequences,
+        metadata=request.metadata,
+    )
+
+
 @app.post("/sampling")
 async def create_sampling(request: SamplingRequest):
     """Создать запрос на сэмплирование LLM"""
     try:
-        from app.models.mcp import SamplingRequest as MCPSamplingRequest
-
-        # Преобразование запроса в формат MCP
-        mcp_request = MCPSamplingRequest(
-            messages=request.messages,
-            modelPreferences=request.model_preferences,
-            systemPrompt=request.system_prompt,
-            includeContext=request.include_context,
-            temperature=request.temperature,
-            maxTokens=request.max_tokens or 1024,
-            stopSequences=request.stop_sequences,
-            metadata=request.metadata,
-        )
+        mcp_request = _to_mcp_sampling_request(request)
 
         # Выполнение запроса сэмплирования
         result = await mcp_service.create_sampling(mcp_request)
@@ -246,142 +397,51 @@ async def create_sampling(request: SamplingRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _sampling_sse(deltas: AsyncGenerator[Dict[str, Any], None]):
+    """Преобразует фрагменты сэмплирования в события SSE"""
+    try:
+        async for delta in deltas:
+            yield f"event: delta\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        # Заголовки уже отправлены, ошибка передается событием
+        logger.error(f"Ошибка потокового сэмплирования: {str(e)}")
+        error = json.dumps({"message": str(e)}, ensure_ascii=False)
+        yield f"event: error\ndata: {error}\n\n"
+    finally:
+        # При отключении клиента StreamingResponse отменяет генератор,
+        # и генерация в сэмплере прерывается
+        await deltas.aclose()
+
+
+@app.post("/sampling/stream")
+async def stream_sampling(request: SamplingRequest):
+    """Потоковое сэмплирование LLM в формате Server-Sent Events"""
+    try:
+        deltas = mcp_service.stream_sampling(_to_mcp_sampling_request(request))
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=501,
+            detail="Sampling functionality is not implemented yet",
+        ) from None
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+    return StreamingResponse(
+        _sampling_sse(deltas),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    connection = await manager.connect(websocket)
     try:
-        while True:
-            data = await websocket.receive_text()
-            try:
-                message = json.loads(data)
-                message_type = message.get("type")
-                message_data = message.get("data", {})
-
-                if message_type == "tool_request":
-                    response = await mcp_service.execute_tool(
-                        message_data.get("name", ""), message_data.get("parameters", {})
-                    )
-                    await websocket.send_json(
-                        {"type": "tool_response", "data": response}
-                    )
-                elif message_type == "register_tool":
-                    from app.models.mcp import Tool
-
-                    tool = Tool(
-                        name=message_data.get("name"),
-                        description=message_data.get("description"),
-                        input_schema=message_data.get("input_schema", {}),
-                    )
-                    await mcp_service.register_tool(tool)
-                    await websocket.send_json(
-                        {
-                            "type": "registration_response",
-                            "data": {
-                                "status": "success",
-                                "message": f"Tool '{tool.name}' registered",
-                            },
-                        }
-                    )
-                elif message_type == "resource_request":
-                    resource_uri = message_data.get("uri")
-                    resource = await mcp_service.get_resource(resource_uri)
-                    if resource:
-                        await websocket.send_json(
-                            {
-                                "type": "resource_response",
-                                "data": {
-                                    "resource": resource,
-                                    "status": "success",
-                                },
-                            }
-                        )
-                    else:
-                        await websocket.send_json(
-                            {
-                                "type": "resource_response",
-                                "data": {
-                                    "status": "error",
-                                    "message": f"Resource '{resource_uri}' not found",
-                                },
-                            }
-                        )
-                elif message_type == "prompt_request":
-                    prompt_name = message_data.get("name")
-                    prompt_args = message_data.get("arguments", {})
-
-                    messages = await mcp_service.execute_prompt(
-                        prompt_name,
-                        prompt_args,
-                    )
-                    await websocket.send_json(
-                        {
-                            "type": "prompt_response",
-                            "data": {
-                                "messages": messages,
-                                "status": "success",
-                            },
-                        }
-                    )
-                elif message_type == "sampling_request":
-                    # Преобразование запроса в формат MCP
-                    from app.models.mcp import SamplingRequest as MCPSamplingRequest
-
-                    try:
-                        mcp_request = MCPSamplingRequest(
-                            messages=message_data.get("messages", []),
-                            modelPreferences=message_data.get("model_preferences"),
-                            systemPrompt=message_data.get("system_prompt"),
-                            includeContext=message_data.get("include_context", "none"),
-                            temperature=message_data.get("temperature"),
-                            maxTokens=message_data.get("max_tokens", 1024),
-                            stopSequences=message_data.get("stop_sequences"),
-                            metadata=message_data.get("metadata"),
-                        )
-
-                        result = await mcp_service.create_sampling(mcp_request)
-                        await websocket.send_json(
-                            {
-                                "type": "sampling_response",
-                                "data": {
-                                    "result": result,
-                                    "status": "success",
-                                },
-                            }
-                        )
-                    except NotImplementedError:
-                        await websocket.send_json(
-                            {
-                                "type": "sampling_response",
-                                "data": {
-                                    "status": "error",
-                                    "message": "Sampling functionality is not implemented yet",
-                                },
-                            }
-                        )
-                    except Exception as e:
-                        await websocket.send_json(
-                            {
-                                "type": "sampling_response",
-                                "data": {
-                                    "status": "error",
-                                    "message": str(e),
-                                },
-                            }
-                        )
-                else:
-                    await websocket.send_json(
-                        {"type": "error", "data": {"message": "Unknown message type"}}
-                    )
-            except json.JSONDecodeError:
-                await websocket.send_json(
-                    {"type": "error", "data": {"message": "Invalid JSON"}}
-                )
-            except Exception as e:
-                await websocket.send_json(
-                    {"type": "error", "data": {"message": str(e)}}
-                )
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        # Запросы соединения выполняются параллельно, ответы помечаются их id
+        await WebSocketSession(websocket, HANDLERS, connection=connection).run()
+    finally:
+        await manager.disconnect(connection)
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ from typing import List, Optional
 import strawberry
 from strawberry.fastapi import GraphQLRouter
 from strawberry.scalars import JSON
+from strawberry.types import Info
 
 
 @strawberry.type
@@ -181,12 +182,37 @@ class Query:
         )
 
 
+def _client_host(info: Info) -> str:
+    """Адрес клиента запроса GraphQL для лимитов инструментов"""
+    from app.core.rate_limit import client_address
+
+    request = info.context.get("request")
+    return client_address(request.scope) if request is not None else "unknown"
+
+
 @strawberry.type
 class Mutation:
     @strawberry.mutation
-    async def execute_tool(self, input: ToolInput) -> ToolResult:
+    async def execute_tool(self, input: ToolInput, info: Info) -> ToolResult:
+        from app.core.config import settings
+        from app.core.rate_limit import rate_limiter
         from app.services.mcp_service import mcp_service
 
+        if settings.RATE_LIMIT_ENABLED:
+            allowed, retry_after = await rate_limiter.acquire_tool(
+                input.name, _client_host(info)
+            )
+            if not allowed:
+                return ToolResult(
+                    content=[
+                        MessageContent(
+                            type="text",
+                            text=f"Too Many Requests: retry after {retry_after} s",
+                        )
+                    ],
+                    is_error=True,
+                )
+
         try:
             result = await mcp_service.execute_tool(input.name, input.parameters)
             content = [
@@ -208,6 +234,45 @@ class Mutation:
                 is_error=True,
             )
 
+    @strawberry.mutation
+    async def execute_tools(
+        self, inputs: List[ToolInput], info: Info
+    ) -> List[ToolResult]:
+        """Выполняет вызовы инструментов параллельно, результаты — в порядке вызовов"""
+        from app.services.mcp_service import mcp_service
+
+        # Превышение размера пакета возвращается как ошибка GraphQL;
+        # лимиты инструментов применяются к каждому вызову пакета
+        batch = mcp_service.execute_tools(
+            [{"name": item.name, "parameters": item.parameters} for item in inputs],
+            _client_host(info),
+        )
+
+        results: List[Optional[ToolResult]] = [None] * len(inputs)
+        async for item in batch:
+            if item["success"]:
+                result = item["result"] if isinstance(item["result"], dict) else {}
+                results[item["index"]] = ToolResult(
+                    content=[
+                        MessageContent(
+                            type=content.get("type", "text"),
+                            text=content.get("text"),
+                            data=content.get("data"),
+                            mime_type=content.get("mime_type"),
+                        )
+                        for content in result.get("content", [])
+                    ],
+                    is_error=result.get("isError", False),
+                )
+            else:
+                results[item["index"]] = ToolResult(
+                    content=[
+                        MessageContent(type="text", text=item["error"]["message"])
+                    ],
+                    is_error=True,
+                )
+        return results
+
     @strawberry.mutation
     async def execute_prompt(self, input: PromptInput) -> PromptResult:
         from app.services.mcp_service import mcp_service
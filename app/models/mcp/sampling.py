@@ -33,12 +33,34 @@ class SamplingRequest(BaseModel):
     Attributes:
         messages: Список сообщений для контекста
         preferences: Предпочтения сэмплирования
+        modelPreferences: Предпочтения выбора модели (MCP)
+        systemPrompt: Системный промпт
+        includeContext: Включаемый контекст (none, thisServer, allServers)
+        temperature: Температура сэмплирования
+        maxTokens: Максимальное число токенов для генерации
+        stopSequences: Последовательности, завершающие генерацию
+        metadata: Метаданные запроса
     """
 
     messages: List[Message] = Field(..., description="Список сообщений для контекста")
     preferences: Optional[ModelPreferences] = Field(
         None, description="Предпочтения сэмплирования"
     )
+    modelPreferences: Optional[Dict[str, Any]] = Field(
+        None, description="Предпочтения выбора модели (MCP)"
+    )
+    systemPrompt: Optional[str] = Field(None, description="Системный промпт")
+    includeContext: Optional[str] = Field(
+        "none", description="Включаемый контекст (none, thisServer, allServers)"
+    )
+    temperature: Optional[float] = Field(None, description="Температура сэмплирования")
+    maxTokens: Optional[int] = Field(
+        1024, description="Максимальное число токенов для генерации"
+    )
+    stopSequences: Optional[List[str]] = Field(
+        None, description="Последовательности, завершающие генерацию"
+    )
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Метаданные запроса")
 
 
 class SamplingResponse(BaseModel):
@@ -0,0 +1,417 @@
+"""
+Массовая загрузка ресурсов и промптов в Elasticsearch.
+
+Документы проходят конвейер из четырех стадий, связанных ограниченными
+очередями: разбор -> разбиение на чанки -> векторизация -> _bulk.
+Заполненная очередь приостанавливает предыдущую стадию, поэтому память
+ограничена размером очередей, а не объемом загрузки.
+
+Каждый документ сохраняется вместе с эмбеддингом (поле embedding) и
+векторизованными чанками (вложенное поле text_chunks, миграция 002).
+"""
+
+import asyncio
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+from elasticsearch import ApiError
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.storage.elasticsearch import es_storage
+from app.utils.embeddings import TokenChunker, embeddings_manager
+
+logger = logging.getLogger(__name__)
+
+INGEST_DOCUMENTS = Counter(
+    "ingest_documents_total",
+    "Документы, обработанные стадией загрузки",
+    ["stage"],
+)
+INGEST_ERRORS = Counter(
+    "ingest_errors_total",
+    "Документы, отброшенные стадией загрузки из-за ошибки",
+    ["stage"],
+)
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds",
+    "Длительность обработки порции документов стадией загрузки",
+    ["stage"],
+)
+INGEST_QUEUE_DEPTH = Gauge(
+    "ingest_queue_depth",
+    "Документы в очереди перед стадией загрузки",
+    ["stage"],
+)
+INGEST_BULK_RETRIES = Counter(
+    "ingest_bulk_retries_total",
+    "Повторные отправки документов после ответа 429",
+)
+
+# Поля документа, из которых берется текст для векторизации
+TEXT_FIELDS = {
+    "resources": ("content", "name"),
+    "prompts": ("content", "description", "name"),
+}
+
+# Маркер завершения потока документов
+_DONE = object()
+
+Document = Dict[str, Any]
+
+
+class IngestionPipeline:
+    """
+    Конвейер массовой загрузки документов в Elasticsearch.
+
+    Attributes:
+        kind: Тип документов (resources или prompts)
+        index: Индекс Elasticsearch
+        stats: Число документов по итогам стадий
+    """
+
+    def __init__(
+        self,
+        kind: str = "resources",
+        storage: Any = None,
+        embed: Optional[Callable[[List[str]], Awaitable[List[List[float]]]]] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        chunk_size: int = 256,
+        overlap: int = 32,
+        batch_size: Optional[int] = None,
+        bulk_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff: Optional[float] = None,
+    ) -> None:
+        """
+        Инициализирует конвейер.
+
+        Args:
+            kind: Тип документов (resources или prompts)
+            storage: Хранилище с методом bulk (по умолчанию es_storage)
+            embed: Функция векторизации списка текстов (по умолчанию
+                пул инференса модели без кэша эмбеддингов запросов)
+            count_tokens: Функция подсчета токенов
+                (по умолчанию токенизатор модели эмбеддингов)
+            chunk_size: Максимальный размер чанка в токенах
+            overlap: Перекрытие соседних чанков в токенах
+            batch_size: Число чанков в батче векторизации
+            bulk_size: Число документов в одном запросе _bulk
+            queue_size: Емкость очереди между стадиями
+            max_retries: Число повторов документа после ответа 429
+            retry_backoff: Пауза перед первым повтором в секундах
+
+        Raises:
+            ValueError: Если указан неизвестный тип документов
+        """
+        if kind not in TEXT_FIELDS:
+            raise ValueError(
+                f"Неизвестный тип документов: {kind}. "
+                f"Доступные типы: {', '.join(TEXT_FIELDS)}"
+            )
+
+        self.kind = kind
+        self.storage = storage or es_storage
+        self.index = self.storage.indices[kind]
+        self._embed = embed or self._encode
+        self._count_tokens = count_tokens
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.bulk_size = bulk_size or settings.INGEST_BULK_SIZE
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+        self.max_retries = (
+            settings.INGEST_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.retry_backoff = (
+            settings.INGEST_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        )
+        self.stats = {"parsed": 0, "chunks": 0, "indexed": 0, "failed": 0}
+
+    async def run(
+        self, documents: Union[Iterable[Document], AsyncIterable[Document]]
+    ) -> Dict[str, int]:
+        """
+        Загружает документы в Elasticsearch.
+
+        Ошибки отдельных документов учитываются в stats["failed"] и не
+        останавливают загрузку. Ошибка стадии останавливает конвейер.
+
+        Args:
+            documents: Документы (синхронный или асинхронный итератор)
+
+        Returns:
+            Dict[str, int]: Итоговая статистика загрузки
+        """
+        if self._count_tokens is None:
+            await embeddings_manager.warmup()
+            self._count_tokens = embeddings_manager.backend.count_tokens
+            self.chunk_size = min(
+                self.chunk_size, embeddings_manager.backend.max_tokens
+            )
+
+        to_chunk: asyncio.Queue = asyncio.Queue(self.queue_size)
+        to_embed: asyncio.Queue = asyncio.Queue(self.queue_size)
+        to_index: asyncio.Queue = asyncio.Queue(self.queue_size)
+
+        tasks = [
+            asyncio.create_task(self._parse(documents, to_chunk)),
+            asyncio.create_task(self._chunk(to_chunk, to_embed)),
+            asyncio.create_task(self._embed_stage(to_embed, to_index)),
+            asyncio.create_task(self._index_stage(to_index)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # При ошибке одной стадии остальные иначе ждали бы очередь вечно
+            for task in tasks:
+                task.cancel()
+
+        logger.info(f"Загрузка в {self.index} завершена: {self.stats}")
+        return dict(self.stats)
+
+    async def _put(self, queue: asyncio.Queue, stage: str, item: Any) -> None:
+        """Помещает элемент в очередь стадии, ожидая свободного места"""
+        await queue.put(item)
+        INGEST_QUEUE_DEPTH.labels(stage).set(queue.qsize())
+
+    async def _get(self, queue: asyncio.Queue, stage: str) -> Any:
+        """Получает элемент из очереди стадии"""
+        item = await queue.get()
+        INGEST_QUEUE_DEPTH.labels(stage).set(queue.qsize())
+        return item
+
+    async def _parse(
+        self,
+        documents: Union[Iterable[Document], AsyncIterable[Document]],
+        target: asyncio.Queue,
+    ) -> None:
+        """Стадия разбора: проверка документа и выделение текста"""
+        if not hasattr(documents, "__aiter__"):
+            documents = _aiter(documents)
+
+        async for document in documents:
+            try:
+                parsed = self.parse(document)
+            except ValueError as e:
+                logger.warning(f"Документ пропущен: {str(e)}")
+                INGEST_ERRORS.labels("parse").inc()
+                self.stats["failed"] += 1
+                continue
+            INGEST_DOCUMENTS.labels("parse").inc()
+            self.stats["parsed"] += 1
+            await self._put(target, "chunk", parsed)
+
+        await target.put(_DONE)
+
+    def parse(self, document: Document) -> Tuple[Optional[str], str, Document]:
+        """
+        Выделяет идентификатор и текст документа.
+
+        Ресурсы идентифицируются по uri, промпты — по name, поэтому
+        повторная загрузка обновляет документы, а не дублирует их.
+
+        Args:
+            document: Исходный документ
+
+        Returns:
+            Tuple[Optional[str], str, Document]: ID, текст и документ
+
+        Raises:
+            ValueError: Если в документе нет текста
+        """
+        fields = TEXT_FIELDS[self.kind]
+        text = next((document[f] for f in fields if document.get(f)), None)
+        if not isinstance(text, str):
+            raise ValueError(f"Нет текста ни в одном из полей: {', '.join(fields)}")
+
+        doc_id = document.get("uri" if self.kind == "resources" else "name")
+        return doc_id, text, document
+
+    async def _chunk(self, source: asyncio.Queue, target: asyncio.Queue) -> None:
+        """Стадия разбиения текста на чанки по токенам модели"""
+        while (item := await self._get(source, "chunk")) is not _DONE:
+            doc_id, text, document = item
+            start = time.perf_counter()
+            chunker = TokenChunker(
+                self._count_tokens, chunk_size=self.chunk_size, overlap=self.overlap
+            )
+            # Токенизация выполняется в потоке, чтобы не блокировать цикл событий
+            chunks = await asyncio.to_thread(_chunk_text, chunker, text)
+            INGEST_STAGE_SECONDS.labels("chunk").observe(time.perf_counter() - start)
+            INGEST_DOCUMENTS.labels("chunk").inc()
+            self.stats["chunks"] += len(chunks)
+            await self._put(target, "embed", (doc_id, chunks or [text], document))
+
+        await target.put(_DONE)
+
+    async def _embed_stage(self, source: asyncio.Queue, target: asyncio.Queue) -> None:
+        """Стадия векторизации: чанки нескольких документов одним батчем"""
+        pending: List[Tuple[Optional[str], List[str], Document]] = []
+        pending_chunks = 0
+
+        while (item := await self._get(source, "embed")) is not _DONE:
+            pending.append(item)
+            pending_chunks += len(item[1])
+            # Не ждем следующий документ, если батч набран или очередь пуста
+            if pending_chunks >= self.batch_size or source.empty():
+                await self._embed_pending(pending, target)
+                pending, pending_chunks = [], 0
+
+        if pending:
+            await self._embed_pending(pending, target)
+        await target.put(_DONE)
+
+    async def _encode(self, texts: List[str]) -> List[List[float]]:
+        """
+        Векторизует чанки в пуле инференса модели.
+
+        Кэш эмбеддингов (Redis, индекс mcp_vectors и локальный индекс IVF)
+        рассчитан на повторяющиеся запросы. Чанки загружаемых документов
+        почти не повторяются, поэтому запись их векторов в кэш только
+        умножила бы нагрузку на Redis и Elasticsearch.
+        """
+        vectors = await embeddings_manager.encode_async(texts, self.batch_size)
+        return vectors.tolist()
+
+    async def _embed_pending(
+        self,
+        pending: List[Tuple[Optional[str], List[str], Document]],
+        target: asyncio.Queue,
+    ) -> None:
+        """Векторизует чанки накопленных документов"""
+        texts = [chunk for _, chunks, _ in pending for chunk in chunks]
+        start = time.perf_counter()
+        try:
+            embeddings = await self._embed(texts)
+        except Exception as e:
+            logger.error(f"Ошибка векторизации {len(pending)} документов: {str(e)}")
+            INGEST_ERRORS.labels("embed").inc(len(pending))
+            self.stats["failed"] += len(pending)
+            return
+        INGEST_STAGE_SECONDS.labels("embed").observe(time.perf_counter() - start)
+
+        offset = 0
+        for doc_id, chunks, document in pending:
+            vectors = embeddings[offset : offset + len(chunks)]
+            offset += len(chunks)
+            INGEST_DOCUMENTS.labels("embed").inc()
+            document = self.build_document(document, chunks, vectors)
+            await self._put(target, "index", (doc_id, document))
+
+    @staticmethod
+    def build_document(
+        document: Document, chunks: List[str], vectors: List[List[float]]
+    ) -> Document:
+        """
+        Добавляет к документу эмбеддинг и векторизованные чанки.
+
+        Эмбеддинг документа — нормализованное среднее эмбеддингов чанков,
+        что не требует отдельного прохода модели по всему тексту.
+
+        Args:
+            document: Исходный документ
+            chunks: Тексты чанков
+            vectors: Эмбеддинги чанков
+
+        Returns:
+            Document: Документ для индексации
+        """
+        mean = np.mean(np.asarray(vectors, dtype=np.float32), axis=0)
+        norm = np.linalg.norm(mean)
+        if norm > 0:
+            mean = mean / norm
+
+        return {
+            **document,
+            "embedding": mean.tolist(),
+            "text_chunks": [
+                {"content": content, "embedding": vector}
+                for content, vector in zip(chunks, vectors)
+            ],
+        }
+
+    async def _index_stage(self, source: asyncio.Queue) -> None:
+        """Стадия индексации: документы отправляются порциями через _bulk"""
+        batch: List[Tuple[Optional[str], Document]] = []
+
+        while (item := await self._get(source, "index")) is not _DONE:
+            batch.append(item)
+            if len(batch) >= self.bulk_size:
+                await self._send_bulk(batch)
+                batch = []
+
+        if batch:
+            await self._send_bulk(batch)
+
+    async def _send_bulk(self, batch: List[Tuple[Optional[str], Document]]) -> None:
+        """
+        Отправляет порцию документов, повторяя отклоненные с ответом 429.
+
+        Между повторами выдерживается экспоненциально растущая пауза, за
+        это время Elasticsearch освобождает очередь записи.
+        """
+        attempt = 0
+        while batch:
+            operations: List[Dict[str, Any]] = []
+            for doc_id, document in batch:
+                meta: Dict[str, Any] = {"_index": self.index}
+                if doc_id is not None:
+                    meta["_id"] = doc_id
+                operations.extend([{"index": meta}, document])
+
+            start = time.perf_counter()
+            try:
+                result = await self.storage.bulk(operations)
+                statuses = [item["index"]["status"] for item in result["items"]]
+            except ApiError as e:
+                if e.status_code != 429:
+                    raise
+                statuses = [429] * len(batch)
+            INGEST_STAGE_SECONDS.labels("index").observe(time.perf_counter() - start)
+
+            rejected = [doc for doc, status in zip(batch, statuses) if status == 429]
+            failed = sum(1 for status in statuses if status >= 300 and status != 429)
+            indexed = len(batch) - len(rejected) - failed
+            INGEST_DOCUMENTS.labels("index").inc(indexed)
+            self.stats["indexed"] += indexed
+            if failed:
+                INGEST_ERRORS.labels("index").inc(failed)
+                self.stats["failed"] += failed
+
+            if rejected and attempt >= self.max_retries:
+                logger.error(f"Документы отклонены после {attempt} повторов")
+                INGEST_ERRORS.labels("index").inc(len(rejected))
+                self.stats["failed"] += len(rejected)
+                return
+
+            if rejected:
+                INGEST_BULK_RETRIES.inc(len(rejected))
+                await asyncio.sleep(self.retry_backoff * 2**attempt)
+                attempt += 1
+            batch = rejected
+
+
+def _chunk_text(chunker: TokenChunker, text: str) -> List[str]:
+    """Разбивает текст документа на чанки целиком"""
+    return [*chunker.feed(text), *chunker.flush()]
+
+
+async def _aiter(documents: Iterable[Document]) -> AsyncIterable[Document]:
+    """Асинхронный итератор поверх синхронного"""
+    for document in documents:
+        yield document
@@ -0,0 +1,156 @@
+"""
+Клиент потоковой генерации текста для сэмплирования.
+
+Запросы отправляются в OpenAI-совместимый API (POST /chat/completions
+с stream=true: Ollama, vLLM, llama.cpp server и т.п.) через один
+httpx.AsyncClient. Фрагменты ответа читаются из потока Server-Sent Events
+по мере того, как их запрашивает потребитель, поэтому медленный клиент
+не заставляет буферизовать ответ модели. Закрытие генератора закрывает
+HTTP ответ, и сервер модели прекращает генерацию.
+"""
+
+import json
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+
+# Причины остановки OpenAI API в терминах MCP
+STOP_REASONS = {"stop": "endTurn", "length": "maxTokens"}
+
+
+def _message_text(content: Any) -> str:
+    """Текст сообщения MCP: строка, фрагмент или список фрагментов."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, dict):
+        return content.get("text") or ""
+    if isinstance(content, list):
+        return "".join(_message_text(part) for part in content)
+    return ""
+
+
+class LLMClient:
+    """
+    Клиент OpenAI-совместимого API генерации текста.
+
+    Attributes:
+        base_url: URL API (например, http://localhost:11434/v1)
+        model: Модель по умолчанию
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        api_key: Optional[str] = None,
+        timeout: float = 60.0,
+    ) -> None:
+        """
+        Инициализирует клиент.
+
+        Args:
+            base_url: URL API
+            model: Модель по умолчанию
+            api_key: Ключ API (заголовок Authorization: Bearer)
+            timeout: Секунд ожидания соединения и очередного фрагмента
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Общий HTTP клиент"""
+        if self._client is None or self._client.is_closed:
+            headers = {}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Закрывает HTTP клиент"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def stream(
+        self, request: Dict[str, Any]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Генерирует ответ на запрос сэмплирования по фрагментам.
+
+        Args:
+            request: Запрос сэмплирования MCP (messages, systemPrompt,
+                maxTokens, temperature, stopSequences)
+
+        Yields:
+            Dict[str, Any]: Фрагменты {"text": ...}; последний фрагмент
+                содержит "stop_reason"
+
+        Raises:
+            httpx.HTTPError: Если API недоступно или вернуло ошибку
+        """
+        stop_reason = "endTurn"
+        async with self.client.stream(
+            "POST", "/chat/completions", json=self._payload(request)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    break
+                for choice in json.loads(data).get("choices") or []:
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        yield {"text": text}
+                    finish_reason = choice.get("finish_reason")
+                    if finish_reason:
+                        stop_reason = STOP_REASONS.get(finish_reason, finish_reason)
+
+        yield {"text": "", "stop_reason": stop_reason}
+
+    def _payload(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Тело запроса /chat/completions из запроса сэмплирования MCP."""
+        messages: List[Dict[str, str]] = []
+        if request.get("systemPrompt"):
+            messages.append({"role": "system", "content": request["systemPrompt"]})
+        for message in request.get("messages", []):
+            messages.append(
+                {
+                    "role": message.get("role", "user"),
+                    "content": _message_text(message.get("content")),
+                }
+            )
+
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "stream": True,
+        }
+        if request.get("maxTokens"):
+            payload["max_tokens"] = request["maxTokens"]
+        if request.get("temperature") is not None:
+            payload["temperature"] = request["temperature"]
+        if request.get("stopSequences"):
+            payload["stop"] = request["stopSequences"]
+        return payload
+
+
+# Создаем глобальный экземпляр
+llm_client = LLMClient(
+    settings.SAMPLING_API_URL,
+    settings.SAMPLING_MODEL,
+    api_key=settings.SAMPLING_API_KEY,
+    timeout=settings.SAMPLING_TIMEOUT,
+)
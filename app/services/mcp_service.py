@@ -1,9 +1,17 @@
 """MCP Service module."""
 
+import asyncio
 from asyncio import Queue
-from typing import Any, Optional
-
-from app.core.errors import MCPError
+from typing import Any, AsyncGenerator, Optional
+
+from app.core.config import settings
+from app.core.errors import (
+    MCPError,
+    ToolError,
+    ToolOverloadedError,
+    ToolTimeoutError,
+)
+from app.core.rate_limit import rate_limiter
 from app.models.mcp import (
     Message,
     MessageRole,
@@ -12,6 +20,7 @@ from app.models.mcp import (
     SamplingResponse,
 )
 from app.models.mcp.tool import Tool
+from app.services.tool_executor import tool_executor
 from app.storage.base import BaseStorage
 from app.storage.elasticsearch import ElasticsearchStorage
 from app.storage.redis import RedisStorage
@@ -130,10 +139,68 @@ class MCPService:
         """Execute a tool."""
         try:
             tool = self.registry.get_tool(tool_name)
-            result = await tool.execute(params)
+            result = await tool_executor.execute(tool, params)
             return {"success": True, "result": result}
+        except (ToolTimeoutError, ToolOverloadedError):
+            raise
+        except MCPError as err:
+            raise ToolError(f"Tool execution failed: {err}") from err
+
+    def execute_tools(
+        self, calls: list[dict], client: Optional[str] = None
+    ) -> AsyncGenerator[dict, None]:
+        """Execute tool calls concurrently, yielding results as they finish.
+
+        Calls share the per-tool limits of the tool executor. A failed call
+        yields {"index", "name", "success": False, "error"} and does not
+        affect the others. Closing the iterator cancels unfinished calls.
+        The batch size is validated eagerly, before iteration starts.
+        """
+        if len(calls) > settings.TOOL_BATCH_MAX_CALLS:
+            raise ValueError(
+                f"Too many calls in batch: {len(calls)}, "
+                f"maximum is {settings.TOOL_BATCH_MAX_CALLS}"
+            )
+        return self._execute_batch(calls, client)
+
+    async def _execute_batch(
+        self, calls: list[dict], client: Optional[str]
+    ) -> AsyncGenerator[dict, None]:
+        """Run batch calls as tasks and yield them in completion order."""
+        tasks = [
+            asyncio.create_task(self._execute_call(index, call, client))
+            for index, call in enumerate(calls)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _execute_call(
+        self, index: int, call: dict, client: Optional[str]
+    ) -> dict:
+        """Execute a single call of a batch, capturing its error."""
+        name = call.get("name", "")
+        try:
+            if name not in self.registry.tools:
+                raise ToolError(f"Tool '{name}' not found", {"tool": name})
+            if client is not None and settings.RATE_LIMIT_ENABLED:
+                allowed, retry_after = await rate_limiter.acquire_tool(name, client)
+                if not allowed:
+                    raise MCPError(
+                        "rate_limited",
+                        "Too Many Requests",
+                        {"tool": name, "retry_after": retry_after},
+                    )
+            response = await self.execute_tool(name, call.get("parameters") or {})
+            return {"index": index, "name": name, **response}
         except MCPError as err:
-            raise MCPError(f"Tool execution failed: {err}") from err
+            error = err.to_dict()
+        except Exception as err:
+            error = {"code": "tool_error", "message": str(err), "details": {}}
+        return {"index": index, "name": name, "success": False, "error": error}
 
     async def process_message(
         self,
@@ -211,6 +278,30 @@ class MCPService:
         except MCPError as err:
             raise MCPError(f"Sampling request failed: {err}") from err
 
+    def stream_sampling(self, request: Any) -> AsyncGenerator[dict, None]:
+        """Stream sampling deltas from the default sampler.
+
+        Deltas are requested from the sampler only as the consumer reads
+        them, and closing the iterator closes the sampler's generator.
+        A missing sampler is reported eagerly, before iteration starts.
+        """
+        sampler, request = self._get_default_sampler(request)
+        return sampler.stream(request)
+
+    async def create_sampling(self, request: Any) -> dict:
+        """Create a full sampling response with the default sampler."""
+        sampler, request = self._get_default_sampler(request)
+        return await sampler.sample(request)
+
+    def _get_default_sampler(self, request: Any) -> tuple:
+        """Return the default sampler and the request as a dict."""
+        sampler = self.registry.samplers.get("default")
+        if sampler is None:
+            raise NotImplementedError("No sampler registered")
+        if hasattr(request, "model_dump"):
+            request = request.model_dump(mode="json", exclude_none=True)
+        return sampler, request
+
     async def execute_graphql(self, query: str, variables: dict) -> dict:
         """Execute a GraphQL query."""
         try:
@@ -0,0 +1,258 @@
+"""
+Подписки на изменения ресурсов.
+
+Ресурс публикует новое состояние вызовом publish, не создавая задач и не
+дожидаясь подписчиков. У каждого подписчика для каждого URI хранится
+только последнее недоставленное состояние: если подписчик не успевает
+получать обновления, промежуточные состояния заменяются последним
+(coalescing). Поэтому память подписчика ограничена числом его подписок,
+а не частотой обновлений.
+
+Подписчик может запросить разностные обновления: для состояний-словарей
+доставляются только измененные и удаленные ключи относительно последнего
+доставленного ему состояния.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_UPDATES = Counter(
+    "resource_updates_total",
+    "Обновления ресурсов, опубликованные для подписчиков",
+)
+RESOURCE_UPDATES_COALESCED = Counter(
+    "resource_updates_coalesced_total",
+    "Недоставленные обновления ресурсов, замененные более новыми",
+)
+RESOURCE_SUBSCRIPTIONS = Gauge(
+    "resource_subscriptions",
+    "Активные подписки на ресурсы",
+)
+
+Deliver = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def diff_state(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """
+    Вычисляет разницу между состояниями ресурса.
+
+    Args:
+        old: Предыдущее состояние
+        new: Новое состояние
+
+    Returns:
+        Optional[Dict[str, Any]]: Измененные ключи (changed) и удаленные
+            ключи (removed) или None, если состояния не словари
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return None
+    return {
+        "changed": {
+            key: value
+            for key, value in new.items()
+            if key not in old or old[key] != value
+        },
+        "removed": [key for key in old if key not in new],
+    }
+
+
+class Subscriber:
+    """
+    Подписчик на изменения ресурсов с доставкой последнего состояния.
+
+    Attributes:
+        uris: URI ресурсов, на которые оформлена подписка
+    """
+
+    def __init__(self, deliver: Deliver) -> None:
+        """
+        Инициализирует подписчика.
+
+        Args:
+            deliver: Функция доставки уведомления клиенту. Пока она
+                выполняется, новые состояния накапливаются с заменой
+        """
+        self.deliver = deliver
+        self.uris: Dict[str, bool] = {}
+        self._pending: "OrderedDict[str, Any]" = OrderedDict()
+        self._delivered: Dict[str, Any] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def push(self, uri: str, state: Any) -> None:
+        """
+        Добавляет состояние ресурса к доставке, заменяя недоставленное.
+
+        Args:
+            uri: URI ресурса
+            state: Новое состояние
+        """
+        if uri in self._pending:
+            RESOURCE_UPDATES_COALESCED.inc()
+        self._pending[uri] = state
+        self._ready.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def forget(self, uri: str) -> None:
+        """
+        Удаляет недоставленное и доставленное состояние ресурса.
+
+        Args:
+            uri: URI ресурса
+        """
+        self._pending.pop(uri, None)
+        self._delivered.pop(uri, None)
+
+    async def close(self) -> None:
+        """Останавливает доставку уведомлений."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        """Доставляет уведомления, пока подписчик не закрыт."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._pending:
+                uri, state = self._pending.popitem(last=False)
+                try:
+                    await self.deliver(self._notification(uri, state))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Не удалось доставить обновление {uri}: {e}")
+                    continue
+                if uri in self.uris:
+                    self._delivered[uri] = state
+
+    def _notification(self, uri: str, state: Any) -> Dict[str, Any]:
+        """Формирует уведомление: разностное или с полным состоянием."""
+        if self.uris.get(uri) and uri in self._delivered:
+            diff = diff_state(self._delivered[uri], state)
+            if diff is not None:
+                return {"uri": uri, "diff": diff}
+        return {"uri": uri, "state": state}
+
+
+class SubscriptionManager:
+    """
+    Реестр подписок на ресурсы процесса.
+
+    Хранит последнее опубликованное состояние ресурсов, на которые есть
+    подписчики, чтобы новый подписчик сразу получал текущее состояние.
+    Состояние удаляется вместе с последней подпиской на ресурс, поэтому
+    память реестра ограничена числом ресурсов с подписчиками.
+
+    Attributes:
+        max_subscriptions: Максимальное число подписок одного подписчика
+    """
+
+    def __init__(self, max_subscriptions: Optional[int] = None) -> None:
+        """
+        Инициализирует реестр.
+
+        Args:
+            max_subscriptions: Максимальное число подписок одного подписчика
+                (по умолчанию SUBSCRIPTION_MAX_PER_SUBSCRIBER)
+        """
+        self.max_subscriptions = (
+            max_subscriptions or settings.SUBSCRIPTION_MAX_PER_SUBSCRIBER
+        )
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._latest: Dict[str, Any] = {}
+
+    def publish(self, uri: str, state: Any) -> None:
+        """
+        Публикует новое состояние ресурса для подписчиков.
+
+        Args:
+            uri: URI ресурса
+            state: Новое состояние (сериализуемое в JSON)
+        """
+        RESOURCE_UPDATES.inc()
+        subscribers = self._subscribers.get(uri)
+        if not subscribers:
+            return
+        self._latest[uri] = state
+        for subscriber in subscribers:
+            subscriber.push(uri, state)
+
+    def subscribe(self, subscriber: Subscriber, uri: str, diff: bool = False) -> None:
+        """
+        Подписывает на изменения ресурса.
+
+        Args:
+            subscriber: Подписчик
+            uri: URI ресурса
+            diff: Доставлять разностные обновления
+
+        Raises:
+            ValueError: Если превышено число подписок подписчика
+        """
+        if (
+            uri not in subscriber.uris
+            and len(subscriber.uris) >= self.max_subscriptions
+        ):
+            raise ValueError(
+                f"Превышено число подписок: максимум {self.max_subscriptions}"
+            )
+
+        if uri not in subscriber.uris:
+            RESOURCE_SUBSCRIPTIONS.inc()
+        subscriber.uris[uri] = diff
+        self._subscribers.setdefault(uri, set()).add(subscriber)
+        if uri in self._latest:
+            subscriber.push(uri, self._latest[uri])
+
+    def unsubscribe(self, subscriber: Subscriber, uri: str) -> bool:
+        """
+        Отменяет подписку на ресурс.
+
+        Args:
+            subscriber: Подписчик
+            uri: URI ресурса
+
+        Returns:
+            bool: Была ли подписка
+        """
+        if subscriber.uris.pop(uri, None) is None:
+            return False
+
+        RESOURCE_SUBSCRIPTIONS.dec()
+        subscriber.forget(uri)
+        subscribers = self._subscribers.get(uri)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[uri]
+                self._latest.pop(uri, None)
+        return True
+
+    async def remove(self, subscriber: Subscriber) -> None:
+        """
+        Отменяет все подписки подписчика и останавливает доставку.
+
+        Args:
+            subscriber: Подписчик
+        """
+        for uri in list(subscriber.uris):
+            self.unsubscribe(subscriber, uri)
+        await subscriber.close()
+
+
+# Создаем глобальный экземпляр
+resource_subscriptions = SubscriptionManager()
@@ -0,0 +1,181 @@
+"""
+Исполнитель инструментов MCP с ограничением параллелизма.
+
+Для каждого инструмента действует свой семафор (число одновременных
+вызовов) и ограниченная очередь ожидающих вызовов. Вызов, не
+поместившийся в очередь, сразу отклоняется с ToolOverloadedError, а не
+копится в памяти. Таймаут охватывает ожидание в очереди и выполнение:
+при его истечении вызов отменяется и поднимается ToolTimeoutError.
+Отмена вызывающей стороны (например, разрыв соединения клиента)
+распространяется на выполняющийся инструмент.
+
+Ограничения задаются атрибутами инструмента max_concurrency, max_queue
+и timeout, а при их отсутствии — настройками TOOL_MAX_CONCURRENCY,
+TOOL_MAX_QUEUE и TOOL_TIMEOUT.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.errors import ToolOverloadedError, ToolTimeoutError
+
+TOOL_QUEUE_WAIT_SECONDS = Histogram(
+    "tool_queue_wait_seconds",
+    "Время ожидания свободного слота инструмента",
+    ["tool"],
+)
+TOOL_EXECUTION_SECONDS = Histogram(
+    "tool_execution_seconds",
+    "Время выполнения инструмента",
+    ["tool"],
+)
+TOOL_QUEUE_DEPTH = Gauge(
+    "tool_queue_depth",
+    "Вызовы инструмента, ожидающие свободного слота",
+    ["tool"],
+)
+TOOL_REJECTIONS = Counter(
+    "tool_rejections_total",
+    "Вызовы инструмента, отклоненные исполнителем",
+    ["tool", "reason"],
+)
+
+
+class _ToolSlot:
+    """Семафор и счетчики вызовов одного инструмента."""
+
+    def __init__(self, max_concurrency: int, max_queue: int) -> None:
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_queue = max_queue
+        # Принятые вызовы (выполняемые и ожидающие) учитываются синхронно
+        # при входе в execute, до запуска задачи wait_for: иначе вызовы
+        # одной пачки проходят проверку раньше, чем любой из них встанет
+        # в очередь
+        self.capacity = max_concurrency + max_queue
+        self.admitted = 0
+
+
+class ToolExecutor:
+    """
+    Исполнитель вызовов инструментов.
+
+    Attributes:
+        max_concurrency: Число одновременных вызовов инструмента по умолчанию
+        max_queue: Число ожидающих вызовов инструмента по умолчанию
+        timeout: Таймаут вызова по умолчанию в секундах
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Инициализирует исполнитель.
+
+        Args:
+            max_concurrency: Число одновременных вызовов инструмента
+                (по умолчанию TOOL_MAX_CONCURRENCY)
+            max_queue: Число ожидающих вызовов инструмента
+                (по умолчанию TOOL_MAX_QUEUE)
+            timeout: Таймаут вызова в секундах, 0 — без таймаута
+                (по умолчанию TOOL_TIMEOUT)
+        """
+        self.max_concurrency = max_concurrency or settings.TOOL_MAX_CONCURRENCY
+        self.max_queue = settings.TOOL_MAX_QUEUE if max_queue is None else max_queue
+        self.timeout = settings.TOOL_TIMEOUT if timeout is None else timeout
+        self._slots: Dict[str, _ToolSlot] = {}
+
+    async def execute(
+        self,
+        tool: Any,
+        parameters: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Выполняет инструмент с учетом его ограничений.
+
+        Args:
+            tool: Инструмент с методом execute
+            parameters: Параметры вызова
+            timeout: Таймаут вызова в секундах (по умолчанию атрибут
+                timeout инструмента или таймаут исполнителя)
+
+        Returns:
+            Any: Результат выполнения инструмента
+
+        Raises:
+            ToolOverloadedError: Если очередь вызовов инструмента заполнена
+            ToolTimeoutError: Если вызов не завершился за отведенное время
+        """
+        name = tool.name
+        slot = self._slot(tool)
+        if slot.admitted >= slot.capacity:
+            TOOL_REJECTIONS.labels(name, "overloaded").inc()
+            raise ToolOverloadedError(
+                f"Инструмент {name} перегружен, повторите запрос позже",
+                {"tool": name, "max_queue": slot.max_queue},
+            )
+
+        if timeout is None:
+            timeout = getattr(tool, "timeout", None)
+        if timeout is None:
+            timeout = self.timeout
+
+        slot.admitted += 1
+        try:
+            return await asyncio.wait_for(
+                self._run(tool, slot, parameters), timeout or None
+            )
+        except asyncio.TimeoutError:
+            TOOL_REJECTIONS.labels(name, "timeout").inc()
+            raise ToolTimeoutError(
+                f"Инструмент {name} не завершился за {timeout} с",
+                {"tool": name, "timeout": timeout},
+            ) from None
+        finally:
+            slot.admitted -= 1
+
+    async def _run(self, tool: Any, slot: _ToolSlot, parameters: Dict[str, Any]) -> Any:
+        """Ждет свободный слот и выполняет инструмент."""
+        name = tool.name
+        queued = time.perf_counter()
+        TOOL_QUEUE_DEPTH.labels(name).inc()
+        try:
+            await slot.semaphore.acquire()
+        finally:
+            TOOL_QUEUE_DEPTH.labels(name).dec()
+
+        try:
+            started = time.perf_counter()
+            TOOL_QUEUE_WAIT_SECONDS.labels(name).observe(started - queued)
+            try:
+                return await tool.execute(parameters)
+            finally:
+                TOOL_EXECUTION_SECONDS.labels(name).observe(
+                    time.perf_counter() - started
+                )
+        finally:
+            slot.semaphore.release()
+
+    def _slot(self, tool: Any) -> _ToolSlot:
+        """Возвращает слот инструмента, создавая его при первом вызове."""
+        slot = self._slots.get(tool.name)
+        if slot is None:
+            max_concurrency = getattr(tool, "max_concurrency", None)
+            max_queue = getattr(tool, "max_queue", None)
+            slot = _ToolSlot(
+                max_concurrency or self.max_concurrency,
+                self.max_queue if max_queue is None else max_queue,
+            )
+            self._slots[tool.name] = slot
+        return slot
+
+
+# Создаем глобальный экземпляр
+tool_executor = ToolExecutor()
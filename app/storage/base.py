@@ -1,6 +1,9 @@
+import hashlib
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional, Protocol
 
+from .read_through import ReadThroughCache
+
 
 class StorageProtocol(Protocol):
     """Протокол для хранилища данных"""
@@ -22,6 +25,17 @@ class BaseStorage(ABC):
     def __init__(self, es_storage, redis_storage):
         self.es = es_storage
         self.redis = redis_storage
+        # Чтения из ES проходят через кэш с защитой от лавины запросов.
+        # Его общий уровень — ключи prompt:/resource: RedisStorage, которые
+        # читаются через ближний кэш и инвалидируются при записи. Уровень
+        # процесса для них не используется: запись в другом процессе его
+        # не очищает, а копию в памяти процесса держит ближний кэш
+        self.cache = ReadThroughCache(
+            redis_storage.redis,
+            read=redis_storage.read,
+            write=redis_storage.set,
+            shared_prefixes=("prompt:", "resource:"),
+        )
 
     async def initialize(self) -> None:
         """Инициализация хранилища"""
@@ -35,45 +49,46 @@ class BaseStorage(ABC):
     # Методы для работы с промптами
     async def get_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
         """Получение промпта"""
-        # Пробуем получить из кэша
-        prompt = await self.redis.get_cached_prompt(prompt_id)
-        if prompt:
-            return prompt
-
-        # Если нет в кэше, получаем из ES
-        prompt = await self.es.get_prompt(prompt_id)
-        if prompt:
-            # Кэшируем результат
-            await self.redis.cache_prompt(prompt_id, prompt)
-        return prompt
+        return await self.cache.get(
+            f"prompt:{prompt_id}", lambda: self.es.get_prompt(prompt_id)
+        )
 
     async def save_prompt(self, prompt_data: Dict[str, Any]) -> str:
         """Сохранение промпта"""
         # Сохраняем в ES
         prompt_id = await self.es.index_prompt(prompt_data)
-        # Кэшируем
+        # Кэшируем: запись заменяет значение read-through кэша
         await self.redis.cache_prompt(prompt_id, prompt_data)
         return prompt_id
 
     async def search_prompts(self, query: str, size: int = 10) -> List[Dict[str, Any]]:
-        """Поиск промптов"""
-        return await self.es.search_prompts(query, size)
+        """Поиск промптов
+
+        Ключ кэша включает поколение индекса промптов, поэтому после
+        индексации промпта результаты поиска загружаются заново.
+        """
+        try:
+            generation = await self.redis.get_index_generation(
+                self.es.indices["prompts"]
+            )
+        except Exception as e:
+            print(f"Error getting prompts index generation: {e}")
+            return await self.es.search_prompts(query, size)
+
+        digest = hashlib.sha256(f"{size}:{query}".encode()).hexdigest()
+        return await self.cache.get(
+            f"rt:search_prompts:{generation}:{digest}",
+            lambda: self.es.search_prompts(query, size),
+        )
 
     # Методы для работы с ресурсами
     async def get_resource(self, resource_uri: str) -> Optional[Dict[str, Any]]:
         """Получение ресурса"""
-        # Пробуем получить из кэша
-        resource = await self.redis.get_cached_resource(resource_uri)
-        if resource:
-            # Увеличиваем счетчик использования
-            await self.redis.increment_resource_usage(resource_uri)
-            return resource
-
-        # Если нет в кэше, получаем из ES
-        resource = await self.es.get_resource(resource_uri)
+        resource = await self.cache.get(
+            f"resource:{resource_uri}",
+            lambda: self.es.get_resource(resource_uri),
+        )
         if resource:
-            # Кэшируем результат
-            await self.redis.cache_resource(resource_uri, resource)
             # Увеличиваем счетчик использования
             await self.redis.increment_resource_usage(resource_uri)
         return resource
@@ -82,7 +97,7 @@ class BaseStorage(ABC):
         """Сохранение ресурса"""
         # Сохраняем в ES
         resource_id = await self.es.index_resource(resource_data)
-        # Кэшируем
+        # Кэшируем: запись заменяет значение read-through кэша
         await self.redis.cache_resource(resource_data["uri"], resource_data)
         return resource_id
 
@@ -98,8 +113,7 @@ class BaseStorage(ABC):
         success = await self.es.delete_resource(resource_uri)
         if success:
             # Удаляем из кэша
-            key = f"resource:{resource_uri}"
-            await self.redis.delete(key)
+            await self.redis.delete(f"resource:{resource_uri}")
         return success
 
     # Методы для работы с сессиями
@@ -1,16 +1,24 @@
-import os
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from elasticsearch import AsyncElasticsearch, NotFoundError
+from elasticsearch.helpers import async_scan
+
+from app.core.config import settings
+from app.storage.es_client import SharedHttpxNode
+from app.storage.redis import redis_storage
+from app.storage.vector_index import vector_indexes
 
 
 class ElasticsearchStorage:
     """Класс для работы с Elasticsearch"""
 
     def __init__(self):
+        # Соединения берутся из общего пула es_http_client
         self.es = AsyncElasticsearch(
-            [os.getenv("ELASTICSEARCH_URL", "http://elasticsearch:9200")]
+            [settings.ELASTICSEARCH_URL],
+            node_class=SharedHttpxNode,
+            request_timeout=settings.ELASTICSEARCH_TIMEOUT,
         )
         self.indices = {"prompts": "mcp_prompts", "resources": "mcp_resources"}
 
@@ -24,7 +32,7 @@ class ElasticsearchStorage:
                     "description": {"type": "text"},
                     "content": {"type": "text"},
                     "arguments": {"type": "nested"},
-                    "vector": {"type": "dense_vector", "dims": 384},
+                    "embedding": {"type": "dense_vector", "dims": 384},
                     "created_at": {"type": "date"},
                     "updated_at": {"type": "date"},
                 }
@@ -39,7 +47,7 @@ class ElasticsearchStorage:
                     "name": {"type": "text"},
                     "content": {"type": "text"},
                     "mime_type": {"type": "keyword"},
-                    "vector": {"type": "dense_vector", "dims": 384},
+                    "embedding": {"type": "dense_vector", "dims": 384},
                     "metadata": {"type": "object"},
                 }
             }
@@ -57,6 +65,79 @@ class ElasticsearchStorage:
         """Закрытие соединения"""
         await self.es.close()
 
+    # Общие методы
+    async def search(self, index: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Поиск по произвольному индексу"""
+        return await self.es.search(index=index, body=body)
+
+    async def index(
+        self, index: str, document: Dict[str, Any], id: Optional[str] = None
+    ) -> str:
+        """Индексация документа в произвольный индекс"""
+        result = await self.es.index(index=index, document=document, id=id)
+        await self._bump_generation(index)
+        return result["_id"]
+
+    async def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Массовая операция (_bulk) одним запросом"""
+        result = await self.es.bulk(operations=operations)
+        indices = {
+            meta["_index"]
+            for operation in operations
+            for meta in operation.values()
+            if isinstance(meta, dict) and "_index" in meta
+        }
+        for index in indices:
+            await self._bump_generation(index)
+        await self._add_bulk_vectors(operations, result.get("items", []))
+        return result
+
+    async def _add_bulk_vectors(
+        self, operations: List[Dict[str, Any]], items: List[Dict[str, Any]]
+    ) -> None:
+        """Добавление векторов проиндексированных документов в локальные индексы"""
+        vectors: Dict[str, Dict[str, Any]] = {}
+        position = 0
+        for item in items:
+            action, outcome = next(iter(item.items()))
+            document = None
+            if action != "delete":
+                position += 1
+                document = operations[position]
+            position += 1
+
+            vector = (document or {}).get(settings.VECTOR_SEARCH_FIELD)
+            if action in ("index", "create") and vector and outcome["status"] < 300:
+                vectors.setdefault(outcome["_index"], {})[outcome["_id"]] = vector
+
+        for index, documents in vectors.items():
+            await vector_indexes.add(index, list(documents), list(documents.values()))
+
+    async def _bump_generation(self, index: str) -> None:
+        """Инвалидация кэшей поиска по индексу после записи"""
+        try:
+            await redis_storage.bump_index_generation(index)
+        except Exception as e:
+            print(f"Error bumping generation of index {index}: {e}")
+
+    async def mget(self, index: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Получение документов по списку ID одним запросом"""
+        result = await self.es.mget(index=index, ids=ids)
+        return {doc["_id"]: doc["_source"] for doc in result["docs"] if doc["found"]}
+
+    async def scan(
+        self,
+        index: str,
+        query: Optional[Dict[str, Any]] = None,
+        source: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Постраничный обход всех документов индекса"""
+        body: Dict[str, Any] = {"query": query or {"match_all": {}}}
+        if source is not None:
+            body["_source"] = source
+        async for hit in async_scan(self.es, index=index, query=body):
+            yield hit
+
     # Методы для работы с промптами
     async def index_prompt(self, prompt_data: Dict[str, Any]) -> str:
         """Индексация промпта"""
@@ -66,6 +147,7 @@ class ElasticsearchStorage:
         result = await self.es.index(
             index=self.indices["prompts"], document=prompt_data
         )
+        await self._bump_generation(self.indices["prompts"])
         return result["_id"]
 
     async def get_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
@@ -100,6 +182,11 @@ class ElasticsearchStorage:
         result = await self.es.index(
             index=self.indices["resources"], document=resource_data
         )
+        await self._bump_generation(self.indices["resources"])
+        # Обновляем локальный векторный индекс, если он построен
+        vector = resource_data.get(settings.VECTOR_SEARCH_FIELD)
+        if vector:
+            await vector_indexes.add(self.indices["resources"], [result["_id"]], vector)
         return result["_id"]
 
     async def get_resource(self, resource_uri: str) -> Optional[Dict[str, Any]]:
@@ -136,11 +223,20 @@ class ElasticsearchStorage:
 
     async def delete_resource(self, resource_uri: str) -> bool:
         """Удаление ресурса"""
+        index = self.indices["resources"]
+        query = {"term": {"uri.keyword": resource_uri}}
         try:
-            await self.es.delete_by_query(
-                index=self.indices["resources"],
-                body={"query": {"term": {"uri.keyword": resource_uri}}},
-            )
+            # ID нужны для удаления из локального векторного индекса
+            ids: List[str] = []
+            if await vector_indexes.get(index) is not None:
+                found = await self.es.search(
+                    index=index, body={"query": query, "_source": False, "size": 1000}
+                )
+                ids = [hit["_id"] for hit in found["hits"]["hits"]]
+
+            await self.es.delete_by_query(index=index, body={"query": query})
+            await vector_indexes.remove(index, ids)
+            await self._bump_generation(index)
             return True
         except Exception as e:
             print(f"Error deleting resource {resource_uri}: {e}")
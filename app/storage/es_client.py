@@ -0,0 +1,184 @@
+"""
+Общий пул HTTP соединений с Elasticsearch.
+
+Стратегии поиска, ElasticsearchStorage и менеджер эмбеддингов работают
+через один httpx.AsyncClient: соединения переиспользуются (keep-alive),
+их число ограничено настройками, а загрузка пула экспортируется в Prometheus.
+"""
+
+import importlib.util
+import time
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+from elastic_transport import HttpxAsyncHttpNode
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+
+ES_HTTP_IN_FLIGHT = Gauge(
+    "es_http_requests_in_flight", "Запросы к Elasticsearch, занимающие соединение"
+)
+ES_HTTP_SATURATION = Gauge(
+    "es_http_pool_saturation", "Доля занятых соединений пула Elasticsearch"
+)
+ES_HTTP_CONNECTIONS = Gauge(
+    "es_http_connections", "Открытые соединения с Elasticsearch", ["state"]
+)
+ES_HTTP_POOL_TIMEOUTS = Counter(
+    "es_http_pool_timeouts_total",
+    "Запросы, не дождавшиеся свободного соединения с Elasticsearch",
+)
+ES_HTTP_REQUEST_SECONDS = Histogram(
+    "es_http_request_seconds", "Длительность запроса к Elasticsearch", ["method"]
+)
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Тело ответа, освобождающее слот пула после чтения."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Any) -> None:
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    Транспорт httpx с метриками загрузки пула соединений.
+
+    Запрос считается активным от отправки до закрытия тела ответа,
+    то есть все время, пока он занимает соединение.
+    """
+
+    def __init__(self, limits: httpx.Limits, **kwargs: Any) -> None:
+        super().__init__(limits=limits, **kwargs)
+        self.max_connections = limits.max_connections or 0
+        self._in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._update(-1)
+                ES_HTTP_REQUEST_SECONDS.labels(request.method).observe(
+                    time.perf_counter() - start
+                )
+
+        self._update(1)
+        try:
+            response = await super().handle_async_request(request)
+        except httpx.PoolTimeout:
+            ES_HTTP_POOL_TIMEOUTS.inc()
+            release()
+            raise
+        except BaseException:
+            release()
+            raise
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    def _update(self, delta: int) -> None:
+        """Обновляет метрики пула."""
+        self._in_flight += delta
+        ES_HTTP_IN_FLIGHT.set(self._in_flight)
+        if self.max_connections:
+            ES_HTTP_SATURATION.set(self._in_flight / self.max_connections)
+
+        connections = getattr(self._pool, "connections", [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        ES_HTTP_CONNECTIONS.labels("idle").set(idle)
+        ES_HTTP_CONNECTIONS.labels("active").set(len(connections) - idle)
+
+
+class ElasticsearchHTTPClient:
+    """
+    Владелец общего httpx.AsyncClient для Elasticsearch.
+
+    Клиент создается при первом обращении. HTTP/2 включается, если
+    установлен пакет h2 (httpx согласует его через ALPN для https).
+
+    Attributes:
+        base_url: URL Elasticsearch
+    """
+
+    def __init__(self, base_url: str) -> None:
+        """
+        Инициализирует владельца клиента.
+
+        Args:
+            base_url: URL Elasticsearch
+        """
+        self.base_url = base_url.rstrip("/")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Общий HTTP клиент"""
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=settings.ELASTICSEARCH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ELASTICSEARCH_MAX_KEEPALIVE,
+                keepalive_expiry=settings.ELASTICSEARCH_KEEPALIVE_EXPIRY,
+            )
+            http2 = importlib.util.find_spec("h2") is not None
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                transport=InstrumentedTransport(limits=limits, http2=http2),
+                timeout=httpx.Timeout(
+                    settings.ELASTICSEARCH_TIMEOUT,
+                    connect=settings.ELASTICSEARCH_CONNECT_TIMEOUT,
+                    pool=settings.ELASTICSEARCH_POOL_TIMEOUT,
+                ),
+                http2=http2,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Закрывает общий клиент и все соединения пула."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class SharedHttpxNode(HttpxAsyncHttpNode):
+    """
+    Узел elastic_transport поверх общего HTTP клиента.
+
+    Позволяет AsyncElasticsearch использовать тот же пул соединений,
+    что и стратегии поиска. Клиент закрывает его владелец, а не узел.
+    """
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return es_http_client.client
+
+    @client.setter
+    def client(self, value: httpx.AsyncClient) -> None:
+        # Собственный клиент, создаваемый базовым классом, не используется
+        pass
+
+    async def close(self) -> None:  # type: ignore[override]
+        pass
+
+
+# Создаем глобальный экземпляр
+es_http_client = ElasticsearchHTTPClient(settings.ELASTICSEARCH_URL)
@@ -0,0 +1,211 @@
+"""
+Ближний кэш (near cache) для чтений из Redis.
+
+Значения редко меняющихся ключей (промпты, ресурсы, сессии — префиксы
+prompt:, resource:, session:) хранятся в памяти процесса. При записи
+такого ключа RedisStorage публикует его имя в канал cache:invalidate тем
+же пайплайном, что и саму запись, а каждый процесс, подписанный на канал,
+удаляет ключ из своего кэша. Записи остальных ключей (эмбеддинги, кэш
+поиска) сообщений не порождают.
+
+Чтение, начавшееся до инвалидации ключа, не сохраняет прочитанное
+значение в кэш: у ключей с чтениями в пути есть версия, которую
+увеличивает инвалидация. Инвалидация одного ключа не мешает чтениям
+других.
+
+Истечение ключа в Redis сообщений не порождает, поэтому значение живет
+в памяти процесса не дольше оставшегося времени жизни ключа (PTTL,
+читается тем же пайплайном, что и значение).
+
+Пока подписка не установлена, значения в кэш не сохраняются, а при
+потере соединения кэш очищается: пропущенное сообщение об инвалидации
+не должно оставлять устаревшие данные.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from prometheus_client import Counter
+
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+NEAR_CACHE_REQUESTS = Counter(
+    "near_cache_requests_total",
+    "Обращения к ближнему кэшу Redis",
+    ["result"],
+)
+NEAR_CACHE_INVALIDATIONS = Counter(
+    "near_cache_invalidations_total",
+    "Ключи, удаленные из ближнего кэша по сообщению об инвалидации",
+)
+
+
+class NearCache:
+    """
+    Внутрипроцессный кэш значений Redis с инвалидацией через pub/sub.
+
+    Attributes:
+        channel: Канал сообщений об инвалидации
+        local: Внутрипроцессный кэш значений
+        prefixes: Префиксы ключей, значения которых кэшируются
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        maxsize: int,
+        ttl: float,
+        channel: str = "cache:invalidate",
+        prefixes: Tuple[str, ...] = ("prompt:", "resource:", "session:"),
+    ) -> None:
+        """
+        Инициализирует ближний кэш.
+
+        Args:
+            client: Клиент redis.asyncio с декодированием ответов
+            maxsize: Максимальное число ключей в памяти процесса
+            ttl: Максимальное время жизни значения в секундах (страховка
+                от потери сообщений при переподключении)
+            channel: Канал сообщений об инвалидации
+            prefixes: Префиксы ключей, значения которых кэшируются
+        """
+        self.client = client
+        self.channel = channel
+        self.prefixes = prefixes
+        self.local = TTLCache("near", maxsize=maxsize, ttl=ttl)
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False
+        # Версии ключей с чтениями в пути и число таких чтений: значение,
+        # прочитанное до инвалидации ключа, не сохраняется в кэш после нее
+        self._versions: Dict[str, int] = {}
+        self._readers: Dict[str, int] = {}
+        # Увеличивается при потере подписки: сообщения могли быть пропущены
+        self._generation = 0
+
+    def caches(self, key: str) -> bool:
+        """
+        Проверяет, кэшируется ли значение ключа в памяти процесса.
+
+        Args:
+            key: Ключ Redis
+
+        Returns:
+            bool: Есть ли у ключа кэшируемый префикс
+        """
+        return key.startswith(self.prefixes)
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Возвращает значение ключа из памяти процесса или из Redis.
+
+        Args:
+            key: Ключ Redis
+
+        Returns:
+            Optional[str]: Значение ключа или None
+        """
+        if not self.caches(key):
+            return await self.client.get(key)
+        self._ensure_listener()
+
+        value = self.local.get(key)
+        if value is not None:
+            NEAR_CACHE_REQUESTS.labels("hit").inc()
+            return value
+
+        NEAR_CACHE_REQUESTS.labels("miss").inc()
+        generation = self._generation
+        version = self._versions.get(key, 0)
+        self._readers[key] = self._readers.get(key, 0) + 1
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                value, pttl = await pipe.execute()
+            fresh = generation == self._generation and version == self._versions.get(
+                key, 0
+            )
+        finally:
+            self._readers[key] -= 1
+            if not self._readers[key]:
+                del self._readers[key]
+                self._versions.pop(key, None)
+        if value is not None and self._subscribed and fresh:
+            # PTTL -1: у ключа нет срока жизни
+            ttl = self.local.ttl if pttl < 0 else min(self.local.ttl, pttl / 1000)
+            if ttl > 0:
+                self.local.set(key, value, ttl=ttl)
+        return value
+
+    def invalidate(self, pipe: Any, keys: Iterable[str]) -> None:
+        """
+        Добавляет в пайплайн сообщение об инвалидации ключей.
+
+        Локальная копия удаляется сразу, остальные процессы удаляют
+        свои копии при получении сообщения. Для ключей без кэшируемого
+        префикса сообщение не отправляется.
+
+        Args:
+            pipe: Пайплайн Redis, в котором выполняется запись
+            keys: Изменяемые ключи
+        """
+        keys = [key for key in keys if self.caches(key)]
+        if not keys:
+            return
+        self._drop(keys)
+        pipe.publish(self.channel, json.dumps(keys))
+
+    async def close(self) -> None:
+        """Останавливает подписку на сообщения об инвалидации."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _ensure_listener(self) -> None:
+        """Запускает подписку при первом обращении из цикла событий."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    def _drop(self, keys: List[str]) -> None:
+        """Удаляет ключи из памяти процесса."""
+        for key in keys:
+            if key in self._readers:
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self.local.delete(key)
+
+    async def _listen(self) -> None:
+        """Получает сообщения об инвалидации, переподключаясь при сбоях."""
+        delay = 0.1
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self._subscribed = True
+                        delay = 0.1
+                    elif message["type"] == "message":
+                        keys = json.loads(message["data"])
+                        NEAR_CACHE_INVALIDATIONS.inc(len(keys))
+                        self._drop(keys)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Подписка на инвалидацию кэша прервана: {str(e)}")
+            finally:
+                # Сообщения, пришедшие без подписки, потеряны
+                self._subscribed = False
+                self._generation += 1
+                self.local.clear()
+                await pubsub.aclose()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
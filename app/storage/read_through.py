@@ -0,0 +1,381 @@
+"""
+Двухуровневый read-through кэш с защитой от лавины запросов.
+
+Значение ищется во внутрипроцессном кэше, затем в Redis и только затем
+загружается из источника (Elasticsearch). Одновременную загрузку одного
+ключа предотвращают три механизма:
+
+- single-flight: внутри процесса параллельные запросы ключа ждут одну
+  загрузку;
+- блокировка в Redis (SET NX PX): между процессами ключ загружает один
+  процесс, остальные ждут появления значения;
+- вероятностное досрочное обновление (XFetch) и stale-while-revalidate:
+  горячий ключ обновляется в фоне до истечения или сразу после него,
+  а запросы в это время получают прежнее значение.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from prometheus_client import Counter
+
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+READ_THROUGH_REQUESTS = Counter(
+    "read_through_requests_total",
+    "Обращения к read-through кэшу хранилища",
+    ["result"],
+)
+
+# Удаление блокировки, только если она принадлежит вызывающему
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+Loader = Callable[[], Awaitable[Any]]
+Reader = Callable[[str], Awaitable[Optional[str]]]
+Writer = Callable[..., Awaitable[Any]]
+
+
+def encode_entry(value: Any, ttl: float, delta: float = 0.0) -> str:
+    """
+    Сериализует значение в запись кэша со сроком свежести.
+
+    Args:
+        value: Значение
+        ttl: Время свежести в секундах
+        delta: Длительность загрузки значения в секундах
+
+    Returns:
+        str: Запись кэша в JSON
+    """
+    entry = {"v": value, "exp": time.time() + ttl, "delta": delta}
+    return json.dumps(entry, default=str)
+
+
+def decode_entry(data: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Разбирает запись кэша.
+
+    Значение, записанное без обертки (до перехода на записи со сроком
+    свежести), считается устаревшим и обновляется при следующем чтении.
+
+    Args:
+        data: Запись кэша в JSON
+
+    Returns:
+        Optional[Dict[str, Any]]: Запись с полями v, exp и delta или None
+    """
+    if not data:
+        return None
+    entry = json.loads(data)
+    if isinstance(entry, dict) and "v" in entry and "exp" in entry:
+        return entry
+    return {"v": entry, "exp": 0.0, "delta": 0.0}
+
+
+def should_refresh_early(
+    expires_at: float,
+    delta: float,
+    beta: float,
+    now: float,
+    rand: Optional[float] = None,
+) -> bool:
+    """
+    Решает, обновить ли значение до истечения (алгоритм XFetch).
+
+    Вероятность досрочного обновления растет по мере приближения к
+    сроку истечения и тем выше, чем дольше загружается значение.
+
+    Args:
+        expires_at: Время истечения значения (unix time)
+        delta: Длительность последней загрузки в секундах
+        beta: Коэффициент досрочности (1.0 — оптимальный, 0 — отключено)
+        now: Текущее время (unix time)
+        rand: Случайное число из (0, 1]
+
+    Returns:
+        bool: Нужно ли обновить значение
+    """
+    rand = rand if rand is not None else 1.0 - random.random()
+    return now - delta * beta * math.log(rand) >= expires_at
+
+
+class ReadThroughCache:
+    """
+    Read-through кэш с внутрипроцессным и общим (Redis) уровнями.
+
+    Значение в Redis хранится как {"v": значение, "exp": срок свежести,
+    "delta": длительность загрузки} и живет ttl + stale_ttl секунд: после
+    срока свежести оно еще stale_ttl секунд отдается, пока идет обновление.
+
+    Attributes:
+        ttl: Время свежести значения в секундах
+        stale_ttl: Время, в течение которого отдается устаревшее значение
+        local: Внутрипроцессный уровень кэша
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        lock_ttl: Optional[float] = None,
+        beta: Optional[float] = None,
+        local_size: Optional[int] = None,
+        local_ttl: Optional[float] = None,
+        read: Optional[Reader] = None,
+        write: Optional[Writer] = None,
+        shared_prefixes: Tuple[str, ...] = (),
+    ) -> None:
+        """
+        Инициализирует кэш.
+
+        Args:
+            client: Клиент redis.asyncio (None — только уровень процесса).
+                Используется для блокировок загрузки и по умолчанию для
+                чтения и записи значений
+            ttl: Время свежести значения (по умолчанию READ_THROUGH_TTL)
+            stale_ttl: Время отдачи устаревшего значения
+                (по умолчанию READ_THROUGH_STALE_TTL)
+            lock_ttl: Время жизни блокировки загрузки
+                (по умолчанию READ_THROUGH_LOCK_TTL)
+            beta: Коэффициент XFetch (по умолчанию READ_THROUGH_BETA)
+            local_size: Размер уровня процесса, 0 отключает уровень
+                (по умолчанию READ_THROUGH_LOCAL_SIZE)
+            local_ttl: Время жизни на уровне процесса
+                (по умолчанию READ_THROUGH_LOCAL_TTL)
+            read: Чтение значения из Redis, например через ближний кэш
+                (по умолчанию client.get)
+            write: Запись значения в Redis с аргументом ex, например с
+                инвалидацией ближнего кэша (по умолчанию client.set)
+            shared_prefixes: Префиксы изменяемых ключей, которые не хранятся
+                на уровне процесса: после записи в другом процессе этот
+                уровень отдавал бы прежнее значение до истечения local_ttl
+        """
+        self.client = client
+        self.ttl = ttl or settings.READ_THROUGH_TTL
+        self.stale_ttl = (
+            settings.READ_THROUGH_STALE_TTL if stale_ttl is None else stale_ttl
+        )
+        self.lock_ttl = lock_ttl or settings.READ_THROUGH_LOCK_TTL
+        self.beta = settings.READ_THROUGH_BETA if beta is None else beta
+        self.local = TTLCache(
+            "read_through",
+            maxsize=(
+                settings.READ_THROUGH_LOCAL_SIZE if local_size is None else local_size
+            ),
+            ttl=local_ttl or settings.READ_THROUGH_LOCAL_TTL,
+        )
+        self.shared_prefixes = shared_prefixes
+        self._read_shared = read or (client.get if client else None)
+        self._write_shared = write or (client.set if client else None)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+        self._release_lock = (
+            client.register_script(_RELEASE_LOCK_SCRIPT) if client else None
+        )
+
+    async def get(self, key: str, loader: Loader) -> Any:
+        """
+        Возвращает значение ключа, загружая его при необходимости.
+
+        Значение None не кэшируется. Если Redis недоступен, значение
+        загружается из источника с объединением запросов внутри процесса.
+
+        Args:
+            key: Ключ кэша
+            loader: Функция загрузки значения из источника
+
+        Returns:
+            Any: Значение
+        """
+        value = self.local.get(key)
+        if value is not None:
+            READ_THROUGH_REQUESTS.labels("local").inc()
+            return value
+
+        # Параллельные запросы ключа ждут одну загрузку
+        future = self._inflight.get(key)
+        if future is not None:
+            READ_THROUGH_REQUESTS.labels("coalesced").inc()
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._get_shared(key, loader)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение получают ожидающие запросы, а не цикл событий
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    async def invalidate(self, *keys: str) -> None:
+        """
+        Удаляет ключи из обоих уровней кэша.
+
+        Args:
+            keys: Ключи кэша
+        """
+        for key in keys:
+            self.local.delete(key)
+        if self.client is not None:
+            try:
+                await self.client.delete(*keys)
+            except Exception as e:
+                logger.warning(f"Не удалось инвалидировать кэш: {str(e)}")
+
+    async def _get_shared(self, key: str, loader: Loader) -> Any:
+        """Получение значения из Redis или из источника."""
+        if self.client is None:
+            READ_THROUGH_REQUESTS.labels("miss").inc()
+            value, _ = await self._load(loader)
+            if value is not None:
+                self._set_local(key, value)
+            return value
+
+        try:
+            entry = await self._read(key)
+        except Exception as e:
+            logger.warning(f"Кэш хранилища недоступен: {str(e)}")
+            READ_THROUGH_REQUESTS.labels("bypass").inc()
+            value, _ = await self._load(loader)
+            return value
+
+        if entry is not None:
+            now = time.time()
+            if now >= entry["exp"]:
+                # Устаревшее значение отдается, пока идет обновление
+                READ_THROUGH_REQUESTS.labels("stale").inc()
+                self._refresh_in_background(key, loader)
+            elif should_refresh_early(entry["exp"], entry["delta"], self.beta, now):
+                READ_THROUGH_REQUESTS.labels("early_refresh").inc()
+                self._refresh_in_background(key, loader)
+                self._set_local(key, entry["v"])
+            else:
+                READ_THROUGH_REQUESTS.labels("hit").inc()
+                self._set_local(key, entry["v"])
+            return entry["v"]
+
+        READ_THROUGH_REQUESTS.labels("miss").inc()
+        return await self._load_locked(key, loader)
+
+    async def _load_locked(self, key: str, loader: Loader) -> Any:
+        """
+        Загружает значение под блокировкой в Redis.
+
+        Процесс, не получивший блокировку, ждет значение, записанное
+        владельцем блокировки, но не дольше lock_ttl.
+        """
+        try:
+            token = await self._acquire_lock(key)
+            locked_by_other = token is None
+        except Exception as e:
+            logger.warning(f"Блокировка загрузки недоступна: {str(e)}")
+            token, locked_by_other = None, False
+
+        if locked_by_other:
+            deadline = time.monotonic() + self.lock_ttl
+            delay = 0.01
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.2)
+                entry = await self._read(key)
+                if entry is not None:
+                    self._set_local(key, entry["v"])
+                    return entry["v"]
+            # Владелец блокировки не успел: загружаем сами
+            READ_THROUGH_REQUESTS.labels("lock_timeout").inc()
+
+        try:
+            value, delta = await self._load(loader)
+            if value is not None:
+                await self._write(key, value, delta)
+            return value
+        finally:
+            if token is not None:
+                await self._release(key, token)
+
+    def _refresh_in_background(self, key: str, loader: Loader) -> None:
+        """Запускает фоновое обновление значения."""
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+
+    async def _refresh(self, key: str, loader: Loader) -> None:
+        """Обновляет значение, если ни один процесс не делает этого сейчас."""
+        try:
+            token = await self._acquire_lock(key)
+            if token is None:
+                return
+            try:
+                value, delta = await self._load(loader)
+                if value is not None:
+                    await self._write(key, value, delta)
+            finally:
+                await self._release(key, token)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить значение {key}: {str(e)}")
+
+    async def _load(self, loader: Loader) -> Tuple[Any, float]:
+        """Загружает значение из источника и замеряет длительность."""
+        start = time.perf_counter()
+        value = await loader()
+        return value, time.perf_counter() - start
+
+    async def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        """Читает запись из Redis."""
+        return decode_entry(await self._read_shared(key))
+
+    async def _write(self, key: str, value: Any, delta: float) -> None:
+        """Записывает значение в оба уровня кэша."""
+        self._set_local(key, value)
+        try:
+            await self._write_shared(
+                key,
+                encode_entry(value, self.ttl, delta),
+                ex=self.ttl + self.stale_ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить значение {key}: {str(e)}")
+
+    def _set_local(self, key: str, value: Any) -> None:
+        """Сохраняет значение на уровне процесса, если ключ там хранится."""
+        if not key.startswith(self.shared_prefixes):
+            self.local.set(key, value)
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Захватывает блокировку загрузки ключа, возвращает ее токен."""
+        token = uuid.uuid4().hex
+        acquired = await self.client.set(
+            f"lock:{key}", token, nx=True, px=int(self.lock_ttl * 1000)
+        )
+        return token if acquired else None
+
+    async def _release(self, key: str, token: str) -> None:
+        """Освобождает блокировку, если она еще принадлежит процессу."""
+        try:
+            await self._release_lock(keys=[f"lock:{key}"], args=[token])
+        except Exception as e:
+            logger.warning(f"Не удалось освободить блокировку {key}: {str(e)}")
@@ -1,24 +1,167 @@
 import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import redis.asyncio as redis
 
+from app.core.config import settings
+from app.storage.near_cache import NearCache
+from app.storage.read_through import decode_entry, encode_entry
+
+# Счетчик использования и рейтинг популярных ресурсов за один запрос
+_INCREMENT_USAGE_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+redis.call('ZADD', KEYS[2], count, ARGV[1])
+return count
+"""
+
+# Rate limit с фиксированным окном: проверка и увеличение атомарны
+_RATE_LIMIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]))
+if not current then
+    redis.call('SET', KEYS[1], 1, 'EX', ARGV[2])
+    return 1
+end
+if current >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+return 1
+"""
+
+# Token bucket: пополнение по времени сервера Redis, списание атомарно.
+# Возвращает {1, 0}, если токены списаны, иначе {0, мс до пополнения}
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, retry_after}
+"""
+
 
 class RedisStorage:
     """Класс для работы с Redis"""
 
     def __init__(self):
-        self.redis = redis.from_url(
-            os.getenv("REDIS_URL", "redis://redis:6379"),
-            encoding="utf-8",
-            decode_responses=True,
-        )
+        url = os.getenv("REDIS_URL", "redis://redis:6379")
+        self.redis = redis.from_url(url, encoding="utf-8", decode_responses=True)
+        # Клиент без декодирования ответов для бинарных значений
+        self.raw_redis = redis.from_url(url, decode_responses=False)
         self.default_ttl = 3600  # 1 час
+        # Скрипты выполняются через EVALSHA и загружаются при первом вызове
+        self._increment_usage = self.redis.register_script(_INCREMENT_USAGE_SCRIPT)
+        self._rate_limit = self.redis.register_script(_RATE_LIMIT_SCRIPT)
+        self._token_bucket = self.redis.register_script(_TOKEN_BUCKET_SCRIPT)
+        # Ближний кэш для промптов, ресурсов и сессий
+        self.near_cache: Optional[NearCache] = None
+        if settings.NEAR_CACHE_ENABLED:
+            self.near_cache = NearCache(
+                self.redis,
+                maxsize=settings.NEAR_CACHE_SIZE,
+                ttl=settings.NEAR_CACHE_TTL,
+            )
 
     async def close(self):
         """Закрытие соединения"""
+        if self.near_cache is not None:
+            await self.near_cache.close()
         await self.redis.close()
+        await self.raw_redis.close()
+
+    # Базовые операции с ключами
+    async def get(self, key: str) -> Optional[str]:
+        """Получение значения по ключу"""
+        return await self.redis.get(key)
+
+    async def set(self, key: str, value: Any, ex: Optional[int] = None) -> None:
+        """Установка значения по ключу"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, value, ex=ex)
+            self._invalidate(pipe, [key])
+            await pipe.execute()
+
+    async def delete(self, *keys: str) -> int:
+        """Удаление ключей"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            self._invalidate(pipe, keys)
+            deleted, *_ = await pipe.execute()
+        return deleted
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        """Получение значений нескольких ключей за один запрос"""
+        if not keys:
+            return []
+        return await self.redis.mget(keys)
+
+    async def mget_raw(self, keys: List[str]) -> List[Optional[bytes]]:
+        """Получение бинарных значений нескольких ключей за один запрос"""
+        if not keys:
+            return []
+        return await self.raw_redis.mget(keys)
+
+    async def set_many(self, mapping: Dict[str, Any], ex: Optional[int] = None) -> None:
+        """Установка нескольких значений одним пайплайном"""
+        if not mapping:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ex)
+            self._invalidate(pipe, list(mapping))
+            await pipe.execute()
+
+    async def read(self, key: str) -> Optional[str]:
+        """Чтение редко меняющегося ключа через ближний кэш, если он включен"""
+        if self.near_cache is not None:
+            return await self.near_cache.get(key)
+        return await self.redis.get(key)
+
+    def _invalidate(self, pipe: Any, keys: Any) -> None:
+        """Добавление в пайплайн записи сообщения об инвалидации ключей"""
+        if self.near_cache is not None:
+            self.near_cache.invalidate(pipe, keys)
+
+    # Поколения индексов для инвалидации кэшей
+    async def get_index_generation(self, index: str) -> int:
+        """Текущее поколение индекса (0, если записей еще не было)"""
+        value = await self.redis.get(f"index:generation:{index}")
+        return int(value) if value else 0
+
+    async def bump_index_generation(self, index: str) -> int:
+        """Увеличение поколения индекса после записи в него"""
+        return await self.redis.incr(f"index:generation:{index}")
+
+    def _entry(self, data: Dict[str, Any], ttl: Optional[int]) -> Tuple[str, int]:
+        """Запись кэша промпта или ресурса и время жизни ключа
+
+        Промпты и ресурсы хранятся в формате read-through кэша BaseStorage:
+        после срока свежести запись еще READ_THROUGH_STALE_TTL секунд
+        отдается, пока значение обновляется из Elasticsearch.
+        """
+        ttl = ttl or self.default_ttl
+        return encode_entry(data, ttl), ttl + settings.READ_THROUGH_STALE_TTL
+
+    @staticmethod
+    def _value(data: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Значение из записи кэша промпта или ресурса"""
+        entry = decode_entry(data)
+        return entry["v"] if entry else None
 
     # Методы для работы с промптами
     async def cache_prompt(
@@ -26,16 +169,33 @@ class RedisStorage:
     ) -> None:
         """Кэширование промпта"""
         key = f"prompt:{prompt_id}"
-        await self.redis.set(key, json.dumps(data), ex=ttl or self.default_ttl)
-        # Добавляем в список последних промптов
-        await self.redis.lpush("prompt:recent", prompt_id)
-        await self.redis.ltrim("prompt:recent", 0, 99)  # Храним только 100 последних
+        entry, ex = self._entry(data, ttl)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(key, entry, ex=ex)
+            self._invalidate(pipe, [key])
+            # Добавляем в список последних промптов
+            pipe.lpush("prompt:recent", prompt_id)
+            pipe.ltrim("prompt:recent", 0, 99)  # Храним только 100 последних
+            await pipe.execute()
 
     async def get_cached_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
         """Получение промпта из кэша"""
-        key = f"prompt:{prompt_id}"
-        data = await self.redis.get(key)
-        return json.loads(data) if data else None
+        return self._value(await self.read(f"prompt:{prompt_id}"))
+
+    async def get_cached_prompts_many(
+        self, prompt_ids: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Получение нескольких промптов из кэша за один запрос
+
+        Returns:
+                Промпты по ID; отсутствующие в кэше не включаются
+        """
+        values = await self.mget([f"prompt:{prompt_id}" for prompt_id in prompt_ids])
+        return {
+            prompt_id: self._value(data)
+            for prompt_id, data in zip(prompt_ids, values)
+            if data
+        }
 
     async def get_recent_prompts(self, limit: int = 10) -> List[str]:
         """Получение списка последних промптов"""
@@ -47,21 +207,41 @@ class RedisStorage:
     ) -> None:
         """Кэширование ресурса"""
         key = f"resource:{uri}"
-        await self.redis.set(key, json.dumps(data), ex=ttl or self.default_ttl)
+        entry, ex = self._entry(data, ttl)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, entry, ex=ex)
+            self._invalidate(pipe, [key])
+            await pipe.execute()
+
+    async def cache_resources_many(
+        self, resources: Dict[str, Dict[str, Any]], ttl: int = None
+    ) -> None:
+        """Кэширование нескольких ресурсов одним пайплайном
+
+        Args:
+                resources: Данные ресурсов по URI
+                ttl: Время жизни записей в секундах
+        """
+        if not resources:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for uri, data in resources.items():
+                entry, ex = self._entry(data, ttl)
+                pipe.set(f"resource:{uri}", entry, ex=ex)
+            self._invalidate(pipe, [f"resource:{uri}" for uri in resources])
+            await pipe.execute()
 
     async def get_cached_resource(self, uri: str) -> Optional[Dict[str, Any]]:
         """Получение ресурса из кэша"""
-        key = f"resource:{uri}"
-        data = await self.redis.get(key)
-        return json.loads(data) if data else None
+        return self._value(await self.read(f"resource:{uri}"))
 
     async def increment_resource_usage(self, uri: str) -> int:
         """Увеличение счетчика использования ресурса"""
-        key = f"resource:usage:{uri}"
-        count = await self.redis.incr(key)
-        # Добавляем в сортированное множество популярных ресурсов
-        await self.redis.zadd("resource:popular", {uri: count})
-        return count
+        # Счетчик и сортированное множество популярных ресурсов
+        # обновляются одним скриптом
+        return await self._increment_usage(
+            keys=[f"resource:usage:{uri}", "resource:popular"], args=[uri]
+        )
 
     async def get_popular_resources(self, limit: int = 10) -> List[str]:
         """Получение списка популярных ресурсов"""
@@ -73,12 +253,15 @@ class RedisStorage:
     ) -> None:
         """Создание сессии"""
         key = f"session:{session_id}"
-        await self.redis.set(key, json.dumps(data), ex=ttl)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, json.dumps(data), ex=ttl)
+            self._invalidate(pipe, [key])
+            await pipe.execute()
 
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Получение сессии"""
         key = f"session:{session_id}"
-        data = await self.redis.get(key)
+        data = await self.read(key)
         return json.loads(data) if data else None
 
     async def update_session(
@@ -89,8 +272,7 @@ class RedisStorage:
 
     async def delete_session(self, session_id: str) -> None:
         """Удаление сессии"""
-        key = f"session:{session_id}"
-        await self.redis.delete(key)
+        await self.delete(f"session:{session_id}")
 
     # Методы для работы с rate limiting
     async def check_rate_limit(self, key: str, limit: int, window: int) -> bool:
@@ -101,17 +283,29 @@ class RedisStorage:
                 limit: Максимальное количество запросов
                 window: Временное окно в секундах
         """
-        current = await self.redis.get(f"ratelimit:{key}")
-        if not current:
-            await self.redis.set(f"ratelimit:{key}", 1, ex=window)
-            return True
+        allowed = await self._rate_limit(
+            keys=[f"ratelimit:{key}"], args=[limit, window]
+        )
+        return bool(allowed)
 
-        count = int(current)
-        if count >= limit:
-            return False
+    async def acquire_tokens(
+        self, key: str, rate: float, capacity: int, cost: int = 1
+    ) -> Tuple[bool, float]:
+        """Списание токенов из token bucket за один атомарный вызов
 
-        await self.redis.incr(f"ratelimit:{key}")
-        return True
+        Args:
+                key: Ключ корзины (например, "search:123.123.123.123")
+                rate: Скорость пополнения в токенах в секунду
+                capacity: Емкость корзины (допустимый всплеск)
+                cost: Число списываемых токенов
+
+        Returns:
+                Списаны ли токены и через сколько секунд повторить запрос
+        """
+        allowed, retry_after = await self._token_bucket(
+            keys=[f"ratelimit:bucket:{key}"], args=[rate, capacity, cost]
+        )
+        return bool(allowed), retry_after / 1000
 
 
 # Создаем глобальный экземпляр
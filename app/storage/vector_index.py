@@ -0,0 +1,732 @@
+"""
+Локальный индекс приближенного поиска ближайших соседей (IVF).
+
+Векторы разбиваются сферическим k-means на списки вокруг центроидов и
+хранятся на диске отсортированными по спискам, поэтому каждый список —
+непрерывный срез файла, отображенного в память. Запрос сравнивается с
+центроидами и сканирует только n_probe ближайших списков, а не весь корпус.
+
+Новые векторы попадают в буфер дельты, который просматривается полностью
+и сливается с основными списками по достижении порога. Индекс с каталогом
+на диске сохраняется после каждого слияния: файлы новой версии пишутся
+рядом со старыми, а переключение на них выполняется атомарной заменой
+ids.json, поэтому сбой при записи оставляет на диске предыдущую версию.
+
+Индекс — состояние одного процесса: дельта и основные списки живут в его
+памяти, и слияние записывает на диск только их. Поэтому каталогом индексов
+владеет один процесс (блокировка flock на файле .lock), остальные процессы
+локальные индексы не открывают и не изменяют.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Размер блока строк при полном сканировании
+_SCAN_BLOCK = 65536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Нормализует строки матрицы для косинусной близости."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Индексы k наибольших значений по убыванию."""
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class IVFIndex:
+    """
+    Индекс IVF на массивах NumPy.
+
+    Attributes:
+        dim: Размерность векторов
+        n_probe: Число просматриваемых списков по умолчанию
+        merge_threshold: Размер дельты, при котором она сливается со списками
+        path: Каталог индекса на диске
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        n_probe: int = 8,
+        merge_threshold: int = 4096,
+        path: Optional[Path] = None,
+    ) -> None:
+        """
+        Создает пустой индекс.
+
+        Args:
+            dim: Размерность векторов
+            n_probe: Число просматриваемых списков по умолчанию
+            merge_threshold: Размер дельты, при котором она сливается со списками
+            path: Каталог индекса на диске
+        """
+        self.dim = dim
+        self.n_probe = n_probe
+        self.merge_threshold = merge_threshold
+        self.path = Path(path) if path is not None else None
+        self._lock = threading.RLock()
+        # Версия файлов на диске, открытых через отображение в память
+        self._version: Optional[str] = None
+
+        # Основные списки: векторы отсортированы по номеру списка
+        self._centroids = np.empty((0, dim), dtype=np.float32)
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+
+        # Буфер дельты для инкрементальных вставок
+        self._delta_ids: List[str] = []
+        self._delta_rows: Dict[str, int] = {}
+        self._delta_vectors: List[np.ndarray] = []
+        self._delta_matrix: Optional[np.ndarray] = None
+
+    # Построение и обновление
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_iter: int = 10,
+        dim: Optional[int] = None,
+        **kwargs: Any,
+    ) -> "IVFIndex":
+        """
+        Строит индекс по набору векторов.
+
+        Args:
+            ids: Идентификаторы векторов
+            vectors: Матрица векторов
+            n_lists: Число списков (по умолчанию sqrt от размера корпуса)
+            n_iter: Число итераций k-means
+            dim: Размерность векторов (по умолчанию по матрице, а для пустого
+                корпуса — VECTOR_INDEX_DIM)
+            **kwargs: Параметры конструктора индекса
+
+        Returns:
+            IVFIndex: Построенный индекс
+
+        Raises:
+            ValueError: Если число идентификаторов не совпадает с числом векторов
+                или размерность векторов не совпадает с dim
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(ids) != len(vectors):
+            raise ValueError("Число идентификаторов не совпадает с числом векторов")
+        if not len(vectors):
+            # Пустой корпус: индекс с заданной размерностью без списков
+            return cls(dim or settings.VECTOR_INDEX_DIM, **kwargs)
+
+        vectors = _normalize(vectors)
+        if dim is not None and vectors.shape[1] != dim:
+            raise ValueError(
+                f"Размерность векторов {vectors.shape[1]} не совпадает с {dim}"
+            )
+
+        index = cls(vectors.shape[1], **kwargs)
+        if len(ids):
+            index._rebuild(list(ids), vectors, n_lists=n_lists, n_iter=n_iter)
+        return index
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Добавляет или заменяет векторы.
+
+        Args:
+            ids: Идентификаторы векторов
+            vectors: Матрица векторов
+        """
+        vectors = _normalize(np.atleast_2d(vectors))
+        with self._lock:
+            for vector_id, vector in zip(ids, vectors):
+                self._mark_deleted(vector_id)
+                if vector_id in self._delta_rows:
+                    self._delta_vectors[self._delta_rows[vector_id]] = vector
+                else:
+                    self._delta_rows[vector_id] = len(self._delta_ids)
+                    self._delta_ids.append(vector_id)
+                    self._delta_vectors.append(vector)
+            self._delta_matrix = None
+
+            if len(self._delta_ids) >= self.merge_threshold:
+                self.merge()
+
+    def remove(self, ids: Iterable[str]) -> None:
+        """
+        Удаляет векторы из индекса.
+
+        Args:
+            ids: Идентификаторы удаляемых векторов
+        """
+        with self._lock:
+            for vector_id in ids:
+                self._mark_deleted(vector_id)
+                row = self._delta_rows.pop(vector_id, None)
+                if row is not None:
+                    # Удаленная строка дельты остается, но без идентификатора
+                    self._delta_ids[row] = ""
+
+    def merge(self) -> None:
+        """
+        Сливает дельту и удаления с основными списками.
+
+        Если у индекса есть каталог, результат сразу сохраняется на диск,
+        а векторы снова отображаются в память.
+        """
+        with self._lock:
+            self._merge_delta()
+            if self.path is not None:
+                self._write(self.path)
+
+    # Поиск
+    def search(
+        self, query: Sequence[float], k: int = 10, n_probe: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Приближенный поиск ближайших соседей.
+
+        Args:
+            query: Вектор запроса
+            k: Число результатов
+            n_probe: Число просматриваемых списков (по умолчанию self.n_probe)
+
+        Returns:
+            List[Tuple[str, float]]: Пары (идентификатор, косинусная близость)
+        """
+        query = _normalize(query)
+        with self._lock:
+            rows, scores = [], []
+            if len(self._centroids):
+                n_probe = min(n_probe or self.n_probe, len(self._centroids))
+                for number in _top_k(self._centroids @ query, n_probe):
+                    start, end = self._offsets[number], self._offsets[number + 1]
+                    rows.append(np.arange(start, end))
+                    scores.append(self._vectors[start:end] @ query)
+            return self._collect(rows, scores, query, k)
+
+    def exact_search(
+        self, query: Sequence[float], k: int = 10
+    ) -> List[Tuple[str, float]]:
+        """
+        Точный поиск полным сканированием для оценки полноты.
+
+        Args:
+            query: Вектор запроса
+            k: Число результатов
+
+        Returns:
+            List[Tuple[str, float]]: Пары (идентификатор, косинусная близость)
+        """
+        query = _normalize(query)
+        with self._lock:
+            rows, scores = [], []
+            for start in range(0, len(self._ids), _SCAN_BLOCK):
+                end = min(start + _SCAN_BLOCK, len(self._ids))
+                rows.append(np.arange(start, end))
+                scores.append(self._vectors[start:end] @ query)
+            return self._collect(rows, scores, query, k)
+
+    def __len__(self) -> int:
+        with self._lock:
+            deleted = int(self._deleted.sum())
+            return len(self._ids) - deleted + len(self._delta_rows)
+
+    def __contains__(self, vector_id: str) -> bool:
+        with self._lock:
+            row = self._rows.get(vector_id)
+            alive = row is not None and not self._deleted[row]
+            return alive or vector_id in self._delta_rows
+
+    # Хранение на диске
+    def save(self, path: Optional[Path] = None) -> None:
+        """
+        Сохраняет индекс на диск и переоткрывает его через отображение в память.
+
+        Args:
+            path: Каталог индекса (по умолчанию self.path)
+
+        Raises:
+            ValueError: Если каталог не указан
+        """
+        path = Path(path) if path is not None else self.path
+        if path is None:
+            raise ValueError("Не указан каталог для сохранения индекса")
+
+        with self._lock:
+            self._merge_delta()
+            self._write(path)
+
+    @classmethod
+    def load(cls, path: Path, **kwargs: Any) -> "IVFIndex":
+        """
+        Открывает индекс с диска, векторы отображаются в память.
+
+        Args:
+            path: Каталог индекса
+            **kwargs: Параметры конструктора индекса
+
+        Returns:
+            IVFIndex: Загруженный индекс
+        """
+        path = Path(path)
+        meta = json.loads((path / "ids.json").read_text())
+        index = cls(meta["dim"], path=path, **kwargs)
+        index._open(path, meta.get("version"), meta["ids"])
+        return index
+
+    def _write(self, path: Path) -> None:
+        """Записывает новую версию файлов индекса и переключается на нее."""
+        path.mkdir(parents=True, exist_ok=True)
+        version = uuid.uuid4().hex
+        arrays = {
+            "centroids": self._centroids,
+            "vectors": self._vectors,
+            "offsets": self._offsets,
+        }
+        for name, array in arrays.items():
+            with _atomic_file(path / f"{name}.{version}.npy") as f:
+                np.save(f, np.ascontiguousarray(array))
+
+        # ids.json записывается последним и указывает на версию файлов
+        meta = {"dim": self.dim, "version": version, "ids": self._ids}
+        with _atomic_file(path / "ids.json") as f:
+            f.write(json.dumps(meta).encode())
+
+        previous = self._version if self.path == path else None
+        self.path = path
+        self._open(path, version)
+        # Удаляются только файлы, открытые этим экземпляром: файлы версии,
+        # записанной другим процессом позже, могут быть уже в ids.json.
+        # Отображенный в память файл остается доступен до закрытия.
+        for name in arrays:
+            stale = path / (f"{name}.{previous}.npy" if previous else f"{name}.npy")
+            try:
+                stale.unlink(missing_ok=True)
+            except OSError as e:
+                logger.debug(f"Не удалось удалить файл индекса {stale}: {e}")
+
+    def _open(
+        self, path: Path, version: Optional[str], ids: Optional[List[str]] = None
+    ) -> None:
+        """Отображает сохраненные массивы в память."""
+        self._version = version
+        suffix = f".{version}.npy" if version else ".npy"
+        self._centroids = np.load(path / f"centroids{suffix}")
+        self._offsets = np.load(path / f"offsets{suffix}")
+        self._vectors = np.load(path / f"vectors{suffix}", mmap_mode="r")
+        if ids is not None:
+            self._ids = ids
+            self._rows = {vector_id: row for row, vector_id in enumerate(ids)}
+        self._deleted = np.zeros(len(self._ids), dtype=bool)
+
+    # Внутренние методы
+    def _rebuild(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_iter: int = 10,
+    ) -> None:
+        """Обучает центроиды и раскладывает векторы по спискам."""
+        if not ids:
+            self._centroids = np.empty((0, self.dim), dtype=np.float32)
+            self._set_lists([], vectors, np.zeros(0, dtype=np.int64))
+            return
+
+        n_lists = n_lists or max(1, int(np.sqrt(len(ids))))
+        self._centroids = self._train(vectors, min(n_lists, len(ids)), n_iter)
+        self._set_lists(ids, vectors, self._assign(vectors))
+
+    def _set_lists(
+        self, ids: List[str], vectors: np.ndarray, lists: np.ndarray
+    ) -> None:
+        """Сортирует векторы по номерам списков."""
+        order = np.argsort(lists, kind="stable")
+        counts = np.bincount(lists, minlength=len(self._centroids))
+        self._vectors = np.ascontiguousarray(vectors[order], dtype=np.float32)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._ids = [ids[row] for row in order]
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._deleted = np.zeros(len(self._ids), dtype=bool)
+
+    @staticmethod
+    def _train(vectors: np.ndarray, n_lists: int, n_iter: int) -> np.ndarray:
+        """Сферический k-means по выборке векторов."""
+        rng = np.random.default_rng(0)
+        sample_size = min(len(vectors), n_lists * 64)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = np.bincount(assignment, minlength=n_lists) == 0
+            # Пустые списки получают случайную точку выборки
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = _normalize(sums)
+        return centroids
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Номер ближайшего центроида для каждого вектора."""
+        result = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), _SCAN_BLOCK):
+            block = vectors[start : start + _SCAN_BLOCK]
+            result[start : start + len(block)] = np.argmax(
+                block @ self._centroids.T, axis=1
+            )
+        return result
+
+    def _merge_delta(self) -> None:
+        """Переносит живые векторы и дельту в новые основные списки."""
+        live = ~self._deleted
+        ids = [vector_id for vector_id, keep in zip(self._ids, live) if keep]
+        parts = [np.asarray(self._vectors[live])]
+        lists = [self._list_numbers()[live]]
+
+        delta_ids, delta = self._delta()
+        if len(delta_ids):
+            ids.extend(delta_ids)
+            parts.append(delta)
+            if len(self._centroids):
+                lists.append(self._assign(delta))
+
+        vectors = np.concatenate(parts) if ids else parts[0]
+        # Центроиды переобучаются, когда корпус сильно вырос
+        trained = len(self._centroids)
+        if trained and ids and len(ids) <= 4 * trained**2:
+            self._set_lists(ids, vectors, np.concatenate(lists))
+        else:
+            self._rebuild(ids, vectors)
+
+        self._delta_ids, self._delta_vectors = [], []
+        self._delta_rows, self._delta_matrix = {}, None
+
+    def _list_numbers(self) -> np.ndarray:
+        """Номер списка для каждой строки основных векторов."""
+        return np.repeat(np.arange(len(self._centroids)), np.diff(self._offsets))
+
+    def _mark_deleted(self, vector_id: str) -> None:
+        """Помечает строку основных списков удаленной."""
+        row = self._rows.get(vector_id)
+        if row is not None:
+            self._deleted[row] = True
+
+    def _delta(self) -> Tuple[List[str], np.ndarray]:
+        """Живые строки дельты."""
+        if self._delta_matrix is None:
+            self._delta_matrix = (
+                np.stack(self._delta_vectors)
+                if self._delta_vectors
+                else np.empty((0, self.dim), dtype=np.float32)
+            )
+        live = [row for row, vector_id in enumerate(self._delta_ids) if vector_id]
+        return [self._delta_ids[row] for row in live], self._delta_matrix[live]
+
+    def _collect(
+        self,
+        rows: List[np.ndarray],
+        scores: List[np.ndarray],
+        query: np.ndarray,
+        k: int,
+    ) -> List[Tuple[str, float]]:
+        """Объединяет кандидатов из списков и дельты и выбирает top-k."""
+        candidates: List[Tuple[str, float]] = []
+        if rows:
+            rows_arr = np.concatenate(rows)
+            scores_arr = np.concatenate(scores)
+            live = ~self._deleted[rows_arr]
+            rows_arr, scores_arr = rows_arr[live], scores_arr[live]
+            for position in _top_k(scores_arr, k):
+                candidates.append(
+                    (self._ids[rows_arr[position]], float(scores_arr[position]))
+                )
+
+        delta_ids, delta = self._delta()
+        if delta_ids:
+            delta_scores = delta @ query
+            for position in _top_k(delta_scores, k):
+                candidates.append((delta_ids[position], float(delta_scores[position])))
+
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        return candidates[:k]
+
+
+@contextmanager
+def _atomic_file(path: Path) -> Iterator[BinaryIO]:
+    """
+    Открывает файл, который появляется под итоговым именем только после записи.
+
+    Данные пишутся во временный файл с уникальным именем в том же каталоге,
+    поэтому процессы и потоки не мешают друг другу, сбрасываются на диск и
+    атомарно заменяют итоговый файл.
+
+    Args:
+        path: Итоговый путь файла
+
+    Yields:
+        BinaryIO: Временный файл для записи
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def recall_at_k(
+    index: IVFIndex,
+    queries: np.ndarray,
+    k: int = 10,
+    n_probe: Optional[int] = None,
+) -> float:
+    """
+    Доля точных k ближайших соседей, найденных приближенным поиском.
+
+    Args:
+        index: Индекс
+        queries: Матрица векторов запросов
+        k: Число соседей
+        n_probe: Число просматриваемых списков
+
+    Returns:
+        float: Средняя полнота по запросам
+    """
+    recalls = []
+    for query in queries:
+        exact = {vector_id for vector_id, _ in index.exact_search(query, k)}
+        if not exact:
+            continue
+        found = {vector_id for vector_id, _ in index.search(query, k, n_probe)}
+        recalls.append(len(found & exact) / len(exact))
+    return float(np.mean(recalls)) if recalls else 1.0
+
+
+class VectorIndexRegistry:
+    """
+    Реестр локальных векторных индексов по именам индексов Elasticsearch.
+
+    Индексы хранятся в подкаталогах base_dir и открываются при первом
+    обращении. Загрузка с диска, вставки и удаления (вставка может
+    запустить слияние с переобучением k-means и записью на диск)
+    выполняются в потоке, не блокируя цикл событий.
+
+    Открывает и изменяет индексы только процесс, захвативший блокировку
+    каталога (acquire). В остальных процессах индексы считаются
+    не построенными: иначе каждый процесс записывал бы на диск свою дельту
+    поверх векторов, слитых другими процессами.
+    """
+
+    def __init__(self, base_dir: Path) -> None:
+        """
+        Инициализирует реестр.
+
+        Args:
+            base_dir: Каталог с индексами
+        """
+        self.base_dir = Path(base_dir)
+        self._indexes: Dict[str, IVFIndex] = {}
+        self._lock = threading.Lock()
+        # Файл блокировки каталога: открыт, пока процесс владеет индексами
+        self._owner: Optional[BinaryIO] = None
+        self._foreign = False
+
+    def acquire(self) -> None:
+        """
+        Делает процесс единственным владельцем каталога индексов.
+
+        Raises:
+            RuntimeError: Если каталогом владеет другой процесс
+        """
+        with self._lock:
+            if self._owner is not None:
+                return
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            owner = open(self.base_dir / ".lock", "ab")
+            try:
+                fcntl.flock(owner.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                owner.close()
+                raise RuntimeError(
+                    f"Каталогом векторных индексов {self.base_dir} владеет другой "
+                    "процесс: локальный индекс поддерживает только один процесс "
+                    "сервера (--workers 1)"
+                ) from None
+            self._owner = owner
+
+    def release(self) -> None:
+        """Освобождает каталог индексов и закрывает открытые индексы."""
+        with self._lock:
+            self._indexes.clear()
+            if self._owner is not None:
+                self._owner.close()
+                self._owner = None
+
+    async def get(self, name: str) -> Optional[IVFIndex]:
+        """
+        Возвращает индекс по имени, если он построен.
+
+        Args:
+            name: Имя индекса Elasticsearch
+
+        Returns:
+            Optional[IVFIndex]: Индекс или None
+        """
+        index = self._indexes.get(name)
+        if index is not None:
+            return index
+        return await asyncio.to_thread(self._get, name)
+
+    async def add(self, name: str, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Добавляет векторы в индекс, если он построен.
+
+        Args:
+            name: Имя индекса Elasticsearch
+            ids: Идентификаторы документов
+            vectors: Матрица векторов
+        """
+        index = await self.get(name)
+        if index is not None:
+            await asyncio.to_thread(index.add, ids, vectors)
+
+    async def remove(self, name: str, ids: Sequence[str]) -> None:
+        """
+        Удаляет векторы из индекса, если он построен.
+
+        Args:
+            name: Имя индекса Elasticsearch
+            ids: Идентификаторы документов
+        """
+        index = await self.get(name)
+        if index is not None and ids:
+            await asyncio.to_thread(index.remove, ids)
+
+    def _get(self, name: str) -> Optional[IVFIndex]:
+        """Открывает индекс с диска при первом обращении."""
+        path = self.base_dir / name
+        if not (path / "ids.json").exists() or not self._owns():
+            return None
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = IVFIndex.load(path, **self._options())
+            return self._indexes[name]
+
+    def _owns(self) -> bool:
+        """Захватывает каталог индексов, если им не владеет другой процесс."""
+        if self._owner is not None:
+            return True
+        try:
+            self.acquire()
+        except RuntimeError as e:
+            if not self._foreign:
+                self._foreign = True
+                logger.warning(f"Локальные векторные индексы недоступны: {e}")
+            return False
+        return True
+
+    async def build(
+        self,
+        name: str,
+        storage: Any,
+        field: Optional[str] = None,
+        n_lists: Optional[int] = None,
+    ) -> IVFIndex:
+        """
+        Строит индекс по векторам документов Elasticsearch и сохраняет его.
+
+        Args:
+            name: Имя индекса Elasticsearch
+            storage: Хранилище Elasticsearch с методом scan
+            field: Поле с вектором (по умолчанию VECTOR_SEARCH_FIELD)
+            n_lists: Число списков
+
+        Returns:
+            IVFIndex: Построенный индекс
+
+        Raises:
+            RuntimeError: Если каталогом индексов владеет другой процесс
+        """
+        self.acquire()
+        field = field or settings.VECTOR_SEARCH_FIELD
+        ids: List[str] = []
+        vectors: List[List[float]] = []
+        async for hit in storage.scan(index=name, source=[field]):
+            vector = hit["_source"].get(field)
+            if vector:
+                ids.append(hit["_id"])
+                vectors.append(vector)
+
+        index = await asyncio.to_thread(
+            IVFIndex.build,
+            ids,
+            np.asarray(vectors, dtype=np.float32),
+            n_lists,
+            dim=settings.VECTOR_INDEX_DIM,
+            **self._options(),
+        )
+        await asyncio.to_thread(index.save, self.base_dir / name)
+        with self._lock:
+            self._indexes[name] = index
+        logger.info(f"Построен локальный векторный индекс {name}: {len(ids)} векторов")
+        return index
+
+    def save_all(self) -> None:
+        """Сохраняет на диск дельты всех открытых индексов."""
+        with self._lock:
+            indexes = dict(self._indexes)
+        for name, index in indexes.items():
+            index.save(self.base_dir / name)
+
+    @staticmethod
+    def _options() -> Dict[str, Any]:
+        """Параметры индексов из настроек."""
+        return {
+            "n_probe": settings.VECTOR_INDEX_N_PROBE,
+            "merge_threshold": settings.VECTOR_INDEX_MERGE_THRESHOLD,
+        }
+
+
+# Создаем глобальный экземпляр
+vector_indexes = VectorIndexRegistry(settings.BASE_DIR / settings.VECTOR_INDEX_DIR)
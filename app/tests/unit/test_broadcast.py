@@ -0,0 +1,123 @@
+"""
+Тесты для рассылки сообщений клиентам WebSocket.
+"""
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.websocket.broadcast import ConnectionManager
+
+
+class FakeWebSocket:
+    """Соединение, отправка в которое ждет разрешения."""
+
+    client = None
+
+    def __init__(self, blocked: bool = False) -> None:
+        self.sent: List[str] = []
+        self.close_code: Optional[int] = None
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        await self.unblocked.wait()
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000) -> None:
+        self.close_code = code
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_drops_oldest_without_blocking_others() -> None:
+    """Медленный клиент теряет старые сообщения, остальные получают все."""
+    manager = ConnectionManager(queue_size=2, policy="drop_oldest")
+    fast = FakeWebSocket()
+    slow = FakeWebSocket(blocked=True)
+    await manager.connect(fast)
+    await manager.connect(slow)
+
+    for number in range(5):
+        await manager.broadcast({"n": number})
+        await asyncio.sleep(0)
+
+    # Первое сообщение уже передано писателю медленного клиента
+    slow.unblocked.set()
+    await asyncio.sleep(0.01)
+
+    assert fast.sent == [f'{{"n":{number}}}' for number in range(5)]
+    assert slow.sent == ['{"n":0}', '{"n":3}', '{"n":4}']
+    # Сообщение сериализуется один раз для всех клиентов
+    assert fast.sent[4] is slow.sent[2]
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_disconnect_policy() -> None:
+    """При политике disconnect переполненное соединение закрывается."""
+    manager = ConnectionManager(queue_size=1, policy="disconnect")
+    slow = FakeWebSocket(blocked=True)
+    connection = await manager.connect(slow)
+
+    for number in range(3):
+        await manager.broadcast({"n": number})
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+
+    assert connection.closed
+    assert slow.close_code == 1013
+    await manager.disconnect(connection)
+    assert not manager.connections
+
+
+@pytest.mark.asyncio
+async def test_broadcasts_never_evict_responses() -> None:
+    """Отбрасываются только рассылки, ответы на запросы доставляются все."""
+    manager = ConnectionManager(queue_size=2, policy="drop_oldest")
+    slow = FakeWebSocket(blocked=True)
+    connection = await manager.connect(slow)
+
+    await connection.send("response-1")
+    await asyncio.sleep(0)
+    await connection.send("response-2")
+    for number in range(5):
+        await manager.broadcast({"n": number})
+
+    slow.unblocked.set()
+    await asyncio.sleep(0.01)
+
+    assert slow.sent == ["response-1", "response-2", '{"n":3}', '{"n":4}']
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_send_waiting_for_room_fails_when_writer_dies() -> None:
+    """Отправитель, ждущий места в очереди, получает ошибку при обрыве."""
+
+    class BrokenWebSocket(FakeWebSocket):
+        async def send_text(self, text: str) -> None:
+            await self.unblocked.wait()
+            raise RuntimeError("connection reset")
+
+    manager = ConnectionManager(queue_size=1, policy="drop_oldest")
+    broken = BrokenWebSocket(blocked=True)
+    connection = await manager.connect(broken)
+    await connection.send("in flight")
+    await asyncio.sleep(0)
+    await connection.send("queued")
+
+    waiting = asyncio.create_task(connection.send("waiting"))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    broken.unblocked.set()
+    with pytest.raises(WebSocketDisconnect):
+        await asyncio.wait_for(waiting, 1)
+    assert connection.closed
+    await manager.close()
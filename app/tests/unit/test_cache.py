@@ -0,0 +1,42 @@
+"""
+Тесты для внутрипроцессного кэша.
+"""
+
+from app.utils.cache import TTLCache
+
+
+class FakeClock:
+    """Управляемый источник времени."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """При переполнении вытесняется самая давно использованная запись."""
+    cache = TTLCache("test_lru", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "c"]) == {"a": 1, "c": 3}
+
+
+def test_cache_expires_entries() -> None:
+    """Записи перестают возвращаться после истечения TTL."""
+    clock = FakeClock()
+    cache = TTLCache("test_ttl", maxsize=10, ttl=5, clock=clock)
+    cache.set("key", "value")
+
+    clock.now = 4.9
+    assert cache.get("key") == "value"
+
+    clock.now = 5.0
+    assert cache.get("key") is None
+    assert len(cache) == 0
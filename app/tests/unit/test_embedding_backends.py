@@ -0,0 +1,55 @@
+"""
+Тесты паритета бэкендов инференса эмбеддингов с эталонной моделью fp32.
+"""
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.utils.embeddings.backends import create_backend
+
+pytest.importorskip("sentence_transformers")
+
+TEXTS = [
+    "Model Context Protocol server",
+    "Семантический поиск по ресурсам и промптам",
+    "The quick brown fox jumps over the lazy dog",
+]
+
+# Модули, без которых бэкенд не может быть загружен
+REQUIRED_MODULES = {"torch_int8": [], "onnx": ["onnxruntime", "optimum"]}
+
+
+@pytest.fixture(scope="module")
+def reference() -> np.ndarray:
+    """Эмбеддинги эталонной модели PyTorch fp32."""
+    backend = create_backend("torch", settings.EMBEDDING_MODEL)
+    try:
+        backend.load()
+    except OSError as e:
+        pytest.skip(f"Модель {settings.EMBEDDING_MODEL} недоступна: {e}")
+    return backend.encode(TEXTS, batch_size=8)
+
+
+@pytest.mark.parametrize("name", ["torch_int8", "onnx"])
+def test_backend_matches_reference(name: str, reference: np.ndarray) -> None:
+    """Эмбеддинги бэкенда близки к эталону по косинусной мере."""
+    for module in REQUIRED_MODULES[name]:
+        pytest.importorskip(module)
+
+    backend = create_backend(name, settings.EMBEDDING_MODEL)
+    backend.load()
+    embeddings = backend.encode(TEXTS, batch_size=8)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == reference.shape
+    cosine = np.sum(embeddings * reference, axis=1) / (
+        np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1)
+    )
+    assert np.all(cosine >= 0.98)
+
+
+def test_unknown_backend() -> None:
+    """Неизвестное имя бэкенда приводит к ValueError."""
+    with pytest.raises(ValueError):
+        create_backend("tensorrt", settings.EMBEDDING_MODEL)
@@ -0,0 +1,244 @@
+"""
+Тесты для компонентов пакета эмбеддингов.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pytest
+
+from app.utils.embeddings import manager as manager_module
+from app.utils.embeddings.batcher import EmbeddingBatcher
+from app.utils.embeddings.chunking import TokenChunker
+from app.utils.embeddings.codec import decode_vector, encode_vector
+from app.utils.embeddings.manager import EmbeddingsManager
+
+
+@pytest.mark.asyncio
+async def test_batcher_coalesces_concurrent_requests() -> None:
+    """Параллельные запросы объединяются в один батч."""
+    batches: List[List[str]] = []
+
+    async def handler(texts: List[str]) -> List[List[float]]:
+        batches.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    batcher = EmbeddingBatcher(handler, max_batch_size=16, max_wait=0.01)
+    results = await asyncio.gather(*(batcher.submit("x" * i) for i in range(5)))
+
+    assert results == [[float(i)] for i in range(5)]
+    assert len(batches) == 1
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_full_batch() -> None:
+    """Заполненный батч отправляется без ожидания таймера."""
+    batches: List[List[str]] = []
+
+    async def handler(texts: List[str]) -> List[List[float]]:
+        batches.append(texts)
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(handler, max_batch_size=2, max_wait=10.0)
+    await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(str(i)) for i in range(4))), timeout=1.0
+    )
+
+    assert [len(batch) for batch in batches] == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_batcher_propagates_errors() -> None:
+    """Ошибка обработчика передается всем ожидающим."""
+
+    async def handler(texts: List[str]) -> List[List[float]]:
+        raise RuntimeError("model failure")
+
+    batcher = EmbeddingBatcher(handler, max_batch_size=8, max_wait=0.001)
+    with pytest.raises(RuntimeError):
+        await batcher.submit("text")
+
+
+@pytest.mark.parametrize(
+    ("dtype", "tolerance"), [("float32", 0.0), ("float16", 1e-3), ("int8", 1e-2)]
+)
+def test_codec_roundtrip(dtype: str, tolerance: float) -> None:
+    """Вектор восстанавливается из бинарного формата с допустимой погрешностью."""
+    vector = np.random.default_rng(0).uniform(-1, 1, 384).astype(np.float32)
+
+    decoded = decode_vector(encode_vector(vector, dtype))
+
+    assert decoded.dtype == np.float32
+    assert np.allclose(decoded, vector, atol=tolerance)
+
+
+def test_codec_reads_legacy_json() -> None:
+    """Записи в старом формате JSON продолжают читаться."""
+    decoded = decode_vector(b"[0.5, -0.25]")
+
+    assert decoded.tolist() == [0.5, -0.25]
+
+
+def count_words(text: str) -> int:
+    """Подсчет токенов по пробелам вместо токенизатора модели."""
+    return len(text.split())
+
+
+@pytest.mark.asyncio
+async def test_chunker_streams_overlapping_chunks() -> None:
+    """Чанки не превышают лимит токенов и перекрываются целыми предложениями."""
+
+    async def stream():
+        # Границы фрагментов потока не совпадают с границами предложений
+        text = " ".join(f"Sentence {i} has five words." for i in range(10))
+        for start in range(0, len(text), 7):
+            yield text[start : start + 7]
+
+    chunker = TokenChunker(count_words, chunk_size=12, overlap=5)
+    chunks = [chunk async for chunk in chunker.chunk(stream())]
+
+    assert all(count_words(chunk) <= 12 for chunk in chunks)
+    assert chunks[0] == "Sentence 0 has five words. Sentence 1 has five words."
+    assert chunks[1].startswith("Sentence 1 has five words.")
+    assert chunks[-1].endswith("Sentence 9 has five words.")
+
+
+def test_chunker_splits_long_sentence() -> None:
+    """Предложение длиннее чанка разбивается по словам."""
+    chunker = TokenChunker(count_words, chunk_size=4, overlap=0)
+
+    chunks = list(chunker.feed("one two three four five six seven")) + list(
+        chunker.flush()
+    )
+
+    assert chunks == ["one two three four", "five six seven"]
+
+
+def test_chunker_bounds_text_without_spaces() -> None:
+    """Текст без пробелов режется по символам, а не копится до flush."""
+
+    def count_chars(text: str) -> int:
+        return len(text)
+
+    chunker = TokenChunker(count_chars, chunk_size=8, overlap=0)
+
+    early = list(chunker.feed("x" * 1000))
+
+    assert early
+    assert len(chunker._buffer) <= 8 * 16
+    chunks = early + list(chunker.flush())
+    assert all(len(chunk) <= 8 for chunk in chunks)
+    assert "".join(chunks) == "x" * 1000
+
+
+def text_vector(text: str) -> np.ndarray:
+    """Вектор, по которому видно, для какого текста он получен."""
+    return np.array([float(len(text)), float(ord(text[0]))], dtype=np.float32)
+
+
+class FakeRedis:
+    """Хранилище Redis с подсчетом MGET и записей."""
+
+    def __init__(self, data: Dict[str, bytes]) -> None:
+        self.data = data
+        self.mget_calls = 0
+        self.writes: List[Dict[str, bytes]] = []
+
+    async def mget_raw(self, keys: List[str]) -> List[Optional[bytes]]:
+        self.mget_calls += 1
+        return [self.data.get(key) for key in keys]
+
+    async def set_many(self, values: Dict[str, bytes], ex: int) -> None:
+        self.writes.append(values)
+
+
+class FakeElasticsearch:
+    """Хранилище Elasticsearch с подсчетом terms-запросов и _bulk."""
+
+    def __init__(self, vectors: Dict[str, np.ndarray]) -> None:
+        self.vectors = vectors
+        self.searches: List[List[str]] = []
+        self.bulks: List[List[Dict[str, Any]]] = []
+
+    async def search(self, index: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        keys = body["query"]["terms"]["vector_id"]
+        self.searches.append(keys)
+        hits = [
+            {"_source": {"vector_id": key, "vector": self.vectors[key].tolist()}}
+            for key in keys
+            if key in self.vectors
+        ]
+        return {"hits": {"hits": hits}}
+
+    async def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.bulks.append(operations)
+        return {"errors": False, "items": []}
+
+
+class FakeVectorIndexes:
+    """Реестр локальных индексов, запоминающий добавленные векторы."""
+
+    def __init__(self) -> None:
+        self.added: List[List[str]] = []
+
+    async def add(self, index: str, ids: List[str], vectors: np.ndarray) -> None:
+        self.added.append(ids)
+
+
+class FakeInference:
+    """Исполнитель инференса с подсчетом вызовов модели."""
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    async def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        self.calls.append(texts)
+        return np.stack([text_vector(text) for text in texts])
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_uses_constant_number_of_calls(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Смесь попаданий и промахов: один MGET, один terms, один encode."""
+    manager = EmbeddingsManager()
+    key = manager._get_cache_key
+    redis = FakeRedis({key("redis"): encode_vector(text_vector("redis"))})
+    es = FakeElasticsearch({key("elastic"): text_vector("elastic")})
+    indexes = FakeVectorIndexes()
+    inference = FakeInference()
+    monkeypatch.setattr(manager_module, "redis_storage", redis)
+    monkeypatch.setattr(manager_module, "es_storage", es)
+    monkeypatch.setattr(manager_module, "vector_indexes", indexes)
+    manager._backend = object()
+    manager._executor = inference
+
+    texts = ["new", "redis", "elastic", "other", "new", "redis"]
+    embeddings = await manager.get_embeddings(texts)
+
+    # Каждый результат соответствует тексту на своей позиции
+    assert embeddings == [text_vector(text).tolist() for text in texts]
+
+    assert redis.mget_calls == 1
+    assert es.searches == [[key("new"), key("elastic"), key("other")]]
+    assert inference.calls == [["new", "other"]]
+    assert len(es.bulks) == 1
+    assert [op["index"]["_id"] for op in es.bulks[0][::2]] == [
+        key("new"),
+        key("other"),
+    ]
+    # Вектор из Elasticsearch и новые векторы записываются в Redis
+    assert [list(values) for values in redis.writes] == [
+        [key("elastic")],
+        [key("new"), key("other")],
+    ]
+    assert indexes.added == [[key("new"), key("other")]]
+
+    # Повторный запрос обслуживается внутрипроцессным кэшем
+    assert await manager.get_embeddings(["other", "elastic"]) == [
+        text_vector("other").tolist(),
+        text_vector("elastic").tolist(),
+    ]
+    assert redis.mget_calls == 1
+    assert len(inference.calls) == 1
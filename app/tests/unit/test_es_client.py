@@ -0,0 +1,16 @@
+"""
+Тесты общего пула соединений с Elasticsearch.
+"""
+
+from elasticsearch import AsyncElasticsearch
+
+from app.storage.es_client import SharedHttpxNode, es_http_client
+
+
+def test_elasticsearch_node_uses_shared_client() -> None:
+    """AsyncElasticsearch отправляет запросы через общий HTTP клиент."""
+    es = AsyncElasticsearch([es_http_client.base_url], node_class=SharedHttpxNode)
+
+    node = es.transport.node_pool.all()[0]
+
+    assert node.client is es_http_client.client
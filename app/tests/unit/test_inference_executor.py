@@ -0,0 +1,141 @@
+"""
+Тесты исполнителя инференса эмбеддингов.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.utils.embeddings import executor as executor_module
+from app.utils.embeddings.executor import (
+    INFERENCE_IN_FLIGHT,
+    INFERENCE_QUEUE_DEPTH,
+    InferenceExecutor,
+    _init_process_worker,
+)
+
+
+class FakeModel:
+    """Модель, возвращающая длину текста; может блокировать инференс."""
+
+    name = "fake"
+    model_name = "fake-model"
+    device = "cpu"
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+        self.release.set()
+        self.threads: List[str] = []
+        self.loaded = False
+
+    def load(self) -> None:
+        self.loaded = True
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        self.threads.append(threading.current_thread().name)
+        self.release.wait(timeout=5)
+        return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+
+@pytest.mark.asyncio
+async def test_thread_mode_runs_encode_in_pool() -> None:
+    """В режиме thread инференс идет в потоке пула, а не в цикле событий."""
+    model = FakeModel()
+    executor = InferenceExecutor(model.encode, mode="thread", workers=1)
+    try:
+        result = await executor.encode(["ab", "abcd"], batch_size=8)
+    finally:
+        executor.shutdown()
+
+    assert result.tolist() == [[2.0], [4.0]]
+    assert model.threads[0].startswith("embedding-inference")
+    assert INFERENCE_IN_FLIGHT._value.get() == 0
+    assert INFERENCE_QUEUE_DEPTH._value.get() == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_limits_batches_and_reports_queue() -> None:
+    """Сверх max_queue батчи ждут допуска и учитываются в глубине очереди."""
+    model = FakeModel()
+    model.release.clear()
+    executor = InferenceExecutor(model.encode, workers=1, max_queue=2)
+    try:
+        tasks = [
+            asyncio.create_task(executor.encode(["text"], batch_size=8))
+            for _ in range(4)
+        ]
+        await asyncio.sleep(0.05)
+
+        # Два батча допущены (один у рабочего, один в очереди пула),
+        # еще два ждут семафора допуска
+        assert INFERENCE_IN_FLIGHT._value.get() == 2
+        assert INFERENCE_QUEUE_DEPTH._value.get() == 3
+
+        model.release.set()
+        results = await asyncio.gather(*tasks)
+    finally:
+        executor.shutdown()
+
+    assert [result.tolist() for result in results] == [[[4.0]]] * 4
+    assert INFERENCE_IN_FLIGHT._value.get() == 0
+    assert INFERENCE_QUEUE_DEPTH._value.get() == 0
+
+
+def test_process_pool_spawns_workers_that_load_model() -> None:
+    """Рабочие процессы стартуют через spawn и получают параметры модели."""
+    executor = InferenceExecutor(
+        FakeModel().encode, mode="process", workers=2, backend=FakeModel()
+    )
+    try:
+        pool = executor._pool
+        assert pool._mp_context.get_start_method() == "spawn"
+        assert pool._initializer is _init_process_worker
+        assert pool._initargs == ("fake", "fake-model", "cpu", 0)
+    finally:
+        executor.shutdown()
+
+
+def test_process_pool_requires_model() -> None:
+    """Без бэкенда пул процессов не создается."""
+    with pytest.raises(ValueError):
+        InferenceExecutor(FakeModel().encode, mode="process")
+
+
+@pytest.mark.asyncio
+async def test_process_mode_encodes_with_worker_model(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """В режиме process батч векторизует модель, загруженная рабочим."""
+    worker_model = FakeModel()
+    created = []
+
+    def create(name: str, model_name: str, device: str) -> FakeModel:
+        created.append((name, model_name, device))
+        return worker_model
+
+    monkeypatch.setattr(executor_module, "_worker_backend", None)
+    monkeypatch.setattr(executor_module, "create_backend", create)
+
+    executor = InferenceExecutor(
+        FakeModel().encode, mode="process", workers=1, backend=FakeModel()
+    )
+    executor.shutdown()
+    # Пул потоков с тем же инициализатором заменяет процессы в тесте
+    executor._pool = ThreadPoolExecutor(
+        max_workers=1,
+        initializer=_init_process_worker,
+        initargs=("fake", "fake-model", "cpu", 0),
+    )
+    try:
+        result = await executor.encode(["abc"], batch_size=8)
+    finally:
+        executor.shutdown()
+
+    assert result.tolist() == [[3.0]]
+    assert created == [("fake", "fake-model", "cpu")]
+    assert worker_model.loaded
+    assert worker_model.threads
@@ -0,0 +1,145 @@
+"""
+Тесты для конвейера массовой загрузки.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from app.services.ingestion import IngestionPipeline
+from app.storage import elasticsearch
+from app.storage.elasticsearch import ElasticsearchStorage
+from app.storage.vector_index import IVFIndex, VectorIndexRegistry
+
+
+class BulkRecorder:
+    """Хранилище, отклоняющее первую отправку каждого второго документа."""
+
+    indices = {"resources": "mcp_resources", "prompts": "mcp_prompts"}
+
+    def __init__(self) -> None:
+        self.calls: List[List[Dict[str, Any]]] = []
+        self.rejected: set = set()
+
+    async def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.calls.append(operations)
+        items = []
+        for meta in operations[::2]:
+            doc_id = meta["index"]["_id"]
+            status = 201
+            if int(doc_id.rsplit("/", 1)[1]) % 2 and doc_id not in self.rejected:
+                self.rejected.add(doc_id)
+                status = 429
+            items.append({"index": {"_id": doc_id, "status": status}})
+        return {"errors": True, "items": items}
+
+
+async def embed(texts: List[str]) -> List[List[float]]:
+    return [[float(len(text.split())), 1.0] for text in texts]
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+@pytest.mark.asyncio
+async def test_pipeline_chunks_embeds_and_retries_rejected() -> None:
+    """Документы индексируются с чанками, отклоненные с 429 повторяются."""
+    storage = BulkRecorder()
+    pipeline = IngestionPipeline(
+        storage=storage,
+        embed=embed,
+        count_tokens=count_words,
+        chunk_size=3,
+        overlap=0,
+        bulk_size=3,
+        queue_size=2,
+        retry_backoff=0,
+    )
+    documents = [
+        {"uri": f"doc/{i}", "name": f"Doc {i}", "content": "One two. Three four."}
+        for i in range(6)
+    ] + [{"uri": "doc/empty", "name": None}]
+
+    stats = await pipeline.run(documents)
+
+    assert stats == {"parsed": 6, "chunks": 12, "indexed": 6, "failed": 1}
+    indexed = {
+        operations[i]["index"]["_id"]: operations[i + 1]
+        for operations in storage.calls
+        for i in range(0, len(operations), 2)
+    }
+    assert set(indexed) == {f"doc/{i}" for i in range(6)}
+    document = indexed["doc/0"]
+    assert [chunk["content"] for chunk in document["text_chunks"]] == [
+        "One two.",
+        "Three four.",
+    ]
+    assert document["embedding"] == pytest.approx([0.894, 0.447], abs=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_embeds_without_query_cache(monkeypatch) -> None:
+    """По умолчанию чанки векторизуются моделью без записи в кэш эмбеддингов."""
+    from app.services import ingestion
+
+    async def encode_async(texts: List[str], batch_size: int = 0) -> np.ndarray:
+        return np.asarray([[1.0, 0.0]] * len(texts), dtype=np.float32)
+
+    async def get_embeddings(*args: Any, **kwargs: Any) -> None:
+        raise AssertionError("Загрузка не должна использовать кэш эмбеддингов")
+
+    monkeypatch.setattr(ingestion.embeddings_manager, "encode_async", encode_async)
+    monkeypatch.setattr(ingestion.embeddings_manager, "get_embeddings", get_embeddings)
+    pipeline = IngestionPipeline(
+        storage=BulkRecorder(), count_tokens=count_words, retry_backoff=0
+    )
+
+    stats = await pipeline.run([{"uri": "doc/0", "content": "One two."}])
+
+    assert stats["indexed"] == 1
+
+
+class FakeBulkClient:
+    """Клиент Elasticsearch: _bulk отклоняет документы с нечетным номером."""
+
+    async def bulk(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        items = []
+        for meta in operations[::2]:
+            doc_id = meta["index"]["_id"]
+            status = 400 if int(doc_id.rsplit("/", 1)[1]) % 2 else 201
+            index = meta["index"]["_index"]
+            items.append({"index": {"_index": index, "_id": doc_id, "status": status}})
+        return {"errors": True, "items": items}
+
+
+@pytest.mark.asyncio
+async def test_bulk_loaded_vectors_reach_local_index(
+    monkeypatch, tmp_path: Path
+) -> None:
+    """Векторы загруженных через _bulk документов попадают в локальный индекс."""
+    registry = VectorIndexRegistry(tmp_path)
+    IVFIndex.build(["old"], np.ones((1, 2))).save(tmp_path / "mcp_resources")
+    monkeypatch.setattr(elasticsearch, "vector_indexes", registry)
+    storage = ElasticsearchStorage()
+    storage.es = FakeBulkClient()
+
+    async def bump_generation(index: str) -> None:
+        pass
+
+    monkeypatch.setattr(storage, "_bump_generation", bump_generation)
+    pipeline = IngestionPipeline(
+        storage=storage, embed=embed, count_tokens=count_words, retry_backoff=0
+    )
+
+    stats = await pipeline.run(
+        [{"uri": f"doc/{i}", "content": "One two."} for i in range(4)]
+    )
+
+    assert stats["indexed"] == 2
+    index = await registry.get("mcp_resources")
+    assert {"doc/0", "doc/2"} <= {doc_id for doc_id, _ in index.search([1, 1], k=5)}
+    assert "doc/1" not in index
+    registry.release()
@@ -0,0 +1,143 @@
+"""
+Тесты для ограничения частоты запросов.
+"""
+
+from typing import Any, List, Tuple
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.rate_limit import (
+    LocalTokenBucket,
+    RateLimit,
+    RateLimiter,
+    RateLimitMiddleware,
+    client_address,
+)
+
+
+def test_local_bucket_refills_over_time() -> None:
+    """Корзина отклоняет всплеск сверх емкости и пополняется со временем."""
+    now: List[float] = [0.0]
+    bucket = LocalTokenBucket(clock=lambda: now[0])
+    limit = RateLimit.parse("2/second")
+
+    assert bucket.acquire("client", limit) == (True, 0.0)
+    assert bucket.acquire("client", limit) == (True, 0.0)
+    allowed, retry_after = bucket.acquire("client", limit)
+    assert not allowed
+    assert retry_after == pytest.approx(0.5)
+
+    now[0] = 0.5
+    assert bucket.acquire("client", limit)[0]
+
+
+def test_parse_rejects_unknown_period() -> None:
+    """Неизвестный период лимита вызывает ошибку."""
+    with pytest.raises(ValueError):
+        RateLimit.parse("10/week")
+
+
+def test_middleware_returns_429_with_retry_after() -> None:
+    """Лимит инструмента применяется к его маршрутам и не затрагивает другие."""
+    app = FastAPI()
+
+    @app.post("/tools/{tool_name}")
+    async def execute_tool(tool_name: str):
+        return {"tool": tool_name}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=RateLimiter(tools={"search": "2/minute"}),
+        routes={},
+        default="",
+    )
+    client = TestClient(app)
+
+    assert client.post("/tools/search").status_code == 200
+    assert client.post("/tools/search").status_code == 200
+    response = client.post("/tools/search")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert client.post("/tools/weather").status_code == 200
+
+
+class RejectingStorage:
+    """Общая корзина Redis, отклоняющая все запросы."""
+
+    async def acquire_tokens(
+        self, key: str, rate: float, capacity: int, cost: int
+    ) -> Tuple[bool, float]:
+        return False, 1.0
+
+
+@pytest.mark.asyncio
+async def test_shared_rejection_refunds_local_token() -> None:
+    """Отклоненный Redis запрос не расходует локальную корзину."""
+    limiter = RateLimiter(storage=RejectingStorage(), tools={})
+    limit = RateLimit.parse("2/minute")
+
+    for _ in range(5):
+        assert await limiter.acquire("route", "client", limit) == (False, 1.0)
+
+    limiter.storage = None
+    assert (await limiter.acquire("route", "client", limit))[0]
+    assert (await limiter.acquire("route", "client", limit))[0]
+
+
+def http_scope(peer: str, *forwarded: str) -> Any:
+    """ASGI scope запроса с адресом подключения и X-Forwarded-For."""
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded]
+    return {"type": "http", "client": (peer, 50000), "headers": headers}
+
+
+def test_client_address_ignores_forwarded_for_without_trusted_proxy() -> None:
+    """Без доверенных прокси X-Forwarded-For не влияет на ключ клиента."""
+    scope = http_scope("203.0.113.7", "198.51.100.1")
+
+    assert client_address(scope, trusted_proxies=[]) == "203.0.113.7"
+    assert client_address(scope, trusted_proxies=["10.0.0.0/8"]) == "203.0.113.7"
+
+
+def test_client_address_uses_forwarded_for_from_trusted_proxy() -> None:
+    """За доверенным прокси клиент — правый адрес не из списка прокси."""
+    proxies = ["10.0.0.0/8"]
+
+    # Подставленный клиентом левый адрес не используется
+    scope = http_scope("10.0.0.2", "1.1.1.1, 198.51.100.1", "10.0.0.5")
+    assert client_address(scope, trusted_proxies=proxies) == "198.51.100.1"
+
+    assert client_address(http_scope("10.0.0.2"), proxies) == "10.0.0.2"
+    assert client_address({"type": "http"}, proxies) == "unknown"
+
+
+def test_middleware_keys_clients_behind_proxy(monkeypatch) -> None:
+    """Клиенты за доверенным прокси получают отдельные корзины."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", ["10.0.0.0/8"])
+    app = FastAPI()
+
+    @app.get("/sampling")
+    async def sampling():
+        return {}
+
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=RateLimiter(tools={}),
+        routes={"/sampling": "1/minute"},
+        default="",
+    )
+
+    async def behind_proxy(scope, receive, send):
+        # Все запросы приходят с адреса прокси
+        await app({**scope, "client": ("10.0.0.2", 50000)}, receive, send)
+
+    client = TestClient(behind_proxy)
+
+    first = {"X-Forwarded-For": "198.51.100.1"}
+    second = {"X-Forwarded-For": "198.51.100.2"}
+    assert client.get("/sampling", headers=first).status_code == 200
+    assert client.get("/sampling", headers=first).status_code == 429
+    assert client.get("/sampling", headers=second).status_code == 200
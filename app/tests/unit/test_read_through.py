@@ -0,0 +1,116 @@
+"""
+Тесты для read-through кэша хранилища.
+"""
+
+import asyncio
+from typing import Any, Dict
+
+import pytest
+
+from app.storage.read_through import ReadThroughCache, should_refresh_early
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once() -> None:
+    """Параллельные промахи по одному ключу загружают значение один раз."""
+    calls = 0
+
+    async def loader() -> Dict[str, Any]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"name": "prompt"}
+
+    cache = ReadThroughCache(local_ttl=60)
+    results = await asyncio.gather(
+        *(cache.get("rt:prompt:1", loader) for _ in range(20))
+    )
+
+    assert calls == 1
+    assert results == [{"name": "prompt"}] * 20
+    assert await cache.get("rt:prompt:1", loader) == {"name": "prompt"}
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_loader_error_reaches_all_waiters() -> None:
+    """Ошибка загрузки передается всем ожидающим и не кэшируется."""
+
+    async def loader() -> None:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("es unavailable")
+
+    cache = ReadThroughCache()
+    results = await asyncio.gather(
+        *(cache.get("rt:prompt:2", loader) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert "rt:prompt:2" not in cache.local
+
+
+def test_early_refresh_probability_grows_near_expiry() -> None:
+    """XFetch обновляет значение тем раньше, чем дольше оно загружается."""
+    assert not should_refresh_early(100.0, 0.1, 1.0, now=90.0, rand=0.5)
+    assert should_refresh_early(100.0, 0.1, 1.0, now=99.95, rand=0.5)
+    assert should_refresh_early(100.0, 20.0, 1.0, now=90.0, rand=0.5)
+    assert not should_refresh_early(100.0, 20.0, 0.0, now=90.0, rand=0.5)
+
+
+class PromptIndex:
+    """Индекс промптов Elasticsearch в памяти, считающий чтения."""
+
+    def __init__(self) -> None:
+        self.prompts: Dict[str, Dict[str, Any]] = {"p2": {"name": "p2"}}
+        self.reads = 0
+
+    async def index_prompt(self, data: Dict[str, Any]) -> str:
+        self.prompts[data["name"]] = data
+        return data["name"]
+
+    async def get_prompt(self, prompt_id: str) -> Dict[str, Any]:
+        self.reads += 1
+        return self.prompts.get(prompt_id)
+
+
+@pytest.mark.asyncio
+async def test_storage_keeps_one_cache_copy_per_prompt() -> None:
+    """Запись и read-through чтение промпта используют один ключ Redis."""
+    from app.storage.base import BaseStorage
+    from app.tests.unit.test_redis_storage import FakeRedis, make_storage
+
+    client = FakeRedis()
+    redis_storage = make_storage(client)
+    es = PromptIndex()
+    storage = BaseStorage(es, redis_storage)
+
+    await storage.save_prompt({"name": "p1"})
+    storage.cache.local.clear()
+    assert await storage.get_prompt("p1") == {"name": "p1"}
+    assert es.reads == 0
+
+    # Промах загружается из ES в тот же ключ, что читает RedisStorage
+    assert await storage.get_prompt("p2") == {"name": "p2"}
+    assert es.reads == 1
+    assert await redis_storage.get_cached_prompt("p2") == {"name": "p2"}
+    assert sorted(key for key in client.data if key.startswith("prompt:p")) == [
+        "prompt:p1",
+        "prompt:p2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_prompt_write_visible_to_other_processes() -> None:
+    """Без ближнего кэша запись промпта сразу видна другим процессам."""
+    from app.storage.base import BaseStorage
+    from app.tests.unit.test_redis_storage import FakeRedis, make_storage
+
+    client = FakeRedis()
+    es = PromptIndex()
+    writer = BaseStorage(es, make_storage(client))
+    reader = BaseStorage(es, make_storage(client))
+
+    assert await reader.get_prompt("p2") == {"name": "p2"}
+    await writer.save_prompt({"name": "p2", "version": 2})
+
+    assert await reader.get_prompt("p2") == {"name": "p2", "version": 2}
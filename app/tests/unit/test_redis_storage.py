@@ -0,0 +1,391 @@
+"""
+Тесты для хранилища Redis: пайплайны, скрипты и ближний кэш.
+
+Вместо сервера Redis используется клиент в памяти с тем же интерфейсом
+(get, set, pipeline, pubsub), что и у redis.asyncio.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from app.storage.near_cache import NearCache
+from app.storage.redis import RedisStorage
+
+
+class FakePipeline:
+    """Пайплайн: команды копятся и выполняются одним вызовом execute."""
+
+    def __init__(self, client: "FakeRedis") -> None:
+        self.client = client
+        self.commands: List[Tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        def queue(*args: Any, **kwargs: Any) -> "FakePipeline":
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        self.client.round_trips += 1
+        results = [
+            getattr(self.client, f"_{name}")(*args, **kwargs)
+            for name, args, kwargs in self.commands
+        ]
+        if self.client.delay:
+            await asyncio.sleep(self.client.delay)
+        return results
+
+
+class FakePubSub:
+    """Подписка на каналы клиента в памяти."""
+
+    def __init__(self, client: "FakeRedis") -> None:
+        self.client = client
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str) -> None:
+        self.client.subscribers.setdefault(channel, []).append(self.queue)
+        await self.queue.put({"type": "subscribe", "data": 1})
+
+    async def listen(self) -> Any:
+        while True:
+            message = await self.queue.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+    async def aclose(self) -> None:
+        for queues in self.client.subscribers.values():
+            if self.queue in queues:
+                queues.remove(self.queue)
+
+
+class FakeRedis:
+    """Клиент Redis в памяти с поддержкой сроков жизни ключей."""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+        self.subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self.published: List[Tuple[str, str]] = []
+        self.round_trips = 0
+        # Задержка ответа для воспроизведения гонок
+        self.delay = 0.0
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+    def register_script(self, script: str) -> "FakeScript":
+        return FakeScript(1)
+
+    def disconnect_subscribers(self) -> None:
+        """Обрывает все подписки, как при потере соединения."""
+        for queues in self.subscribers.values():
+            for queue in queues:
+                queue.put_nowait(ConnectionError("connection lost"))
+
+    async def get(self, key: str) -> Optional[str]:
+        self.round_trips += 1
+        value = self._get(key)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return value
+
+    async def set(self, key: str, value: Any, **kwargs: Any) -> bool:
+        self.round_trips += 1
+        return self._set(key, value, **kwargs)
+
+    async def mget(self, keys: List[str]) -> List[Optional[str]]:
+        self.round_trips += 1
+        return [self._get(key) for key in keys]
+
+    async def publish(self, channel: str, message: str) -> int:
+        self.round_trips += 1
+        return self._publish(channel, message)
+
+    def _alive(self, key: str) -> bool:
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _get(self, key: str) -> Optional[str]:
+        return self.data[key] if self._alive(key) else None
+
+    def _set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+    ) -> bool:
+        if nx and self._alive(key):
+            return False
+        self.data[key] = str(value)
+        self.expires.pop(key, None)
+        if ex is not None or px is not None:
+            ttl = ex if ex is not None else px / 1000
+            self.expires[key] = time.monotonic() + ttl
+        return True
+
+    def _pttl(self, key: str) -> int:
+        if not self._alive(key):
+            return -2
+        if key not in self.expires:
+            return -1
+        return int((self.expires[key] - time.monotonic()) * 1000)
+
+    def _delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            deleted += self._alive(key)
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return deleted
+
+    def _lpush(self, key: str, *values: Any) -> int:
+        items = self.data.setdefault(key, [])
+        for value in values:
+            items.insert(0, str(value))
+        return len(items)
+
+    def _ltrim(self, key: str, start: int, end: int) -> bool:
+        self.data[key] = self.data.get(key, [])[start : end + 1]
+        return True
+
+    def _publish(self, channel: str, message: str) -> int:
+        self.published.append((channel, message))
+        queues = self.subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "data": message})
+        return len(queues)
+
+
+class FakeScript:
+    """Скрипт Lua: записывает вызовы и возвращает заданный результат."""
+
+    def __init__(self, result: Any) -> None:
+        self.result = result
+        self.calls: List[Dict[str, Any]] = []
+
+    async def __call__(self, keys: List[str], args: List[Any]) -> Any:
+        self.calls.append({"keys": keys, "args": args})
+        return self.result
+
+
+def make_storage(client: FakeRedis) -> RedisStorage:
+    """Хранилище Redis поверх клиента в памяти, без ближнего кэша."""
+    storage = RedisStorage()
+    storage.redis = client
+    storage.near_cache = None
+    return storage
+
+
+@pytest.mark.asyncio
+async def test_batched_writes_use_one_round_trip() -> None:
+    """Запись нескольких ключей и ресурсов выполняется одним пайплайном."""
+    client = FakeRedis()
+    storage = make_storage(client)
+
+    await storage.set_many({"a": "1", "b": "2"}, ex=60)
+    await storage.cache_resources_many(
+        {"file:///a": {"uri": "file:///a"}, "file:///b": {"uri": "file:///b"}}
+    )
+    await storage.cache_prompt("p1", {"name": "p1"})
+
+    assert client.round_trips == 3
+    assert await storage.mget(["a", "b", "missing"]) == ["1", "2", None]
+    assert await storage.get_cached_resource("file:///b") == {"uri": "file:///b"}
+    assert client.data["prompt:recent"] == ["p1"]
+
+
+@pytest.mark.asyncio
+async def test_prompts_many_reads_with_one_mget() -> None:
+    """Несколько промптов читаются одним MGET, отсутствующие пропускаются."""
+    client = FakeRedis()
+    storage = make_storage(client)
+    await storage.cache_prompt("p1", {"name": "p1"})
+    client.round_trips = 0
+
+    prompts = await storage.get_cached_prompts_many(["p1", "p2"])
+
+    assert prompts == {"p1": {"name": "p1"}}
+    assert client.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_scripts_receive_keys_and_results_are_converted() -> None:
+    """Составные операции выполняются одним скриптом с нужными ключами."""
+    storage = make_storage(FakeRedis())
+    storage._increment_usage = FakeScript(3)
+    storage._rate_limit = FakeScript(0)
+    storage._token_bucket = FakeScript([0, 250])
+
+    assert await storage.increment_resource_usage("file:///a") == 3
+    assert storage._increment_usage.calls == [
+        {
+            "keys": ["resource:usage:file:///a", "resource:popular"],
+            "args": ["file:///a"],
+        }
+    ]
+
+    assert await storage.check_rate_limit("ip:1.2.3.4", 10, 60) is False
+    assert storage._rate_limit.calls[0]["keys"] == ["ratelimit:ip:1.2.3.4"]
+
+    allowed, retry_after = await storage.acquire_tokens("search:1.2.3.4", 20, 40)
+    assert (allowed, retry_after) == (False, 0.25)
+    assert storage._token_bucket.calls[0] == {
+        "keys": ["ratelimit:bucket:search:1.2.3.4"],
+        "args": [20, 40, 1],
+    }
+
+
+def test_scripts_are_registered_for_evalsha() -> None:
+    """Скрипты регистрируются один раз и вызываются через EVALSHA."""
+    storage = RedisStorage()
+
+    for script in (
+        storage._increment_usage,
+        storage._rate_limit,
+        storage._token_bucket,
+    ):
+        assert script.sha
+        assert "redis.call" in script.script
+
+
+async def near_cached_storage(client: FakeRedis, ttl: float = 300) -> RedisStorage:
+    """Хранилище с ближним кэшем, дождавшееся подписки на инвалидацию."""
+    storage = make_storage(client)
+    storage.near_cache = NearCache(client, maxsize=100, ttl=ttl)
+    storage.near_cache._ensure_listener()
+    while not storage.near_cache._subscribed:
+        await asyncio.sleep(0)
+    return storage
+
+
+@pytest.mark.asyncio
+async def test_near_cache_invalidated_on_write_in_all_processes() -> None:
+    """Запись ключа удаляет его копии в памяти всех процессов."""
+    client = FakeRedis()
+    writer = await near_cached_storage(client)
+    reader = await near_cached_storage(client)
+    await writer.create_session("s1", {"user": "a"})
+    assert await reader.get_session("s1") == {"user": "a"}
+    client.round_trips = 0
+
+    # Повторное чтение обслуживается из памяти процесса
+    assert await reader.get_session("s1") == {"user": "a"}
+    assert client.round_trips == 0
+
+    await writer.set("session:s1", '{"user": "b"}')
+    await asyncio.sleep(0)
+    assert await reader.get_session("s1") == {"user": "b"}
+
+    await writer.delete("session:s1")
+    await asyncio.sleep(0)
+    assert await reader.get_session("s1") is None
+
+    await writer.near_cache.close()
+    await reader.near_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_near_cache_ttl_capped_by_key_ttl() -> None:
+    """Значение не переживает истечение ключа в Redis."""
+    client = FakeRedis()
+    storage = await near_cached_storage(client, ttl=300)
+    client._set("session:short", '{"user": "a"}', px=50)
+
+    assert await storage.get_session("short") == {"user": "a"}
+    assert storage.near_cache.local.get("session:short") is not None
+    await asyncio.sleep(0.06)
+
+    assert await storage.get_session("short") is None
+    await storage.near_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_near_cache_skips_value_read_before_invalidation() -> None:
+    """Значение, прочитанное до инвалидации, не попадает в кэш после нее."""
+    client = FakeRedis()
+    storage = await near_cached_storage(client)
+    cache = storage.near_cache
+    client._set("prompt:p1", "old")
+
+    client.delay = 0.02
+    read = asyncio.create_task(cache.get("prompt:p1"))
+    await asyncio.sleep(0.005)
+    # Запись другого процесса, пока чтение еще в пути
+    client._set("prompt:p1", "new")
+    client._publish(cache.channel, '["prompt:p1"]')
+
+    assert await read == "old"
+    assert cache.local.get("prompt:p1") is None
+    client.delay = 0
+    assert await cache.get("prompt:p1") == "new"
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_near_cache_ignores_writes_of_other_keys() -> None:
+    """Записи некэшируемых и других ключей не мешают заполнению кэша."""
+    client = FakeRedis()
+    storage = await near_cached_storage(client)
+    cache = storage.near_cache
+    client._set("prompt:p1", "value")
+
+    # Эмбеддинги и кэш поиска не рассылают сообщений об инвалидации
+    await storage.set_many({"embedding:a": "1", "search:b": "2"})
+    await storage.set("embedding:c", "3")
+    assert client.published == []
+
+    client.delay = 0.02
+    read = asyncio.create_task(cache.get("prompt:p1"))
+    await asyncio.sleep(0.005)
+    client._publish(cache.channel, '["prompt:p2"]')
+
+    assert await read == "value"
+    assert cache.local.get("prompt:p1") == "value"
+    assert not cache._versions and not cache._readers
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_near_cache_cleared_on_disconnect() -> None:
+    """При потере подписки кэш очищается и не пополняется до переподключения."""
+    client = FakeRedis()
+    storage = await near_cached_storage(client)
+    cache = storage.near_cache
+    client._set("prompt:p1", "value")
+    await cache.get("prompt:p1")
+    assert cache.local.get("prompt:p1") == "value"
+
+    client.disconnect_subscribers()
+    await asyncio.sleep(0)
+
+    assert not cache._subscribed
+    assert cache.local.get("prompt:p1") is None
+    await cache.get("prompt:p1")
+    assert cache.local.get("prompt:p1") is None
+
+    # После переподключения значения снова кэшируются
+    while not cache._subscribed:
+        await asyncio.sleep(0.05)
+    await cache.get("prompt:p1")
+    assert cache.local.get("prompt:p1") == "value"
+    await cache.close()
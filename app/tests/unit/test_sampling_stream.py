@@ -0,0 +1,185 @@
+"""
+Тесты для потокового сэмплирования.
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List
+
+import httpx
+import pytest
+
+from app.core.base_sampling import BaseSampler, KeywordSampler
+from app.models.mcp import SamplingRequest
+from app.services.llm_client import llm_client
+from app.services.mcp_service import MCPRegistry, MCPService
+
+
+class EchoSampler(BaseSampler):
+    """Сэмплер, который по одному слову повторяет последнее сообщение."""
+
+    def __init__(self) -> None:
+        super().__init__("echo_sampler")
+        self.generated: List[str] = []
+        self.closed = False
+
+    async def stream(
+        self, request: Dict[str, Any]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        try:
+            for word in request["text"].split():
+                await asyncio.sleep(0)
+                self.generated.append(word)
+                yield {"text": word + " "}
+            yield {"text": "", "stop_reason": "endTurn"}
+        finally:
+            self.closed = True
+
+    async def determine_task_type(self, messages: List[Dict[str, Any]]) -> str:
+        return "echo"
+
+    async def prepare_context(
+        self, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return []
+
+    async def handle_error(self, error: Exception) -> None:
+        pass
+
+    async def subscribe(self, event_type: str) -> AsyncGenerator:
+        yield None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def cleanup(self) -> None:
+        pass
+
+
+def make_service(sampler: BaseSampler) -> MCPService:
+    registry = MCPRegistry()
+    registry.register_sampler("default", sampler)
+    return MCPService(registry=registry)
+
+
+@pytest.mark.asyncio
+async def test_create_sampling_collects_stream() -> None:
+    """Полный ответ собирается из фрагментов потока."""
+    service = make_service(EchoSampler())
+
+    result = await service.create_sampling({"text": "hello streaming world"})
+
+    assert result == {
+        "role": "assistant",
+        "content": {"type": "text", "text": "hello streaming world "},
+        "stopReason": "endTurn",
+    }
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_stops_generation() -> None:
+    """Закрытие потока (отключение клиента) прерывает генерацию."""
+    sampler = EchoSampler()
+    deltas = make_service(sampler).stream_sampling({"text": "a b c d e"})
+
+    assert await deltas.__anext__() == {"text": "a "}
+    await deltas.aclose()
+
+    assert sampler.closed
+    assert sampler.generated == ["a"]
+
+
+def test_stream_without_sampler_fails_eagerly() -> None:
+    """Отсутствие сэмплера обнаруживается до начала потока."""
+    with pytest.raises(NotImplementedError):
+        MCPService(registry=MCPRegistry()).stream_sampling({})
+
+
+class CompletionStream(httpx.AsyncByteStream):
+    """Поток SSE OpenAI-совместимого API, запоминающий закрытие."""
+
+    def __init__(self, words: List[str]) -> None:
+        self.words = words
+        self.sent = 0
+        self.closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for word in self.words:
+            self.sent += 1
+            chunk = {"choices": [{"delta": {"content": word}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        chunk = {"choices": [{"delta": {}, "finish_reason": "length"}]}
+        yield f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode()
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+def use_completion_api(monkeypatch, stream: CompletionStream) -> List[Dict]:
+    """Направляет llm_client в API в памяти; возвращает тела запросов."""
+    requests: List[Dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, stream=stream)
+
+    client = httpx.AsyncClient(
+        base_url="http://llm", transport=httpx.MockTransport(handler)
+    )
+    monkeypatch.setattr(llm_client, "_client", client)
+    return requests
+
+
+def user_request(text: str) -> SamplingRequest:
+    return SamplingRequest(
+        messages=[{"role": "user", "content": {"type": "text", "text": text}}],
+        maxTokens=16,
+        temperature=0.2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_keyword_sampler_streams_from_completion_api(monkeypatch) -> None:
+    """Сэмплер по умолчанию генерирует ответ через sampling API."""
+    stream = CompletionStream(["Use ", "a ", "class."])
+    requests = use_completion_api(monkeypatch, stream)
+    service = make_service(KeywordSampler())
+
+    result = await service.create_sampling(user_request("Refactor this class"))
+
+    assert result == {
+        "role": "assistant",
+        "content": {"type": "text", "text": "Use a class."},
+        "stopReason": "maxTokens",
+    }
+    payload = requests[0]
+    assert payload["stream"] is True
+    assert payload["max_tokens"] == 16
+    assert payload["temperature"] == 0.2
+    assert payload["messages"][0]["role"] == "system"
+    assert "software developer" in payload["messages"][0]["content"]
+    assert payload["messages"][1] == {"role": "user", "content": "Refactor this class"}
+
+
+@pytest.mark.asyncio
+async def test_closing_keyword_sampler_stream_closes_response(monkeypatch) -> None:
+    """Отключение клиента закрывает ответ API и прерывает генерацию."""
+    stream = CompletionStream(["a ", "b ", "c ", "d "])
+    use_completion_api(monkeypatch, stream)
+    deltas = make_service(KeywordSampler()).stream_sampling(user_request("hi"))
+
+    assert await deltas.__anext__() == {"text": "a "}
+    await deltas.aclose()
+
+    assert stream.closed
+    assert stream.sent == 1
+
+
+def test_sampler_must_implement_stream() -> None:
+    """Сэмплер без stream нельзя создать."""
+
+    class SilentSampler(KeywordSampler):
+        stream = BaseSampler.stream
+
+    with pytest.raises(TypeError):
+        SilentSampler()
@@ -0,0 +1,135 @@
+"""
+Тесты построения запросов поиска и ключей кэша результатов.
+"""
+
+import json
+from typing import List
+
+import httpx
+import pytest
+
+from app.tools.search import SearchTool
+from app.tools.search.cache import SearchResultCache
+from app.tools.search.strategies import SemanticSearchStrategy, reciprocal_rank_fusion
+
+
+def test_knn_query_pushes_filters_into_prefilter() -> None:
+    """Фильтры передаются в kNN, а k покрывает страницу результатов."""
+    filters = [{"term": {"mime_type": "text/plain"}}]
+    body = SemanticSearchStrategy.build_knn_query(
+        [0.1, 0.2], {"size": 10, "from_": 20, "filters": filters}
+    )
+
+    assert "query" not in body
+    assert body["knn"]["filter"] == filters
+    assert body["knn"]["k"] == 30
+    assert body["knn"]["num_candidates"] >= body["knn"]["k"]
+    assert body["from"] == 20
+
+
+def test_reciprocal_rank_fusion_orders_by_combined_rank() -> None:
+    """Документ из обоих списков поднимается выше документов из одного."""
+    knn_hits = [{"_id": "a", "_score": 0.9}, {"_id": "b", "_score": 0.8}]
+    text_hits = [{"_id": "c", "_score": 12.0}, {"_id": "b", "_score": 7.0}]
+
+    fused = reciprocal_rank_fusion([knn_hits, text_hits], rank_constant=60)
+
+    assert [hit["_id"] for hit in fused] == ["b", "a", "c"]
+    assert fused[0]["_score"] == 2 / 62
+
+
+def test_search_cache_key_is_canonical() -> None:
+    """Ключ не зависит от порядка параметров и меняется с поколением индекса."""
+    params = {"size": 10, "filters": [{"term": {"tag": "a"}}], "timeout": 5}
+    reordered = {"filters": [{"term": {"tag": "a"}}], "size": 10}
+
+    key = SearchResultCache.make_key("text", "mcp", "docs", params, generation=3)
+
+    assert key == SearchResultCache.make_key("text", "mcp", "docs", reordered, 3)
+    assert key != SearchResultCache.make_key("text", "mcp", "docs", reordered, 4)
+    assert key.startswith("search:docs:3:")
+
+
+@pytest.mark.asyncio
+async def test_batch_search_sends_single_msearch() -> None:
+    """Пакет выполняется одним _msearch, ошибки возвращаются по запросам."""
+    requests: List[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        lines = request.content.decode().splitlines()
+        assert [json.loads(line) for line in lines[::2]] == [
+            {"index": "docs"},
+            {"index": "logs"},
+        ]
+        return httpx.Response(
+            200,
+            json={
+                "responses": [
+                    {"hits": {"hits": [{"_id": "1"}]}},
+                    {"error": {"type": "index_not_found_exception"}, "status": 404},
+                ]
+            },
+        )
+
+    tool = SearchTool()
+    tool.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://es"
+    )
+    result = await tool.execute(
+        {
+            "operation": "batch",
+            "searches": [
+                {"operation": "text", "query": "mcp", "index": "docs"},
+                {"operation": "faceted", "query": "mcp", "index": "logs"},
+                {"operation": "unknown", "query": "mcp", "index": "docs"},
+            ],
+        }
+    )
+
+    assert len(requests) == 1
+    assert requests[0].url.path == "/_msearch"
+    first, second, third = result["results"]
+    assert first["result"]["hits"]["hits"] == [{"_id": "1"}]
+    assert "index_not_found_exception" in second["error"]
+    assert "unknown" in third["error"]
+
+
+@pytest.mark.asyncio
+async def test_stream_pages_with_search_after_and_closes_pit() -> None:
+    """Потоковый поиск передает search_after и закрывает point-in-time."""
+    documents = [{"_id": str(i), "sort": [1.0, i]} for i in range(5)]
+    bodies: List[dict] = []
+    closed: List[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/docs/_pit":
+            return httpx.Response(200, json={"id": "pit-1"})
+        if request.method == "DELETE":
+            closed.append(json.loads(request.content)["id"])
+            return httpx.Response(200, json={"succeeded": True})
+        body = json.loads(request.content)
+        bodies.append(body)
+        start = body["search_after"][1] + 1 if "search_after" in body else 0
+        page = documents[start : start + body["size"]]
+        return httpx.Response(200, json={"pit_id": "pit-2", "hits": {"hits": page}})
+
+    tool = SearchTool()
+    tool.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://es"
+    )
+    pages = tool.stream("text", "mcp", "docs", {"page_size": 2})
+    received = [[hit["_id"] for hit in hits] async for hits in pages]
+
+    assert received == [["0", "1"], ["2", "3"], ["4"]]
+    assert "from" not in bodies[0]
+    assert bodies[0]["sort"][-1] == {"_shard_doc": "asc"}
+    assert bodies[1]["search_after"] == [1.0, 1]
+    assert bodies[1]["pit"]["id"] == "pit-2"
+    assert closed == ["pit-2"]
+
+
+def test_stream_rejects_semantic_operation() -> None:
+    """Семантический поиск не выгружается постранично."""
+    with pytest.raises(ValueError):
+        SearchTool().stream("semantic", "mcp", "docs")
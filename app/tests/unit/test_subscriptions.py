@@ -0,0 +1,114 @@
+"""
+Тесты для подписок на изменения ресурсов.
+"""
+
+import asyncio
+from typing import Any, Dict, List
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.base_resources import MemoryResource
+from app.services.subscriptions import (
+    Subscriber,
+    SubscriptionManager,
+    resource_subscriptions,
+)
+
+
+@pytest.mark.asyncio
+async def test_lagging_subscriber_receives_latest_state_as_diff() -> None:
+    """Пока подписчик занят, обновления объединяются до последнего состояния."""
+    received: List[Dict[str, Any]] = []
+    unblocked = asyncio.Event()
+
+    async def deliver(notification: Dict[str, Any]) -> None:
+        await unblocked.wait()
+        received.append(notification)
+
+    manager = SubscriptionManager()
+    subscriber = Subscriber(deliver)
+    manager.subscribe(subscriber, "memory://system", diff=True)
+    manager.publish("memory://system", {"cpu": 1, "disk": 50})
+    await asyncio.sleep(0)
+
+    # Первое состояние доставляется, следующие копятся с заменой
+    for cpu in range(2, 100):
+        manager.publish("memory://system", {"cpu": cpu, "disk": 50})
+    unblocked.set()
+    await asyncio.sleep(0.01)
+
+    assert received == [
+        {"uri": "memory://system", "state": {"cpu": 1, "disk": 50}},
+        {"uri": "memory://system", "diff": {"changed": {"cpu": 99}, "removed": []}},
+    ]
+
+    assert manager.unsubscribe(subscriber, "memory://system")
+    manager.publish("memory://system", {"cpu": 100})
+    await asyncio.sleep(0.01)
+    assert len(received) == 2
+    await manager.remove(subscriber)
+
+
+def test_subscription_limit() -> None:
+    """Подписки сверх лимита подписчика отклоняются."""
+    manager = SubscriptionManager(max_subscriptions=1)
+    subscriber = Subscriber(lambda notification: asyncio.sleep(0))
+
+    manager.subscribe(subscriber, "memory://a")
+    with pytest.raises(ValueError):
+        manager.subscribe(subscriber, "memory://b")
+
+
+@pytest.mark.asyncio
+async def test_latest_state_kept_only_while_subscribed() -> None:
+    """Состояние ресурсов без подписчиков не хранится."""
+    manager = SubscriptionManager()
+    first = Subscriber(lambda notification: asyncio.sleep(0))
+    second = Subscriber(lambda notification: asyncio.sleep(0))
+
+    for i in range(100):
+        manager.publish(f"memory://unwatched-{i}", {"value": i})
+    assert manager._latest == {}
+
+    manager.subscribe(first, "memory://a")
+    manager.subscribe(second, "memory://a")
+    manager.publish("memory://a", {"value": 1})
+    assert manager._latest == {"memory://a": {"value": 1}}
+
+    manager.unsubscribe(first, "memory://a")
+    assert "memory://a" in manager._latest
+    manager.unsubscribe(second, "memory://a")
+    assert manager._latest == {}
+
+    await manager.remove(first)
+    await manager.remove(second)
+
+
+@pytest.mark.asyncio
+async def test_memory_resource_publishes_resource_state(monkeypatch) -> None:
+    """Запись ресурса в памяти публикует то же состояние, что и content."""
+    received: List[Dict[str, Any]] = []
+
+    async def deliver(notification: Dict[str, Any]) -> None:
+        received.append(notification)
+
+    resource = MemoryResource("stats")
+    monkeypatch.setattr(resource, "log_event", AsyncMock(), raising=False)
+    subscriber = Subscriber(deliver)
+    resource_subscriptions.subscribe(subscriber, resource.uri)
+    await resource.write({"cpu": 1})
+    await asyncio.sleep(0)
+
+    assert received == [
+        {
+            "uri": "memory://stats",
+            "state": {
+                "uri": "memory://stats",
+                "name": "stats",
+                "mime_type": "application/json",
+                "content": {"cpu": 1},
+            },
+        }
+    ]
+    await resource_subscriptions.remove(subscriber)
@@ -0,0 +1,100 @@
+"""
+Тесты для пакетного вызова инструментов.
+"""
+
+import asyncio
+from typing import Any, Dict
+
+import pytest
+
+from app.core.config import settings
+from app.services.mcp_service import MCPRegistry, MCPService
+
+
+class SleepTool:
+    """Инструмент, который завершается через заданное время."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    async def execute(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(parameters["delay"])
+        if parameters.get("fail"):
+            raise RuntimeError("boom")
+        return {"delay": parameters["delay"]}
+
+
+@pytest.mark.asyncio
+async def test_execute_tools_yields_in_completion_order() -> None:
+    """Результаты приходят по мере завершения, ошибки не прерывают пакет."""
+    registry = MCPRegistry()
+    registry.register_tool(SleepTool("sleep"))
+    service = MCPService(registry=registry)
+
+    calls = [
+        {"name": "sleep", "parameters": {"delay": 0.05}},
+        {"name": "sleep", "parameters": {"delay": 0.0, "fail": True}},
+        {"name": "missing", "parameters": {}},
+        {"name": "sleep", "parameters": {"delay": 0.01}},
+    ]
+    results = [result async for result in service.execute_tools(calls)]
+
+    assert [result["index"] for result in results][-2:] == [3, 0]
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0] == {
+        "index": 0,
+        "name": "sleep",
+        "success": True,
+        "result": {"delay": 0.05},
+    }
+    assert by_index[1]["success"] is False
+    assert by_index[1]["error"]["message"] == "boom"
+    assert by_index[2]["error"]["code"] == "tool_error"
+
+
+def test_execute_tools_rejects_oversized_batch() -> None:
+    """Пакет сверх TOOL_BATCH_MAX_CALLS отклоняется до начала выполнения."""
+    service = MCPService(registry=MCPRegistry())
+    calls = [{"name": "sleep"}] * (settings.TOOL_BATCH_MAX_CALLS + 1)
+
+    with pytest.raises(ValueError):
+        service.execute_tools(calls)
+
+
+@pytest.mark.asyncio
+async def test_graphql_batch_applies_tool_rate_limits(monkeypatch) -> None:
+    """Пакет GraphQL проверяет лимит инструмента для каждого вызова."""
+    from types import SimpleNamespace
+
+    from app.core.rate_limit import RateLimit, rate_limiter
+    from app.models.graphql import schema
+    from app.services.mcp_service import mcp_service
+
+    registry = MCPRegistry()
+    registry.register_tool(SleepTool("sleep"))
+    monkeypatch.setattr(mcp_service, "registry", registry)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limiter, "storage", None)
+    monkeypatch.setattr(
+        rate_limiter, "tool_limits", {"sleep": RateLimit.parse("2/minute")}
+    )
+    request = SimpleNamespace(scope={"client": ("10.0.0.1", 50000)})
+
+    result = await schema.execute(
+        """
+        mutation {
+          executeTools(inputs: [
+            {name: "sleep", parameters: {delay: 0}},
+            {name: "sleep", parameters: {delay: 0}},
+            {name: "sleep", parameters: {delay: 0}}
+          ]) { isError }
+          executeTool(input: {name: "sleep", parameters: {delay: 0}}) { isError }
+        }
+        """,
+        context_value={"request": request},
+    )
+
+    assert result.errors is None
+    errors = [item["isError"] for item in result.data["executeTools"]]
+    assert sorted(errors) == [False, False, True]
+    assert result.data["executeTool"]["isError"] is True
@@ -0,0 +1,93 @@
+"""
+Тесты для исполнителя инструментов.
+"""
+
+import asyncio
+from typing import Any, Dict
+
+import pytest
+
+from app.core.errors import ToolOverloadedError, ToolTimeoutError
+from app.services.tool_executor import ToolExecutor
+
+
+class BlockingTool:
+    """Инструмент, который ждет сигнала перед завершением."""
+
+    name = "blocking"
+
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.running = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def execute(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await self.release.wait()
+            return {"ok": True}
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.asyncio
+async def test_executor_limits_concurrency_and_rejects_overflow() -> None:
+    """Сверх лимита вызовы ждут в очереди, а при полной очереди отклоняются."""
+    executor = ToolExecutor(max_concurrency=2, max_queue=1, timeout=0)
+    tool = BlockingTool()
+
+    tasks = [asyncio.create_task(executor.execute(tool, {})) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert tool.running == 2
+
+    with pytest.raises(ToolOverloadedError):
+        await executor.execute(tool, {})
+
+    tool.release.set()
+    results = await asyncio.gather(*tasks)
+    assert results == [{"ok": True}] * 3
+    assert tool.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_executor_rejects_overflow_of_burst_with_timeout() -> None:
+    """Очередь ограничена и для одновременной пачки вызовов с таймаутом."""
+    executor = ToolExecutor(max_concurrency=1, max_queue=1, timeout=5)
+    tool = BlockingTool()
+
+    calls = [executor.execute(tool, {}) for _ in range(10)]
+    tasks = [asyncio.create_task(call) for call in calls]
+    await asyncio.sleep(0.01)
+    tool.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    rejected = [r for r in results if isinstance(r, ToolOverloadedError)]
+    assert len(rejected) == 8
+    assert results.count({"ok": True}) == 2
+    assert tool.peak == 1
+
+    # Слоты освобождены после завершения вызовов
+    assert await executor.execute(tool, {}) == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_executor_timeout_cancels_tool() -> None:
+    """По таймауту вызов отменяется и поднимается ToolTimeoutError."""
+    executor = ToolExecutor(max_concurrency=1, max_queue=1, timeout=0.05)
+    tool = BlockingTool()
+
+    with pytest.raises(ToolTimeoutError) as exc_info:
+        await executor.execute(tool, {})
+
+    assert exc_info.value.code == "tool_timeout"
+    assert tool.cancelled == 1
+    assert tool.running == 0
+
+    # Слот освобожден: следующий вызов выполняется
+    tool.release.set()
+    assert await executor.execute(tool, {}) == {"ok": True}
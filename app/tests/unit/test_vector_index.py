@@ -0,0 +1,160 @@
+"""
+Тесты локального векторного индекса IVF.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from app.storage.vector_index import IVFIndex, VectorIndexRegistry, recall_at_k
+
+
+def make_corpus(size: int = 2000, dim: int = 32) -> np.ndarray:
+    """Кластеризованный корпус случайных векторов."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, dim))
+    points = centers[rng.integers(0, len(centers), size)]
+    return (points + 0.3 * rng.normal(size=(size, dim))).astype(np.float32)
+
+
+def test_search_recall_against_exact_scan() -> None:
+    """Приближенный поиск находит почти все точные соседи."""
+    vectors = make_corpus()
+    index = IVFIndex.build([str(i) for i in range(len(vectors))], vectors)
+
+    assert recall_at_k(index, vectors[:50], k=10, n_probe=8) >= 0.9
+
+
+def test_incremental_add_and_remove() -> None:
+    """Вставленные векторы находятся сразу, удаленные — исчезают."""
+    vectors = make_corpus()
+    index = IVFIndex.build(
+        [str(i) for i in range(len(vectors))], vectors, merge_threshold=2
+    )
+    query = np.ones(vectors.shape[1], dtype=np.float32)
+
+    index.add(["new"], query)
+    assert index.search(query, k=1)[0][0] == "new"
+
+    # Вторая вставка превышает порог и сливает дельту со списками
+    index.add(["0"], -query)
+    assert index.search(query, k=1)[0][0] == "new"
+    assert index.search(-query, k=1)[0][0] == "0"
+    assert len(index) == len(vectors) + 1
+
+    index.remove(["new"])
+    assert "new" not in index
+    assert index.search(query, k=1)[0][0] != "new"
+
+
+def test_save_and_load_memory_mapped(tmp_path: Path) -> None:
+    """Индекс сохраняется на диск и открывается через отображение в память."""
+    vectors = make_corpus(size=500)
+    ids = [f"doc-{i}" for i in range(len(vectors))]
+    IVFIndex.build(ids, vectors).save(tmp_path)
+
+    loaded = IVFIndex.load(tmp_path)
+
+    assert isinstance(loaded._vectors, np.memmap)
+    assert len(loaded) == len(ids)
+    assert loaded.search(vectors[7], k=1)[0][0] == "doc-7"
+
+
+def test_build_empty_corpus() -> None:
+    """Пустой корпус дает пустой индекс заданной размерности."""
+    index = IVFIndex.build([], np.asarray([], dtype=np.float32), dim=16)
+
+    assert index.dim == 16
+    assert len(index) == 0
+    assert index.search(np.ones(16, dtype=np.float32), k=5) == []
+
+
+def test_merge_persists_and_keeps_memory_map(tmp_path: Path) -> None:
+    """Слияние сохраняет дельту на диск и снова отображает векторы в память."""
+    vectors = make_corpus(size=500)
+    IVFIndex.build([str(i) for i in range(len(vectors))], vectors).save(tmp_path)
+    index = IVFIndex.load(tmp_path, merge_threshold=1)
+    query = np.ones(vectors.shape[1], dtype=np.float32)
+
+    index.add(["new"], query)
+
+    assert isinstance(index._vectors, np.memmap)
+    assert IVFIndex.load(tmp_path).search(query, k=1)[0][0] == "new"
+    # На диске остается только одна версия файлов, временных файлов нет
+    assert len(list(tmp_path.glob("vectors*.npy"))) == 1
+    assert not list(tmp_path.glob(".*"))
+
+
+@pytest.mark.asyncio
+async def test_registry_updates_off_event_loop(tmp_path: Path) -> None:
+    """Реестр открывает индекс и вставляет векторы в потоке."""
+    vectors = make_corpus(size=200)
+    IVFIndex.build([str(i) for i in range(len(vectors))], vectors).save(
+        tmp_path / "docs"
+    )
+    registry = VectorIndexRegistry(tmp_path)
+    query = np.ones(vectors.shape[1], dtype=np.float32)
+
+    await registry.add("docs", ["new"], query)
+    await registry.remove("missing", ["new"])
+
+    index = await registry.get("docs")
+    assert index.search(query, k=1)[0][0] == "new"
+    assert await registry.get("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_registry_has_single_owner_process(tmp_path: Path) -> None:
+    """Индексами каталога владеет один процесс, остальные их не открывают."""
+    vectors = make_corpus(size=50)
+    IVFIndex.build([str(i) for i in range(len(vectors))], vectors).save(
+        tmp_path / "docs"
+    )
+    owner = VectorIndexRegistry(tmp_path)
+    # Отдельный файл блокировки, как у другого процесса
+    other = VectorIndexRegistry(tmp_path)
+
+    assert await owner.get("docs") is not None
+    with pytest.raises(RuntimeError):
+        other.acquire()
+    assert await other.get("docs") is None
+    await other.add("docs", ["lost"], vectors[0])
+    assert "lost" not in await owner.get("docs")
+
+    owner.release()
+    assert await other.get("docs") is not None
+    other.release()
+
+
+class ScanStorage:
+    """Хранилище Elasticsearch в памяти с методом scan."""
+
+    def __init__(self, hits: List[Dict[str, Any]]) -> None:
+        self.hits = hits
+        self.sources: List[Any] = []
+
+    async def scan(self, index: str, source: Any = None) -> Any:
+        self.sources.append(source)
+        for hit in self.hits:
+            yield hit
+
+
+@pytest.mark.asyncio
+async def test_registry_builds_from_embedding_field(tmp_path: Path) -> None:
+    """Индекс строится по полю embedding, как kNN-поиск и загрузка документов."""
+    vectors = make_corpus(size=20, dim=384)
+    storage = ScanStorage(
+        [
+            {"_id": str(i), "_source": {"embedding": vector.tolist()}}
+            for i, vector in enumerate(vectors)
+        ]
+    )
+    registry = VectorIndexRegistry(tmp_path)
+
+    index = await registry.build("docs", storage)
+
+    assert storage.sources == [["embedding"]]
+    assert len(index) == len(vectors)
+    registry.release()
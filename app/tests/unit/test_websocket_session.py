@@ -0,0 +1,87 @@
+"""
+Тесты для мультиплексированного сеанса WebSocket.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.websocket import WebSocketSession
+
+
+class FakeWebSocket:
+    """Соединение, сообщения которого передаются через очередь."""
+
+    client = None
+    scope: Dict[str, Any] = {}
+
+    def __init__(self) -> None:
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent: List[Dict[str, Any]] = []
+
+    async def receive_text(self) -> str:
+        message = await self.incoming.get()
+        if message is None:
+            raise WebSocketDisconnect()
+        return json.dumps(message)
+
+    async def send_json(self, message: Dict[str, Any]) -> None:
+        self.sent.append(message)
+
+
+async def slow(session: WebSocketSession, request_id: str, data: Dict[str, Any]):
+    await asyncio.sleep(10)
+    await session.send("slow_response", {}, request_id)
+
+
+async def fast(session: WebSocketSession, request_id: str, data: Dict[str, Any]):
+    await session.send("fast_response", {"value": data["value"]}, request_id)
+
+
+async def wait_for_message(websocket: FakeWebSocket, message_type: str) -> None:
+    """Ждет отправки сообщения заданного типа."""
+    while not any(message["type"] == message_type for message in websocket.sent):
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_slow_request_does_not_block_and_can_be_cancelled() -> None:
+    """Быстрый запрос отвечает раньше медленного, медленный отменяется."""
+    websocket = FakeWebSocket()
+    session = WebSocketSession(websocket, {"slow": slow, "fast": fast})
+    runner = asyncio.create_task(session.run())
+
+    await websocket.incoming.put({"type": "slow", "id": "a"})
+    await websocket.incoming.put({"type": "fast", "id": "b", "data": {"value": 1}})
+    await asyncio.wait_for(wait_for_message(websocket, "fast_response"), 1)
+    assert websocket.sent == [
+        {"type": "fast_response", "id": "b", "data": {"value": 1}}
+    ]
+
+    await websocket.incoming.put({"type": "cancel", "id": "a"})
+    await asyncio.wait_for(wait_for_message(websocket, "cancelled"), 1)
+    assert websocket.sent[-1] == {"type": "cancelled", "id": "a", "data": {}}
+
+    await websocket.incoming.put(None)
+    await asyncio.wait_for(runner, 1)
+
+
+@pytest.mark.asyncio
+async def test_pending_limit_rejects_excess_requests() -> None:
+    """Запрос сверх лимита ожидающих отклоняется, остальные отменяются при отключении."""
+    websocket = FakeWebSocket()
+    session = WebSocketSession(
+        websocket, {"slow": slow}, max_concurrency=1, max_pending=2
+    )
+
+    for request_id in ("a", "b", "c"):
+        await session.dispatch(json.dumps({"type": "slow", "id": request_id}))
+
+    assert websocket.sent == [
+        {"type": "error", "id": "c", "data": {"message": "Too many pending requests"}}
+    ]
+    await session.close()
+    assert len(websocket.sent) == 1
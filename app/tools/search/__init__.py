@@ -5,6 +5,6 @@
 включая полнотекстовый, семантический и фасетный поиск.
 """
 
-from app.tools.search.search_tool import SearchTool
+from app.tools.search.search_tool import SearchTool, get_search_tool
 
-__all__ = ["SearchTool"]
+__all__ = ["SearchTool", "get_search_tool"]
@@ -0,0 +1,148 @@
+"""
+Кэш результатов поиска.
+
+Ключ кэша — SHA-256 канонического JSON запроса (операция, запрос, индекс,
+параметры) вместе с текущим поколением индекса. Поколение хранится в Redis
+и увеличивается при каждой записи в индекс, поэтому после изменения данных
+старые записи перестают находиться и истекают по TTL.
+
+Записи хранятся во внутрипроцессном кэше и в Redis.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from prometheus_client import Counter
+
+from app.core.config import settings
+from app.storage.redis import redis_storage
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_REQUESTS = Counter(
+    "search_cache_requests_total",
+    "Обращения к кэшу результатов поиска",
+    ["result"],
+)
+
+# Параметры, не влияющие на результат поиска
+_IGNORED_PARAMS = {"cache", "timeout"}
+
+
+class SearchResultCache:
+    """
+    Двухуровневый кэш результатов поиска с инвалидацией по поколению индекса.
+
+    Attributes:
+        ttl: Время жизни записи в секундах (0 отключает кэш)
+    """
+
+    def __init__(self, maxsize: int, ttl: int) -> None:
+        """
+        Инициализирует кэш.
+
+        Args:
+            maxsize: Максимальное число записей во внутрипроцессном кэше
+            ttl: Время жизни записи в секундах
+        """
+        self.ttl = ttl
+        self.local = TTLCache("search", maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def make_key(
+        operation: str, query: str, index: str, params: Dict[str, Any], generation: int
+    ) -> str:
+        """
+        Формирует ключ кэша для запроса.
+
+        Args:
+            operation: Тип операции поиска
+            query: Поисковый запрос
+            index: Индекс для поиска
+            params: Дополнительные параметры
+            generation: Поколение индекса
+
+        Returns:
+            str: Ключ кэша
+        """
+        canonical = json.dumps(
+            {
+                "operation": operation,
+                "query": query,
+                "index": index,
+                "params": {k: v for k, v in params.items() if k not in _IGNORED_PARAMS},
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+        digest = hashlib.sha256(canonical.encode()).hexdigest()
+        return f"search:{index}:{generation}:{digest}"
+
+    async def get_or_search(
+        self,
+        operation: str,
+        query: str,
+        index: str,
+        params: Dict[str, Any],
+        search: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Возвращает результат из кэша или выполняет поиск и кэширует его.
+
+        Если Redis недоступен, поиск выполняется без кэша: без текущего
+        поколения нельзя гарантировать свежесть записи.
+
+        Args:
+            operation: Тип операции поиска
+            query: Поисковый запрос
+            index: Индекс для поиска
+            params: Дополнительные параметры (cache=False отключает кэш)
+            search: Функция выполнения поиска
+
+        Returns:
+            Dict[str, Any]: Результаты поиска
+        """
+        if self.ttl <= 0 or params.get("cache") is False:
+            SEARCH_CACHE_REQUESTS.labels("bypass").inc()
+            return await search()
+
+        try:
+            generation = await redis_storage.get_index_generation(index)
+            key = self.make_key(operation, query, index, params, generation)
+
+            result = self.local.get(key)
+            if result is not None:
+                SEARCH_CACHE_REQUESTS.labels("local").inc()
+                return result
+
+            cached = await redis_storage.get(key)
+        except Exception as e:
+            logger.warning(f"Кэш результатов поиска недоступен: {str(e)}")
+            SEARCH_CACHE_REQUESTS.labels("bypass").inc()
+            return await search()
+
+        if cached is not None:
+            SEARCH_CACHE_REQUESTS.labels("redis").inc()
+            result = json.loads(cached)
+            self.local.set(key, result)
+            return result
+
+        SEARCH_CACHE_REQUESTS.labels("miss").inc()
+        result = await search()
+        self.local.set(key, result)
+        try:
+            await redis_storage.set(key, json.dumps(result, default=str), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить результат поиска: {str(e)}")
+        return result
+
+
+# Создаем глобальный экземпляр
+search_cache = SearchResultCache(
+    maxsize=settings.SEARCH_CACHE_SIZE, ttl=settings.SEARCH_CACHE_TTL
+)
@@ -4,17 +4,22 @@
 Предоставляет функциональность для выполнения различных типов поиска.
 """
 
+import json
 import logging
-from typing import Any, Dict, Optional, Protocol
+from typing import Any, AsyncGenerator, Dict, List, Optional, Protocol, Tuple
 
 import httpx
 
 from app.core.base.tool import MCPTool
+from app.core.config import settings
+from app.storage.es_client import es_http_client
+from app.tools.search.cache import search_cache
 from app.tools.search.strategies import (
     FacetedSearchStrategy,
     SemanticSearchStrategy,
     TextSearchStrategy,
 )
+from app.utils.embeddings import embeddings_manager
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +27,13 @@ logger = logging.getLogger(__name__)
 class SearchStrategy(Protocol):
     """
     Протокол для стратегий поиска.
+
+    Attributes:
+        needs_embedding: Требуется ли векторное представление запроса
     """
 
+    needs_embedding: bool
+
     async def search(
         self,
         query: str,
@@ -45,6 +55,46 @@ class SearchStrategy(Protocol):
         """
         ...
 
+    def build_searches(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        query_vector: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Формирует тела запросов _search для пакетного поиска.
+
+        Args:
+            query: Поисковый запрос
+            params: Дополнительные параметры
+            query_vector: Нормализованный вектор запроса
+
+        Returns:
+            List[Dict[str, Any]]: Тела запросов _search
+        """
+        ...
+
+    def merge(
+        self, responses: List[Dict[str, Any]], params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Объединяет ответы на запросы из build_searches.
+
+        Args:
+            responses: Ответы Elasticsearch в порядке запросов
+            params: Дополнительные параметры
+
+        Returns:
+            Dict[str, Any]: Результаты поиска
+        """
+        ...
+
+
+# Запрос пакета: позиция, стратегия и описание запроса
+_PreparedSearch = Tuple[int, SearchStrategy, Dict[str, Any]]
+# Поиски запроса в _msearch: позиция, стратегия, параметры, начало и число
+_SearchSpan = Tuple[int, SearchStrategy, Dict[str, Any], int, int]
+
 
 class SearchStrategyFactory:
     """
@@ -88,14 +138,19 @@ class SearchTool(MCPTool):
     - Полнотекстовый поиск
     - Семантический поиск
     - Фасетный поиск
+    - Пакетный поиск: несколько запросов одним обращением к _msearch
+    - Потоковый поиск по всему индексу через point-in-time и search_after
     """
 
+    # Операции, результаты которых можно выгружать постранично
+    stream_operations = ("text", "faceted")
+
     input_schema = {
         "type": "object",
         "properties": {
             "operation": {
                 "type": "string",
-                "enum": ["text", "semantic", "faceted"],
+                "enum": ["text", "semantic", "faceted", "batch"],
                 "description": "Тип операции поиска",
             },
             "query": {
@@ -106,6 +161,23 @@ class SearchTool(MCPTool):
                 "type": "string",
                 "description": "Индекс Elasticsearch для поиска",
             },
+            "searches": {
+                "type": "array",
+                "description": "Запросы пакетного поиска (для операции batch)",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "operation": {
+                            "type": "string",
+                            "enum": ["text", "semantic", "faceted"],
+                        },
+                        "query": {"type": "string"},
+                        "index": {"type": "string"},
+                        "params": {"type": "object"},
+                    },
+                    "required": ["operation", "query", "index"],
+                },
+            },
             "params": {
                 "type": "object",
                 "description": "Дополнительные параметры поиска",
@@ -139,14 +211,49 @@ class SearchTool(MCPTool):
                         "type": "string",
                         "description": "Поле с векторными эмбеддингами",
                     },
+                    "backend": {
+                        "type": "string",
+                        "enum": ["elasticsearch", "local"],
+                        "description": "Бэкенд векторного поиска",
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["knn", "exact", "hybrid"],
+                        "description": "Режим семантического поиска",
+                    },
+                    "k": {
+                        "type": "integer",
+                        "description": "Число ближайших соседей kNN",
+                    },
+                    "num_candidates": {
+                        "type": "integer",
+                        "description": "Число кандидатов kNN на шард",
+                    },
+                    "rank_window": {
+                        "type": "integer",
+                        "description": "Окно ранжирования гибридного поиска",
+                    },
+                    "n_probe": {
+                        "type": "integer",
+                        "description": "Число списков локального индекса IVF",
+                    },
                     "es_url": {
                         "type": "string",
-                        "description": "URL Elasticsearch",
+                        "description": "URL Elasticsearch "
+                        "(по умолчанию settings.ELASTICSEARCH_URL)",
+                    },
+                    "cache": {
+                        "type": "boolean",
+                        "description": "Использовать кэш результатов поиска",
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "Таймаут запроса к Elasticsearch в секундах",
                     },
                 },
             },
         },
-        "required": ["operation", "query", "index"],
+        "required": ["operation"],
     }
 
     def __init__(self, name: str = "search", description: str = ""):
@@ -163,30 +270,56 @@ class SearchTool(MCPTool):
                 "Поддерживает полнотекстовый, семантический и фасетный поиск."
             )
 
-        super().__init__(name=name, description=description)
-        self.client = None
+        super().__init__()
+        self.name = name
+        self.description = description
+        # Базовый класс сбрасывает схему, восстанавливаем схему инструмента
+        self.input_schema = type(self).input_schema
+        self.client: Optional[httpx.AsyncClient] = None
 
     async def initialize(self) -> None:
         """
         Инициализирует инструмент.
+
+        Инструмент использует общий пул соединений с Elasticsearch.
         """
         logger.info("Инициализация инструмента поиска")
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.client = es_http_client.client
 
     async def cleanup(self) -> None:
         """
         Освобождает ресурсы инструмента.
+
+        Общий клиент закрывается при остановке приложения, а не инструментом.
         """
         logger.info("Освобождение ресурсов инструмента поиска")
-        if self.client:
-            await self.client.aclose()
+        self.client = None
 
-    async def execute(
+    async def execute(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Выполняет инструмент с параметрами из MCP API.
+
+        Args:
+            parameters: Параметры по схеме input_schema
+
+        Returns:
+            Dict[str, Any]: Результаты поиска
+        """
+        return await self.search(
+            operation=parameters.get("operation", ""),
+            query=parameters.get("query", ""),
+            index=parameters.get("index", ""),
+            params=parameters.get("params"),
+            searches=parameters.get("searches"),
+        )
+
+    async def search(
         self,
         operation: str,
-        query: str,
-        index: str,
+        query: str = "",
+        index: str = "",
         params: Optional[Dict[str, Any]] = None,
+        searches: Optional[List[Dict[str, Any]]] = None,
     ) -> Dict[str, Any]:
         """
         Выполняет поисковую операцию.
@@ -196,6 +329,7 @@ class SearchTool(MCPTool):
             query: Поисковый запрос
             index: Индекс для поиска
             params: Дополнительные параметры
+            searches: Запросы пакетного поиска (для операции batch)
 
         Returns:
             Dict[str, Any]: Результаты поиска
@@ -203,6 +337,9 @@ class SearchTool(MCPTool):
         Raises:
             ValueError: Если указаны некорректные параметры
         """
+        if operation == "batch":
+            return await self._execute_batch(searches or [], params or {})
+
         if not query:
             raise ValueError("Поисковый запрос не может быть пустым")
 
@@ -221,15 +358,19 @@ class SearchTool(MCPTool):
             # Получаем стратегию поиска
             strategy = SearchStrategyFactory.get_strategy(operation)
 
-            # Выполняем поиск с выбранной стратегией
-            result = await strategy.search(
-                query=query,
-                index=index,
-                params=params,
-                client=self.client,
+            # Выполняем поиск с выбранной стратегией, если результата нет в кэше
+            return await search_cache.get_or_search(
+                operation,
+                query,
+                index,
+                params,
+                lambda: strategy.search(
+                    query=query,
+                    index=index,
+                    params=params,
+                    client=self.client or es_http_client.client,
+                ),
             )
-
-            return result
         except ValueError as e:
             logger.error(f"Ошибка валидации: {str(e)}")
             raise
@@ -239,3 +380,290 @@ class SearchTool(MCPTool):
         except Exception as e:
             logger.exception(f"Непредвиденная ошибка: {str(e)}")
             raise ValueError(f"Ошибка при выполнении поиска: {str(e)}")
+
+    def stream(
+        self,
+        operation: str,
+        query: str,
+        index: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Выгружает все результаты поиска постранично.
+
+        Страницы читаются в point-in-time индекса с пагинацией search_after,
+        поэтому глубина выгрузки не влияет на стоимость запроса, а в памяти
+        находится только текущая страница. Параметры проверяются сразу,
+        до начала выгрузки.
+
+        Args:
+            operation: Тип операции поиска (text или faceted)
+            query: Поисковый запрос
+            index: Индекс для поиска
+            params: Дополнительные параметры (page_size, limit, keep_alive)
+
+        Returns:
+            AsyncGenerator[List[Dict[str, Any]], None]: Страницы хитов Elasticsearch
+
+        Raises:
+            ValueError: Если указаны некорректные параметры
+        """
+        if operation not in self.stream_operations:
+            raise ValueError(
+                f"Потоковый поиск не поддерживает операцию: {operation}. "
+                f"Доступные операции: {', '.join(self.stream_operations)}"
+            )
+
+        if not query:
+            raise ValueError("Поисковый запрос не может быть пустым")
+
+        if not index:
+            raise ValueError("Необходимо указать индекс для поиска")
+
+        params = params or {}
+        strategy = SearchStrategyFactory.get_strategy(operation)
+        body = strategy.build_searches(query, params)[0]
+
+        # Смещение и агрегации не нужны при постраничной выгрузке
+        body.pop("from", None)
+        body.pop("aggs", None)
+        body["size"] = params.get("page_size", settings.SEARCH_STREAM_PAGE_SIZE)
+        body["track_total_hits"] = False
+        # _shard_doc — уникальный порядок документов внутри point-in-time
+        body["sort"] = list(body.get("sort") or [{"_score": "desc"}]) + [
+            {"_shard_doc": "asc"}
+        ]
+
+        logger.info(f"Потоковый поиск: операция={operation}, индекс={index}")
+        return self._stream_pages(body, index, params)
+
+    async def _stream_pages(
+        self, body: Dict[str, Any], index: str, params: Dict[str, Any]
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Читает страницы результатов в point-in-time индекса.
+
+        Point-in-time закрывается и при досрочной остановке выгрузки.
+        """
+        client = self.client or es_http_client.client
+        es_url = params.get("es_url", "")
+        keep_alive = params.get("keep_alive", settings.SEARCH_STREAM_KEEP_ALIVE)
+        timeout = params.get("timeout", httpx.USE_CLIENT_DEFAULT)
+        limit = params.get("limit")
+
+        response = await client.post(
+            f"{es_url}/{index}/_pit",
+            params={"keep_alive": keep_alive},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        pit_id = response.json()["id"]
+
+        sent = 0
+        try:
+            while limit is None or sent < limit:
+                body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+                response = await client.post(
+                    f"{es_url}/_search",
+                    json=body,
+                    headers={"Content-Type": "application/json"},
+                    timeout=timeout,
+                )
+                response.raise_for_status()
+                page = response.json()
+                # Elasticsearch может вернуть обновленный идентификатор
+                pit_id = page.get("pit_id", pit_id)
+
+                hits = page["hits"]["hits"]
+                if limit is not None:
+                    hits = hits[: limit - sent]
+                if not hits:
+                    break
+
+                sent += len(hits)
+                yield hits
+
+                if len(hits) < body["size"]:
+                    break
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            try:
+                await client.request(
+                    "DELETE",
+                    f"{es_url}/_pit",
+                    json={"id": pit_id},
+                    timeout=timeout,
+                )
+            except httpx.HTTPError as e:
+                logger.warning(f"Не удалось закрыть point-in-time: {str(e)}")
+
+    async def _execute_batch(
+        self, searches: List[Dict[str, Any]], params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Выполняет несколько поисковых запросов одним обращением к _msearch.
+
+        Эмбеддинги всех семантических запросов вычисляются одним батчем.
+        Ошибка одного запроса не прерывает остальные.
+
+        Args:
+            searches: Запросы с полями operation, query, index и params
+            params: Общие параметры пакета (es_url, timeout)
+
+        Returns:
+            Dict[str, Any]: Результаты или ошибки в порядке запросов
+
+        Raises:
+            ValueError: Если список запросов пуст
+        """
+        if not searches:
+            raise ValueError("Необходимо указать запросы пакетного поиска")
+
+        logger.info(f"Выполнение пакетного поиска: {len(searches)} запросов")
+
+        results: List[Dict[str, Any]] = [
+            {"operation": spec.get("operation"), "index": spec.get("index")}
+            for spec in searches
+        ]
+        prepared = self._prepare_batch(searches, results)
+        prepared, vectors = await self._embed_batch(prepared, results)
+        bodies, spans = self._build_batch(prepared, vectors, results)
+
+        if bodies:
+            try:
+                responses = await self._msearch(bodies, params)
+            except httpx.HTTPError as e:
+                logger.error(f"Ошибка HTTP: {str(e)}")
+                message = f"Ошибка при выполнении запроса: {str(e)}"
+                for position, *_ in spans:
+                    results[position]["error"] = message
+                return {"results": results}
+            self._map_batch(responses, spans, results)
+
+        return {"results": results}
+
+    @staticmethod
+    def _prepare_batch(
+        searches: List[Dict[str, Any]], results: List[Dict[str, Any]]
+    ) -> List[_PreparedSearch]:
+        """Проверяет запросы пакета и выбирает для них стратегии."""
+        prepared: List[_PreparedSearch] = []
+        for position, spec in enumerate(searches):
+            try:
+                if not spec.get("query"):
+                    raise ValueError("Поисковый запрос не может быть пустым")
+                if not spec.get("index"):
+                    raise ValueError("Необходимо указать индекс для поиска")
+                strategy = SearchStrategyFactory.get_strategy(spec.get("operation"))
+                prepared.append((position, strategy, spec))
+            except ValueError as e:
+                results[position]["error"] = str(e)
+        return prepared
+
+    @staticmethod
+    async def _embed_batch(
+        prepared: List[_PreparedSearch], results: List[Dict[str, Any]]
+    ) -> Tuple[List[_PreparedSearch], Dict[str, List[float]]]:
+        """Векторизует все уникальные семантические запросы одним батчем."""
+        texts = list(
+            dict.fromkeys(
+                spec["query"]
+                for _, strategy, spec in prepared
+                if strategy.needs_embedding
+            )
+        )
+        if not texts:
+            return prepared, {}
+
+        try:
+            embeddings = await embeddings_manager.get_embeddings(texts)
+        except Exception as e:
+            logger.exception(f"Ошибка векторизации запросов: {str(e)}")
+            for position, strategy, _ in prepared:
+                if strategy.needs_embedding:
+                    results[position]["error"] = f"Ошибка векторизации: {str(e)}"
+            return [item for item in prepared if not item[1].needs_embedding], {}
+
+        return prepared, {
+            text: SemanticSearchStrategy.normalize(embedding)
+            for text, embedding in zip(texts, embeddings)
+        }
+
+    @staticmethod
+    def _build_batch(
+        prepared: List[_PreparedSearch],
+        vectors: Dict[str, List[float]],
+        results: List[Dict[str, Any]],
+    ) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[_SearchSpan]]:
+        """Собирает тела запросов; запрос может состоять из нескольких поисков."""
+        bodies: List[Tuple[str, Dict[str, Any]]] = []
+        spans: List[_SearchSpan] = []
+        for position, strategy, spec in prepared:
+            spec_params = spec.get("params") or {}
+            try:
+                built = strategy.build_searches(
+                    spec["query"], spec_params, vectors.get(spec["query"])
+                )
+            except ValueError as e:
+                results[position]["error"] = str(e)
+                continue
+            spans.append((position, strategy, spec_params, len(bodies), len(built)))
+            bodies.extend((spec["index"], body) for body in built)
+        return bodies, spans
+
+    @staticmethod
+    def _map_batch(
+        responses: List[Dict[str, Any]],
+        spans: List[_SearchSpan],
+        results: List[Dict[str, Any]],
+    ) -> None:
+        """Раскладывает ответы _msearch по результатам запросов пакета."""
+        for position, strategy, spec_params, start, count in spans:
+            parts = responses[start : start + count]
+            errors = [part["error"] for part in parts if "error" in part]
+            if errors:
+                results[position]["error"] = str(errors[0])
+            else:
+                results[position]["result"] = strategy.merge(parts, spec_params)
+
+    async def _msearch(
+        self, bodies: List[Tuple[str, Dict[str, Any]]], params: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Отправляет запросы в Elasticsearch одним вызовом _msearch.
+
+        Args:
+            bodies: Пары (индекс, тело запроса _search)
+            params: Общие параметры пакета
+
+        Returns:
+            List[Dict[str, Any]]: Ответы в порядке запросов
+        """
+        lines = []
+        for index, body in bodies:
+            lines.append(json.dumps({"index": index}))
+            lines.append(json.dumps(body))
+        payload = "\n".join(lines) + "\n"
+
+        client = self.client or es_http_client.client
+        response = await client.post(
+            f"{params.get('es_url', '')}/_msearch",
+            content=payload.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+            timeout=params.get("timeout", httpx.USE_CLIENT_DEFAULT),
+        )
+        response.raise_for_status()
+        return response.json()["responses"]
+
+
+def get_search_tool() -> SearchTool:
+    """
+    Возвращает зарегистрированный инструмент поиска или новый экземпляр.
+
+    Returns:
+        SearchTool: Инструмент поиска
+    """
+    from app.services.mcp_service import mcp_service
+
+    tool = mcp_service.registry.tools.get("search")
+    return tool if isinstance(tool, SearchTool) else SearchTool()
@@ -5,11 +5,15 @@
 """
 
 from app.tools.search.strategies.faceted_search import FacetedSearchStrategy
-from app.tools.search.strategies.semantic_search import SemanticSearchStrategy
+from app.tools.search.strategies.semantic_search import (
+    SemanticSearchStrategy,
+    reciprocal_rank_fusion,
+)
 from app.tools.search.strategies.text_search import TextSearchStrategy
 
 __all__ = [
     "TextSearchStrategy",
     "SemanticSearchStrategy",
     "FacetedSearchStrategy",
+    "reciprocal_rank_fusion",
 ]
@@ -2,11 +2,14 @@
 Стратегия семантического поиска.
 """
 
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Optional
 
 import httpx
 import numpy as np
 
+from app.core.config import settings
+from app.storage.vector_index import vector_indexes
 from app.utils.embeddings import get_embedding
 
 
@@ -15,9 +18,17 @@ class SemanticSearchStrategy:
     Стратегия семантического поиска с использованием векторных эмбеддингов.
 
     Выполняет поиск по семантической близости с использованием
-    векторных представлений текста.
+    векторных представлений текста. Поиск ближайших векторов выполняет
+    Elasticsearch либо локальный индекс IVF (параметр backend).
+
+    Режимы поиска в Elasticsearch (параметр mode):
+    - knn — приближенный поиск по графу HNSW (оценка (1 + cos) / 2)
+    - exact — полный перебор через script_score (оценка cos + 1)
+    - hybrid — kNN и BM25, объединенные через Reciprocal Rank Fusion
     """
 
+    needs_embedding = True
+
     async def search(
         self,
         query: str,
@@ -37,52 +48,295 @@ class SemanticSearchStrategy:
         Returns:
             Dict[str, Any]: Результаты поиска
         """
-        size = params.get("size", 10)
-        from_ = params.get("from_", 0)
-        vector_field = params.get("vector_field", "embedding")
+        backend = params.get("backend", settings.VECTOR_SEARCH_BACKEND)
 
         # Получаем векторное представление запроса
         query_vector = await self._get_embedding(query)
 
-        # Формируем запрос для семантического поиска
+        if backend == "local":
+            return await self._search_local(query_vector, index, params, client)
+
+        # Запросы гибридного режима выполняются параллельно
+        responses = await asyncio.gather(
+            *(
+                self._post_search(body, index, params, client)
+                for body in self.build_searches(query, params, query_vector)
+            )
+        )
+        return self.merge(list(responses), params)
+
+    def build_searches(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        query_vector: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Формирует тела запросов _search для Elasticsearch.
+
+        Args:
+            query: Поисковый запрос
+            params: Дополнительные параметры поиска
+            query_vector: Нормализованный вектор запроса
+
+        Returns:
+            List[Dict[str, Any]]: Один запрос, для режима hybrid — kNN и BM25
+
+        Raises:
+            ValueError: Если указан неизвестный бэкенд или режим поиска
+        """
+        backend = params.get("backend", settings.VECTOR_SEARCH_BACKEND)
+        if backend == "local":
+            raise ValueError(
+                "Запросы Elasticsearch не строятся для локального векторного индекса"
+            )
+        if backend != "elasticsearch":
+            raise ValueError(
+                f"Неизвестный бэкенд векторного поиска: {backend}. "
+                "Доступные бэкенды: elasticsearch, local"
+            )
+
+        mode = params.get("mode", settings.VECTOR_SEARCH_MODE)
+        if mode == "knn":
+            return [self.build_knn_query(query_vector, params)]
+        if mode == "exact":
+            return [self.build_exact_query(query_vector, params)]
+        if mode == "hybrid":
+            return self._build_hybrid_queries(query, query_vector, params)
+
+        raise ValueError(
+            f"Неизвестный режим семантического поиска: {mode}. "
+            "Доступные режимы: knn, exact, hybrid"
+        )
+
+    def merge(
+        self, responses: List[Dict[str, Any]], params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Объединяет ответы на запросы из build_searches.
+
+        Для режима hybrid результаты kNN и BM25 объединяются через RRF.
+
+        Args:
+            responses: Ответы Elasticsearch в порядке запросов
+            params: Дополнительные параметры поиска
+
+        Returns:
+            Dict[str, Any]: Результаты поиска
+        """
+        if len(responses) == 1:
+            return responses[0]
+
+        size = params.get("size", 10)
+        from_ = params.get("from_", 0)
+        fused = reciprocal_rank_fusion(
+            [response["hits"]["hits"] for response in responses],
+            rank_constant=params.get("rank_constant", 60),
+        )
+        hits = fused[from_ : from_ + size]
+        return {
+            "hits": {
+                "total": {"value": len(fused), "relation": "eq"},
+                "max_score": hits[0]["_score"] if hits else None,
+                "hits": hits,
+            }
+        }
+
+    @staticmethod
+    def build_knn_query(
+        query_vector: List[float], params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Формирует запрос приближенного kNN поиска по графу HNSW.
+
+        Фильтры передаются в kNN как предварительный фильтр, поэтому
+        в результат попадают k ближайших документов среди подходящих.
+
+        Args:
+            query_vector: Нормализованный вектор запроса
+            params: Дополнительные параметры поиска
+
+        Returns:
+            Dict[str, Any]: Тело запроса _search
+        """
+        size = params.get("size", 10)
+        from_ = params.get("from_", 0)
+        k = params.get("k", from_ + size)
+        num_candidates = params.get(
+            "num_candidates", max(settings.VECTOR_SEARCH_NUM_CANDIDATES, k)
+        )
+
+        knn: Dict[str, Any] = {
+            "field": params.get("vector_field", settings.VECTOR_SEARCH_FIELD),
+            "query_vector": query_vector,
+            "k": k,
+            "num_candidates": num_candidates,
+        }
+        if params.get("filters"):
+            knn["filter"] = params["filters"]
+
+        return {"knn": knn, "size": size, "from": from_}
+
+    @staticmethod
+    def build_exact_query(
+        query_vector: List[float], params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Формирует запрос точного поиска полным перебором через script_score.
+
+        Args:
+            query_vector: Нормализованный вектор запроса
+            params: Дополнительные параметры поиска
+
+        Returns:
+            Dict[str, Any]: Тело запроса _search
+        """
+        vector_field = params.get("vector_field", settings.VECTOR_SEARCH_FIELD)
         script_source = f"cosineSimilarity(params.query_vector, '{vector_field}') + 1.0"
 
-        es_query = {
+        base_query: Dict[str, Any] = {"match_all": {}}
+        if params.get("filters"):
+            base_query = {"bool": {"filter": params["filters"]}}
+
+        return {
             "query": {
                 "script_score": {
-                    "query": {"match_all": {}},
+                    "query": base_query,
                     "script": {
                         "source": script_source,
                         "params": {"query_vector": query_vector},
                     },
                 },
             },
-            "size": size,
-            "from": from_,
+            "size": params.get("size", 10),
+            "from": params.get("from_", 0),
         }
 
-        # Добавляем фильтры, если они указаны
-        if "filters" in params and params["filters"]:
-            es_query["query"]["script_score"]["query"] = {
-                "bool": {
-                    "filter": params["filters"],
-                }
+    def _build_hybrid_queries(
+        self, query: str, query_vector: List[float], params: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Формирует запросы гибридного поиска: kNN и BM25.
+
+        Оба запроса возвращают окно из rank_window лучших документов,
+        которые затем объединяются через RRF на стороне клиента, так как
+        ранжирование rrf в Elasticsearch требует платной лицензии.
+        """
+        size = params.get("size", 10)
+        from_ = params.get("from_", 0)
+        window = max(from_ + size, params.get("rank_window", 50))
+        window_params = {**params, "size": window, "from_": 0, "k": window}
+
+        text_query: Dict[str, Any] = {
+            "multi_match": {
+                "query": query,
+                "fields": params.get("fields", ["content", "title"]),
+                "type": "best_fields",
             }
+        }
+        if params.get("filters"):
+            text_query = {"bool": {"must": text_query, "filter": params["filters"]}}
+
+        return [
+            self.build_knn_query(query_vector, window_params),
+            {"query": text_query, "size": window},
+        ]
 
-        # Выполняем запрос к Elasticsearch
-        es_url = f"{params.get('es_url', 'http://localhost:9200')}/{index}/_search"
+    async def _post_search(
+        self,
+        es_query: Dict[str, Any],
+        index: str,
+        params: Dict[str, Any],
+        client: httpx.AsyncClient,
+    ) -> Dict[str, Any]:
+        """Отправляет запрос _search в Elasticsearch."""
+        es_url = f"{params.get('es_url', '')}/{index}/_search"
         response = await client.post(
             es_url,
             json=es_query,
             headers={"Content-Type": "application/json"},
+            timeout=params.get("timeout", httpx.USE_CLIENT_DEFAULT),
         )
 
         # Проверяем статус ответа
         response.raise_for_status()
 
-        # Возвращаем результаты
         return response.json()
 
+    async def _search_local(
+        self,
+        query_vector: List[float],
+        index: str,
+        params: Dict[str, Any],
+        client: httpx.AsyncClient,
+    ) -> Dict[str, Any]:
+        """
+        Выполняет поиск по локальному индексу IVF.
+
+        Ближайшие векторы ищутся локально, исходные документы загружаются
+        одним запросом _mget. Ответ повторяет формат ответа Elasticsearch.
+
+        Args:
+            query_vector: Нормализованный вектор запроса
+            index: Индекс Elasticsearch, по которому построен локальный индекс
+            params: Дополнительные параметры поиска
+            client: HTTP клиент для запросов к Elasticsearch
+
+        Returns:
+            Dict[str, Any]: Результаты поиска
+
+        Raises:
+            ValueError: Если локальный индекс не построен или заданы фильтры
+        """
+        if params.get("filters"):
+            raise ValueError("Локальный векторный индекс не поддерживает фильтры")
+
+        vector_index = await vector_indexes.get(index)
+        if vector_index is None:
+            raise ValueError(f"Локальный векторный индекс для {index} не построен")
+
+        size = params.get("size", 10)
+        from_ = params.get("from_", 0)
+        neighbours = await asyncio.to_thread(
+            vector_index.search, query_vector, from_ + size, params.get("n_probe")
+        )
+        neighbours = neighbours[from_:]
+
+        sources: Dict[str, Any] = {}
+        if neighbours:
+            es_url = f"{params.get('es_url', '')}/{index}/_mget"
+            response = await client.post(
+                es_url,
+                json={"ids": [doc_id for doc_id, _ in neighbours]},
+                headers={"Content-Type": "application/json"},
+                timeout=params.get("timeout", httpx.USE_CLIENT_DEFAULT),
+            )
+            response.raise_for_status()
+            sources = {
+                doc["_id"]: doc["_source"]
+                for doc in response.json()["docs"]
+                if doc.get("found")
+            }
+
+        # Оценка совпадает со script_score: косинусная близость + 1.0
+        hits = [
+            {
+                "_index": index,
+                "_id": doc_id,
+                "_score": score + 1.0,
+                "_source": sources[doc_id],
+            }
+            for doc_id, score in neighbours
+            if doc_id in sources
+        ]
+        return {
+            "hits": {
+                "total": {"value": len(vector_index), "relation": "eq"},
+                "max_score": hits[0]["_score"] if hits else None,
+                "hits": hits,
+            }
+        }
+
     async def _get_embedding(self, text: str) -> List[float]:
         """
         Получает векторное представление текста.
@@ -93,12 +347,51 @@ class SemanticSearchStrategy:
         Returns:
             List[float]: Векторное представление текста
         """
-        # Используем утилиту для получения эмбеддингов
+        # Эмбеддинг вычисляется в пуле инференса менеджера эмбеддингов,
+        # параллельные запросы объединяются в батчи
         embedding = await get_embedding(text)
+        return self.normalize(embedding)
 
-        # Нормализуем вектор для косинусного сходства
+    @staticmethod
+    def normalize(embedding: List[float]) -> List[float]:
+        """
+        Нормализует вектор для косинусного сходства.
+
+        Args:
+            embedding: Векторное представление текста
+
+        Returns:
+            List[float]: Вектор единичной длины
+        """
         norm = np.linalg.norm(embedding)
         if norm > 0:
             embedding = [float(x / norm) for x in embedding]
-
         return embedding
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, Any]]], rank_constant: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Объединяет ранжированные списки документов методом Reciprocal Rank Fusion.
+
+    Оценка документа — сумма 1 / (rank_constant + rank) по всем спискам,
+    в которых он встречается (rank начинается с 1).
+
+    Args:
+        result_lists: Списки хитов Elasticsearch в порядке ранжирования
+        rank_constant: Константа сглаживания RRF
+
+    Returns:
+        List[Dict[str, Any]]: Хиты, упорядоченные по оценке RRF
+    """
+    scores: Dict[str, float] = {}
+    hits: Dict[str, Dict[str, Any]] = {}
+    for result in result_lists:
+        for rank, hit in enumerate(result, start=1):
+            doc_id = hit["_id"]
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rank_constant + rank)
+            hits.setdefault(doc_id, hit)
+
+    ranked = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    return [{**hits[doc_id], "_score": scores[doc_id]} for doc_id in ranked]
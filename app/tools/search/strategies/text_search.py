@@ -2,7 +2,7 @@
 Стратегия текстового поиска.
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 import httpx
 
@@ -15,6 +15,8 @@ class TextSearchStrategy:
     Elasticsearch multi_match запроса.
     """
 
+    needs_embedding = False
+
     async def search(
         self,
         query: str,
@@ -34,6 +36,40 @@ class TextSearchStrategy:
         Returns:
             Dict[str, Any]: Результаты поиска
         """
+        es_query = self.build_searches(query, params)[0]
+
+        # Выполняем запрос к Elasticsearch
+        es_url = f"{params.get('es_url', '')}/{index}/_search"
+        response = await client.post(
+            es_url,
+            json=es_query,
+            headers={"Content-Type": "application/json"},
+            timeout=params.get("timeout", httpx.USE_CLIENT_DEFAULT),
+        )
+
+        # Проверяем статус ответа
+        response.raise_for_status()
+
+        # Возвращаем результаты
+        return response.json()
+
+    def build_searches(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        query_vector: Optional[List[float]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Формирует тела запросов _search для Elasticsearch.
+
+        Args:
+            query: Поисковый запрос
+            params: Дополнительные параметры поиска
+            query_vector: Не используется
+
+        Returns:
+            List[Dict[str, Any]]: Тело запроса _search
+        """
         fields = params.get("fields", ["content", "title"])
         size = params.get("size", 10)
         from_ = params.get("from_", 0)
@@ -64,16 +100,19 @@ class TextSearchStrategy:
                 }
             }
 
-        # Выполняем запрос к Elasticsearch
-        es_url = f"{params.get('es_url', 'http://localhost:9200')}/{index}/_search"
-        response = await client.post(
-            es_url,
-            json=es_query,
-            headers={"Content-Type": "application/json"},
-        )
+        return [es_query]
 
-        # Проверяем статус ответа
-        response.raise_for_status()
+    def merge(
+        self, responses: List[Dict[str, Any]], params: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Возвращает ответ на единственный запрос из build_searches.
 
-        # Возвращаем результаты
-        return response.json()
+        Args:
+            responses: Ответы Elasticsearch
+            params: Дополнительные параметры поиска
+
+        Returns:
+            Dict[str, Any]: Результаты поиска
+        """
+        return responses[0]
@@ -0,0 +1,163 @@
+"""
+Внутрипроцессный кэш с вытеснением по размеру (LRU) и времени жизни (TTL).
+
+Счетчики попаданий, промахов и вытеснений публикуются в Prometheus
+и доступны через эндпоинт /metrics, который подключает Instrumentator.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from prometheus_client import Counter, Gauge
+
+CACHE_HITS = Counter(
+    "app_cache_hits_total", "Попадания во внутрипроцессный кэш", ["cache"]
+)
+CACHE_MISSES = Counter(
+    "app_cache_misses_total", "Промахи внутрипроцессного кэша", ["cache"]
+)
+CACHE_EVICTIONS = Counter(
+    "app_cache_evictions_total", "Вытеснения из внутрипроцессного кэша", ["cache"]
+)
+CACHE_SIZE = Gauge(
+    "app_cache_size", "Число записей во внутрипроцессном кэше", ["cache"]
+)
+
+
+class TTLCache:
+    """
+    Ограниченный LRU-кэш с временем жизни записей.
+
+    Не потокобезопасен: рассчитан на использование из одного цикла событий.
+
+    Attributes:
+        name: Имя кэша, используется как метка метрик
+        maxsize: Максимальное число записей
+        ttl: Время жизни записи в секундах
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Инициализирует кэш.
+
+        Args:
+            name: Имя кэша для метрик
+            maxsize: Максимальное число записей
+            ttl: Время жизни записи в секундах
+            clock: Источник времени
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._hits = CACHE_HITS.labels(cache=name)
+        self._misses = CACHE_MISSES.labels(cache=name)
+        self._evictions = CACHE_EVICTIONS.labels(cache=name)
+        self._size = CACHE_SIZE.labels(cache=name)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > self._clock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Возвращает значение по ключу.
+
+        Args:
+            key: Ключ записи
+
+        Returns:
+            Optional[Any]: Значение или None, если записи нет или она устарела
+        """
+        item = self._data.get(key)
+        if item is None:
+            self._misses.inc()
+            return None
+
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._data[key]
+            self._size.set(len(self._data))
+            self._misses.inc()
+            return None
+
+        self._data.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Возвращает найденные значения для набора ключей.
+
+        Args:
+            keys: Ключи записей
+
+        Returns:
+            Dict[Hashable, Any]: Значения найденных записей
+        """
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Сохраняет значение, вытесняя самые старые записи при переполнении.
+
+        Args:
+            key: Ключ записи
+            value: Значение
+            ttl: Время жизни в секундах (по умолчанию ttl кэша)
+        """
+        if self.maxsize <= 0:
+            return
+
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evictions.inc()
+        self._size.set(len(self._data))
+
+    def set_many(
+        self, mapping: Dict[Hashable, Any], ttl: Optional[float] = None
+    ) -> None:
+        """
+        Сохраняет несколько значений.
+
+        Args:
+            mapping: Словарь ключ-значение
+            ttl: Время жизни в секундах (по умолчанию ttl кэша)
+        """
+        for key, value in mapping.items():
+            self.set(key, value, ttl)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Удаляет запись.
+
+        Args:
+            key: Ключ записи
+        """
+        if self._data.pop(key, None) is not None:
+            self._size.set(len(self._data))
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        self._data.clear()
+        self._size.set(0)
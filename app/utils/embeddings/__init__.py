@@ -0,0 +1,26 @@
+"""
+Пакет для работы с эмбеддингами.
+
+Предоставляет менеджер эмбеддингов с многоуровневым кэшированием
+и микробатчингом запросов к модели, а также потоковое разбиение
+текста на чанки по токенам модели.
+"""
+
+from app.utils.embeddings.backends import EmbeddingBackend, create_backend
+from app.utils.embeddings.batcher import EmbeddingBatcher
+from app.utils.embeddings.chunking import TokenChunker
+from app.utils.embeddings.manager import (
+    EmbeddingsManager,
+    embeddings_manager,
+    get_embedding,
+)
+
+__all__ = [
+    "EmbeddingBackend",
+    "EmbeddingBatcher",
+    "EmbeddingsManager",
+    "TokenChunker",
+    "create_backend",
+    "embeddings_manager",
+    "get_embedding",
+]
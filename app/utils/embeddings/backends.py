@@ -0,0 +1,193 @@
+"""
+Бэкенды инференса модели эмбеддингов.
+
+Бэкенд выбирается настройкой EMBEDDING_BACKEND:
+- ``torch`` — исходная модель SentenceTransformer в fp32
+- ``torch_int8`` — динамическое квантование линейных слоев в int8 (CPU)
+- ``onnx`` — ONNX Runtime через SentenceTransformer(backend="onnx")
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class EmbeddingBackend(ABC):
+    """
+    Базовый класс бэкенда инференса эмбеддингов.
+
+    Attributes:
+        name: Имя бэкенда
+        model_name: Имя модели SentenceTransformer
+        device: Устройство для инференса
+    """
+
+    name: str = ""
+
+    def __init__(self, model_name: str, device: str = "cpu") -> None:
+        """
+        Инициализирует бэкенд без загрузки модели.
+
+        Args:
+            model_name: Имя модели SentenceTransformer
+            device: Устройство для инференса
+        """
+        self.model_name = model_name
+        self.device = device
+        self.model: Any = None
+
+    @abstractmethod
+    def load(self) -> None:
+        """Загружает модель (блокирующая операция)."""
+        pass
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Векторизует батч текстов.
+
+        Args:
+            texts: Тексты для векторизации
+            batch_size: Размер батча для модели
+
+        Returns:
+            np.ndarray: Матрица эмбеддингов float32
+        """
+        import torch
+
+        with torch.no_grad():
+            embeddings = self.model.encode(
+                texts, batch_size=batch_size, convert_to_numpy=True
+            )
+        return embeddings.astype(np.float32, copy=False)
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Считает токены текста токенизатором модели.
+
+        Args:
+            text: Текст
+
+        Returns:
+            int: Число токенов без служебных
+        """
+        encoded = self.model.tokenizer(text, add_special_tokens=False, verbose=False)
+        return len(encoded["input_ids"])
+
+    @property
+    def dimension(self) -> int:
+        """Размерность эмбеддингов модели."""
+        return self.model.get_sentence_embedding_dimension()
+
+    @property
+    def max_tokens(self) -> int:
+        """Максимальная длина входа модели без служебных токенов."""
+        return self.model.max_seq_length - 2
+
+
+class TorchBackend(EmbeddingBackend):
+    """Исходная модель PyTorch в fp32."""
+
+    name = "torch"
+
+    def load(self) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(self.model_name, device=self.device)
+
+
+class QuantizedTorchBackend(EmbeddingBackend):
+    """
+    Модель PyTorch с динамическим квантованием линейных слоев в int8.
+
+    Работает только на CPU: веса линейных слоев хранятся в int8,
+    активации квантуются на лету.
+    """
+
+    name = "torch_int8"
+
+    def load(self) -> None:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.device = "cpu"
+        model = SentenceTransformer(self.model_name, device="cpu")
+        self.model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Инференс через ONNX Runtime.
+
+    Требует установленных пакетов onnxruntime и optimum. Файл модели
+    задается настройкой EMBEDDING_ONNX_FILE относительно репозитория модели,
+    что позволяет выбрать предварительно квантованный вариант.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self, model_name: str, device: str = "cpu", file_name: Optional[str] = None
+    ) -> None:
+        """
+        Инициализирует ONNX бэкенд.
+
+        Args:
+            model_name: Имя модели SentenceTransformer
+            device: Устройство для инференса
+            file_name: Путь к ONNX файлу внутри репозитория модели
+                (по умолчанию settings.EMBEDDING_ONNX_FILE)
+        """
+        super().__init__(model_name, device)
+        self.file_name = (
+            settings.EMBEDDING_ONNX_FILE if file_name is None else file_name
+        )
+
+    def load(self) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        model_kwargs: Dict[str, Any] = {}
+        if self.file_name:
+            model_kwargs["file_name"] = self.file_name
+
+        self.model = SentenceTransformer(
+            self.model_name,
+            device=self.device,
+            backend="onnx",
+            model_kwargs=model_kwargs,
+        )
+
+
+BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def create_backend(name: str, model_name: str, device: str = "cpu") -> EmbeddingBackend:
+    """
+    Создает бэкенд инференса по имени.
+
+    Args:
+        name: Имя бэкенда
+        model_name: Имя модели SentenceTransformer
+        device: Устройство для инференса
+
+    Returns:
+        EmbeddingBackend: Бэкенд (модель еще не загружена)
+
+    Raises:
+        ValueError: Если указано неизвестное имя бэкенда
+    """
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Неизвестный бэкенд эмбеддингов: {name}. "
+            f"Доступные бэкенды: {', '.join(BACKENDS.keys())}"
+        )
+
+    return BACKENDS[name](model_name, device)
@@ -0,0 +1,116 @@
+"""
+Микробатчинг запросов на векторизацию.
+
+Параллельные запросы эмбеддингов накапливаются в очереди и отправляются
+в модель одним батчем: по истечении короткого окна ожидания или при
+заполнении батча.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BatchHandler = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """
+    Объединяет одиночные запросы эмбеддингов в батчи.
+
+    Каждый вызывающий получает собственный future, который разрешается
+    своим вектором после обработки батча.
+
+    Attributes:
+        max_batch_size: Максимальный размер батча
+        max_wait: Максимальное время ожидания батча в секундах
+    """
+
+    def __init__(
+        self,
+        handler: BatchHandler,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+    ) -> None:
+        """
+        Инициализирует батчер.
+
+        Args:
+            handler: Корутина, векторизующая список текстов
+            max_batch_size: Максимальный размер батча
+            max_wait: Максимальное время ожидания батча в секундах
+        """
+        self._handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, text: str) -> List[float]:
+        """
+        Ставит текст в очередь и ожидает его эмбеддинг.
+
+        Args:
+            text: Текст для векторизации
+
+        Returns:
+            List[float]: Эмбеддинг текста
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Отправляет накопленные запросы на обработку."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._process(batch))
+        # Храним ссылку, чтобы задача не была собрана сборщиком мусора
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        """
+        Векторизует батч и раздает результаты ожидающим.
+
+        Args:
+            batch: Пары (текст, future)
+        """
+        # Отмененные вызывающие не попадают в батч
+        batch = [(text, future) for text, future in batch if not future.done()]
+        if not batch:
+            return
+
+        try:
+            vectors = await self._handler([text for text, _ in batch])
+        except Exception as e:
+            logger.error(f"Ошибка векторизации батча: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    async def close(self) -> None:
+        """Обрабатывает оставшиеся запросы и дожидается их завершения."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,190 @@
+"""
+Потоковое разбиение текста на чанки с учетом токенов модели.
+
+Размер чанка и перекрытие измеряются в токенах токенизатора модели, а не
+в символах. Текст читается по частям, поэтому в памяти одновременно
+находятся только незавершенное предложение и текущее окно чанка.
+"""
+
+import re
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Iterator, List, Tuple
+
+# Граница предложения: знак конца предложения и пробел либо перевод строки
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+class TokenChunker:
+    """
+    Разбиение потока текста на перекрывающиеся чанки.
+
+    Чанк собирается из целых предложений, пока их суммарная длина не
+    превышает chunk_size токенов. Следующий чанк начинается с последних
+    предложений предыдущего, общая длина которых не больше overlap токенов.
+    Предложение длиннее chunk_size разбивается по словам, а слово длиннее
+    chunk_size — по символам.
+
+    Attributes:
+        chunk_size: Максимальный размер чанка в токенах
+        overlap: Максимальное перекрытие соседних чанков в токенах
+    """
+
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        chunk_size: int = 256,
+        overlap: int = 32,
+    ) -> None:
+        """
+        Инициализирует чанкер.
+
+        Args:
+            count_tokens: Функция подсчета токенов в тексте
+            chunk_size: Максимальный размер чанка в токенах
+            overlap: Максимальное перекрытие соседних чанков в токенах
+
+        Raises:
+            ValueError: Если перекрытие не меньше размера чанка
+        """
+        if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+            raise ValueError(
+                "Размер чанка должен быть положительным, "
+                "а перекрытие — меньше размера чанка"
+            )
+
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self._count_tokens = count_tokens
+        # Незавершенное предложение из последнего фрагмента потока
+        self._buffer = ""
+        # Предложения текущего чанка и их длины в токенах
+        self._window: Deque[Tuple[str, int]] = deque()
+        self._window_tokens = 0
+        # Есть ли в окне предложения, еще не попавшие ни в один чанк
+        self._pending = False
+
+    async def chunk(self, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Разбивает асинхронный поток текста на чанки.
+
+        Args:
+            stream: Асинхронный итератор фрагментов текста
+
+        Yields:
+            str: Очередной чанк
+        """
+        async for piece in stream:
+            for chunk in self.feed(piece):
+                yield chunk
+        for chunk in self.flush():
+            yield chunk
+
+    def feed(self, text: str) -> Iterator[str]:
+        """
+        Добавляет фрагмент текста и возвращает готовые чанки.
+
+        Args:
+            text: Очередной фрагмент текста
+
+        Yields:
+            str: Чанки, завершенные этим фрагментом
+        """
+        self._buffer += text
+        parts = _SENTENCE_END.split(self._buffer)
+        # Последняя часть может быть продолжена следующим фрагментом
+        self._buffer = parts.pop()
+
+        # Без границ предложений буфер ограничиваем по словам, а текст без
+        # пробелов (минифицированный JSON, CJK, base64) — по символам
+        limit = self.chunk_size * 16
+        while len(self._buffer) > limit:
+            head, separator, tail = self._buffer.rpartition(" ")
+            if not separator or not head:
+                head, tail = self._buffer[:limit], self._buffer[limit:]
+            parts.append(head)
+            self._buffer = tail
+
+        for sentence in parts:
+            yield from self._add_sentence(sentence.strip())
+
+    def flush(self) -> Iterator[str]:
+        """
+        Завершает поток и возвращает оставшиеся чанки.
+
+        Yields:
+            str: Последние чанки
+        """
+        yield from self._add_sentence(self._buffer.strip())
+        self._buffer = ""
+        if self._pending:
+            yield self._emit()
+        self._window.clear()
+        self._window_tokens = 0
+        self._pending = False
+
+    def _add_sentence(self, sentence: str, split: bool = True) -> Iterator[str]:
+        """Добавляет предложение в окно, выдавая чанк при переполнении."""
+        if not sentence:
+            return
+
+        tokens = self._count_tokens(sentence)
+        if split and tokens > self.chunk_size:
+            for piece in self._split_long(sentence):
+                yield from self._add_sentence(piece, split=False)
+            return
+
+        if self._window and self._window_tokens + tokens > self.chunk_size:
+            if self._pending:
+                yield self._emit()
+            self._trim_to_overlap(self.chunk_size - tokens)
+
+        self._window.append((sentence, tokens))
+        self._window_tokens += tokens
+        self._pending = True
+
+    def _emit(self) -> str:
+        """Формирует чанк из текущего окна."""
+        self._pending = False
+        return " ".join(sentence for sentence, _ in self._window)
+
+    def _trim_to_overlap(self, room: int) -> None:
+        """Оставляет в окне хвост не длиннее перекрытия и свободного места."""
+        limit = min(self.overlap, room)
+        while self._window and self._window_tokens > limit:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _split_long(self, sentence: str) -> List[str]:
+        """Разбивает слишком длинное предложение на части по словам."""
+        pieces: List[str] = []
+        words: List[str] = []
+        size = 0
+        for word in sentence.split():
+            tokens = self._count_tokens(word)
+            if tokens > self.chunk_size:
+                if words:
+                    pieces.append(" ".join(words))
+                    words, size = [], 0
+                pieces.extend(self._split_word(word, tokens))
+                continue
+            if words and size + tokens > self.chunk_size:
+                pieces.append(" ".join(words))
+                words, size = [], 0
+            words.append(word)
+            size += tokens
+        if words:
+            pieces.append(" ".join(words))
+        return pieces
+
+    def _split_word(self, word: str, tokens: int) -> List[str]:
+        """Разрезает слово без пробелов на части не длиннее чанка."""
+        if tokens <= self.chunk_size or len(word) <= 1:
+            return [word]
+
+        count = -(-tokens // self.chunk_size)
+        step = -(-len(word) // count)
+        pieces: List[str] = []
+        for start in range(0, len(word), step):
+            piece = word[start : start + step]
+            pieces.extend(self._split_word(piece, self._count_tokens(piece)))
+        return pieces
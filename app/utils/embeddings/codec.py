@@ -0,0 +1,95 @@
+"""
+Бинарный кодек векторов для кэша Redis.
+
+Формат записи: заголовок ``EMB`` + версия формата + код типа данных,
+затем данные вектора в little-endian. Для int8 после заголовка хранится
+масштаб квантования (float32). Записи в старом формате JSON читаются
+без изменений, чтобы кэш можно было мигрировать постепенно.
+"""
+
+import json
+import struct
+from typing import Union
+
+import numpy as np
+
+MAGIC = b"EMB"
+FORMAT_VERSION = 1
+
+_DTYPE_CODES = {"float32": 1, "float16": 2, "int8": 3}
+_CODE_DTYPES = {code: name for name, code in _DTYPE_CODES.items()}
+_HEADER = struct.Struct("<3sBB")
+_SCALE = struct.Struct("<f")
+
+
+def encode_vector(vector: np.ndarray, dtype: str = "float32") -> bytes:
+    """
+    Кодирует вектор в бинарный формат.
+
+    Args:
+        vector: Вектор для кодирования
+        dtype: Тип хранения: float32, float16 или int8 (с квантованием)
+
+    Returns:
+        bytes: Закодированный вектор
+
+    Raises:
+        ValueError: Если указан неизвестный тип хранения
+    """
+    if dtype not in _DTYPE_CODES:
+        raise ValueError(
+            f"Неизвестный тип хранения вектора: {dtype}. "
+            f"Доступные типы: {', '.join(_DTYPE_CODES)}"
+        )
+
+    vector = np.asarray(vector, dtype=np.float32)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, _DTYPE_CODES[dtype])
+
+    if dtype == "float32":
+        return header + vector.astype("<f4", copy=False).tobytes()
+    if dtype == "float16":
+        return header + vector.astype("<f2").tobytes()
+
+    # Симметричное квантование в int8 с общим масштабом
+    max_abs = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = max_abs / 127.0 if max_abs > 0 else 1.0
+    quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return header + _SCALE.pack(scale) + quantized.tobytes()
+
+
+def decode_vector(data: Union[bytes, str]) -> np.ndarray:
+    """
+    Декодирует вектор в массив float32.
+
+    Поддерживает бинарный формат и устаревший формат JSON.
+
+    Args:
+        data: Закодированный вектор
+
+    Returns:
+        np.ndarray: Вектор float32
+
+    Raises:
+        ValueError: Если версия формата или тип данных не поддерживаются
+    """
+    if isinstance(data, str) or not data.startswith(MAGIC):
+        # Устаревшие записи в формате JSON
+        return np.asarray(json.loads(data), dtype=np.float32)
+
+    _, version, code = _HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата вектора: {version}")
+
+    dtype = _CODE_DTYPES.get(code)
+    offset = _HEADER.size
+
+    if dtype == "float32":
+        return np.frombuffer(data, dtype="<f4", offset=offset)
+    if dtype == "float16":
+        return np.frombuffer(data, dtype="<f2", offset=offset).astype(np.float32)
+    if dtype == "int8":
+        (scale,) = _SCALE.unpack_from(data, offset)
+        quantized = np.frombuffer(data, dtype=np.int8, offset=offset + _SCALE.size)
+        return quantized.astype(np.float32) * np.float32(scale)
+
+    raise ValueError(f"Неизвестный код типа вектора: {code}")
@@ -0,0 +1,190 @@
+"""
+Исполнитель инференса модели эмбеддингов вне цикла событий.
+
+Прямой вызов model.encode внутри корутины блокирует цикл событий uvicorn
+на всё время прямого прохода. Исполнитель выносит инференс в выделенный
+пул потоков или, опционально, процессов и ограничивает глубину очереди.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import numpy as np
+from prometheus_client import Gauge, Histogram
+
+from app.utils.embeddings.backends import EmbeddingBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_WORKERS = Gauge(
+    "embedding_inference_workers", "Число рабочих инференса эмбеддингов"
+)
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "embedding_inference_queue_depth",
+    "Число батчей, ожидающих свободного рабочего инференса",
+)
+INFERENCE_IN_FLIGHT = Gauge(
+    "embedding_inference_in_flight", "Число батчей, переданных в пул инференса"
+)
+INFERENCE_SECONDS = Histogram(
+    "embedding_inference_seconds", "Длительность инференса батча эмбеддингов"
+)
+
+# Бэкенд рабочего процесса, загружается инициализатором пула
+_worker_backend: Optional[EmbeddingBackend] = None
+
+
+def _set_torch_threads(torch_threads: int) -> None:
+    """Устанавливает число потоков torch для рабочего."""
+    if torch_threads > 0:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+
+
+def _init_process_worker(
+    backend_name: str, model_name: str, device: str, torch_threads: int
+) -> None:
+    """Инициализирует рабочий процесс инференса."""
+    global _worker_backend
+
+    _set_torch_threads(torch_threads)
+    if _worker_backend is None:
+        _worker_backend = create_backend(backend_name, model_name, device)
+        _worker_backend.load()
+
+
+def _encode_in_process(texts: List[str], batch_size: int) -> np.ndarray:
+    """Векторизует батч в рабочем процессе."""
+    return _worker_backend.encode(texts, batch_size)
+
+
+class InferenceExecutor:
+    """
+    Пул рабочих для инференса модели эмбеддингов.
+
+    В режиме ``thread`` рабочие потоки используют общую модель менеджера.
+    В режиме ``process`` каждый рабочий процесс держит свой бэкенд.
+    Процессы запускаются через spawn и загружают модель сами: fork
+    процесса uvicorn, в котором уже работают потоки torch (OpenMP),
+    цикл событий и пулы потоков, может оставить рабочего в deadlock.
+
+    Attributes:
+        mode: Тип пула: thread или process
+        workers: Число рабочих
+        max_queue: Максимальное число батчей в очереди и в работе
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str], int], np.ndarray],
+        mode: str = "thread",
+        workers: int = 1,
+        torch_threads: int = 0,
+        max_queue: int = 64,
+        backend: Optional[EmbeddingBackend] = None,
+    ) -> None:
+        """
+        Инициализирует исполнитель.
+
+        Args:
+            encode: Функция векторизации для режима thread
+            mode: Тип пула: thread или process
+            workers: Число рабочих
+            torch_threads: Число потоков torch на рабочего (0 — по умолчанию)
+            max_queue: Максимальное число батчей в очереди и в работе
+            backend: Бэкенд, по параметрам которого рабочие процессы
+                создают и загружают свой
+
+        Raises:
+            ValueError: Если указан неизвестный тип пула
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError(
+                f"Неизвестный тип пула инференса: {mode}. Доступные типы: "
+                "thread, process"
+            )
+
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self._encode = encode
+        self._admission: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._pool = self._create_pool(backend, torch_threads)
+        INFERENCE_WORKERS.set(workers)
+
+    def _create_pool(
+        self, backend: Optional[EmbeddingBackend], torch_threads: int
+    ) -> Executor:
+        """Создает пул рабочих."""
+        if self.mode == "thread":
+            return ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="embedding-inference",
+                initializer=_set_torch_threads,
+                initargs=(torch_threads,),
+            )
+
+        if backend is None:
+            raise ValueError("Для пула процессов необходим бэкенд")
+
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process_worker,
+            initargs=(backend.name, backend.model_name, backend.device, torch_threads),
+        )
+
+    async def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Векторизует батч текстов в пуле рабочих.
+
+        Если в очереди уже max_queue батчей, вызов ожидает освобождения места.
+
+        Args:
+            texts: Тексты для векторизации
+            batch_size: Размер батча для модели
+
+        Returns:
+            np.ndarray: Матрица эмбеддингов float32
+        """
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_queue)
+
+        self._waiting += 1
+        self._update_queue_metrics()
+        async with self._admission:
+            self._waiting -= 1
+            self._in_flight += 1
+            self._update_queue_metrics()
+            start = time.perf_counter()
+            try:
+                loop = asyncio.get_running_loop()
+                if self.mode == "thread":
+                    return await loop.run_in_executor(
+                        self._pool, self._encode, texts, batch_size
+                    )
+                return await loop.run_in_executor(
+                    self._pool, _encode_in_process, texts, batch_size
+                )
+            finally:
+                INFERENCE_SECONDS.observe(time.perf_counter() - start)
+                self._in_flight -= 1
+                self._update_queue_metrics()
+
+    def _update_queue_metrics(self) -> None:
+        """Обновляет метрики очереди инференса."""
+        INFERENCE_IN_FLIGHT.set(self._in_flight)
+        INFERENCE_QUEUE_DEPTH.set(
+            self._waiting + max(0, self._in_flight - self.workers)
+        )
+
+    def shutdown(self) -> None:
+        """Останавливает пул рабочих."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,387 @@
+import asyncio
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.storage.elasticsearch import es_storage
+from app.storage.redis import redis_storage
+from app.storage.vector_index import vector_indexes
+from app.utils.cache import TTLCache
+from app.utils.embeddings.backends import EmbeddingBackend, create_backend
+from app.utils.embeddings.batcher import EmbeddingBatcher
+from app.utils.embeddings.chunking import TokenChunker
+from app.utils.embeddings.codec import decode_vector, encode_vector
+from app.utils.embeddings.executor import InferenceExecutor
+
+
+class EmbeddingsManager:
+    """Менеджер для работы с эмбеддингами
+
+    Модель загружается лениво: при первом обращении или фоновым прогревом
+    при старте приложения, поэтому импорт модуля не тянет torch.
+    """
+
+    def __init__(self):
+        self._backend: Optional[EmbeddingBackend] = None
+        self._executor: Optional[InferenceExecutor] = None
+        self._load_lock = threading.Lock()
+        self.device = "cpu"
+        self.vector_dim = 384
+        self.cache_ttl = settings.EMBEDDING_CACHE_TTL
+        # Внутрипроцессный уровень кэша перед Redis
+        self.local_cache = TTLCache(
+            "embeddings",
+            maxsize=settings.EMBEDDING_LOCAL_CACHE_SIZE,
+            ttl=settings.EMBEDDING_LOCAL_CACHE_TTL,
+        )
+        self.batcher = EmbeddingBatcher(
+            self._embed_batch,
+            max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_wait=settings.EMBEDDING_BATCH_WAIT_MS / 1000,
+        )
+
+    @property
+    def is_ready(self) -> bool:
+        """Загружена ли модель"""
+        return self._backend is not None
+
+    @property
+    def backend(self) -> EmbeddingBackend:
+        """Бэкенд инференса, модель загружается при первом обращении"""
+        if self._backend is None:
+            self._load_model()
+        return self._backend
+
+    @property
+    def model(self) -> Any:
+        """Модель эмбеддингов выбранного бэкенда"""
+        return self.backend.model
+
+    def _load_model(self) -> None:
+        """Загрузка модели (блокирующая, потокобезопасная)"""
+        with self._load_lock:
+            if self._backend is not None:
+                return
+
+            import torch
+
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            backend = create_backend(
+                settings.EMBEDDING_BACKEND, settings.EMBEDDING_MODEL, device
+            )
+            backend.load()
+            self.device = backend.device
+            self.vector_dim = backend.dimension
+            self._backend = backend
+
+    async def warmup(self) -> None:
+        """Загрузка модели в рабочем потоке без блокировки цикла событий"""
+        if self._backend is None:
+            await asyncio.to_thread(self._load_model)
+
+    @property
+    def executor(self) -> InferenceExecutor:
+        """Пул инференса, создается после загрузки модели"""
+        if self._executor is None:
+            self._executor = InferenceExecutor(
+                self._encode,
+                mode=settings.EMBEDDING_EXECUTOR,
+                workers=settings.EMBEDDING_WORKERS,
+                torch_threads=settings.EMBEDDING_TORCH_THREADS,
+                max_queue=settings.EMBEDDING_MAX_QUEUE,
+                backend=self.backend,
+            )
+        return self._executor
+
+    def _get_cache_key(self, text: str) -> str:
+        """Получение ключа кэша для текста"""
+        return f"embedding:{hashlib.md5(text.encode()).hexdigest()}"
+
+    async def get_embedding(self, text: str) -> List[float]:
+        """Получение эмбеддинга для текста
+
+        Горячие запросы обслуживаются внутрипроцессным кэшем без обращения
+        к сети. Остальные объединяются микробатчером с параллельными
+        запросами и векторизуются одним батчем.
+        """
+        vector = self.local_cache.get(self._get_cache_key(text))
+        if vector is not None:
+            return vector.tolist()
+        return await self.batcher.submit(text)
+
+    async def get_embeddings(
+        self, texts: List[str], batch_size: Optional[int] = None
+    ) -> List[List[float]]:
+        """Получение эмбеддингов для списка текстов
+
+        Векторы ищутся последовательно во внутрипроцессном кэше, в Redis
+        (один MGET), в Elasticsearch (один terms-запрос) и только затем
+        вычисляются одним вызовом model.encode. Новые векторы записываются
+        обратно одним пайплайном в Redis и одним _bulk в Elasticsearch.
+
+        Args:
+                texts: Тексты для векторизации
+                batch_size: Размер батча для модели
+                        (по умолчанию settings.EMBEDDING_BATCH_SIZE)
+        """
+        if not texts:
+            return []
+
+        # Одинаковые тексты обрабатываем один раз
+        keys = [self._get_cache_key(text) for text in texts]
+        vectors = self.local_cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            vectors.update(await self._load_vectors(missing, batch_size))
+
+        return [vectors[key].tolist() for key in keys]
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Обработчик микробатчера: тексты уже не найдены в локальном кэше"""
+        keys = [self._get_cache_key(text) for text in texts]
+        vectors = await self._load_vectors(dict(zip(keys, texts)))
+        return [vectors[key].tolist() for key in keys]
+
+    async def _load_vectors(
+        self, texts: Dict[str, str], batch_size: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """Получение векторов из Redis, Elasticsearch или модели
+
+        Args:
+                texts: Словарь ключ кэша -> текст
+                batch_size: Размер батча для модели
+        """
+        vectors: Dict[str, np.ndarray] = {}
+
+        # Проверяем кэш Redis
+        cached = await redis_storage.mget_raw(list(texts))
+        for key, value in zip(texts, cached):
+            if value:
+                vectors[key] = decode_vector(value)
+
+        # Проверяем кэш Elasticsearch
+        missing = [key for key in texts if key not in vectors]
+        if missing:
+            found = await self._search_cached_vectors(missing)
+            if found:
+                vectors.update(found)
+                # Кэшируем в Redis
+                await self._cache_vectors(found)
+
+        # Генерируем новые эмбеддинги
+        missing = [key for key in texts if key not in vectors]
+        if missing:
+            encoded = await self.encode_async(
+                [texts[key] for key in missing], batch_size
+            )
+            new_vectors = dict(zip(missing, encoded))
+            vectors.update(new_vectors)
+            await self._store_vectors(new_vectors, texts)
+
+        self.local_cache.set_many(vectors)
+        return vectors
+
+    async def encode_async(
+        self, texts: List[str], batch_size: Optional[int] = None
+    ) -> np.ndarray:
+        """Векторизация текстов в пуле инференса без блокировки цикла событий
+
+        Все пути получения эмбеддингов вызывают модель только через этот метод.
+        """
+        await self.warmup()
+        return await self.executor.encode(
+            texts, batch_size or settings.EMBEDDING_BATCH_SIZE
+        )
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Векторизация батча текстов одним вызовом модели"""
+        return self.backend.encode(texts, batch_size)
+
+    async def _search_cached_vectors(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Поиск сохраненных векторов в Elasticsearch одним запросом"""
+        try:
+            result = await es_storage.search(
+                index="mcp_vectors",
+                body={
+                    "query": {"terms": {"vector_id": keys}},
+                    "size": len(keys),
+                    "_source": ["vector_id", "vector"],
+                },
+            )
+        except Exception as e:
+            # Логируем ошибку и продолжаем выполнение
+            print(f"Error searching Elasticsearch: {e}")
+            return {}
+
+        return {
+            hit["_source"]["vector_id"]: np.asarray(
+                hit["_source"]["vector"], dtype=np.float32
+            )
+            for hit in result["hits"]["hits"]
+        }
+
+    async def _cache_vectors(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Сохранение векторов в Redis в бинарном формате"""
+        dtype = settings.EMBEDDING_CACHE_DTYPE
+        await redis_storage.set_many(
+            {key: encode_vector(vector, dtype) for key, vector in vectors.items()},
+            ex=self.cache_ttl,
+        )
+
+    async def _store_vectors(
+        self, vectors: Dict[str, np.ndarray], texts: Dict[str, str]
+    ) -> None:
+        """Сохранение новых векторов в Redis и Elasticsearch"""
+        # Сохраняем в Redis
+        await self._cache_vectors(vectors)
+
+        # Сохраняем в Elasticsearch, ключ кэша используем как _id
+        created_at = datetime.utcnow().isoformat()
+        operations: List[Dict[str, Any]] = []
+        for key, vector in vectors.items():
+            operations.append({"index": {"_index": "mcp_vectors", "_id": key}})
+            operations.append(
+                {
+                    "vector_id": key,
+                    "vector": vector.tolist(),
+                    "source": "text",
+                    "created_at": created_at,
+                    "metadata": {"text_length": len(texts[key]), "language": "auto"},
+                }
+            )
+        try:
+            await es_storage.bulk(operations)
+        except Exception as e:
+            print(f"Error indexing vectors in Elasticsearch: {e}")
+            return
+
+        # Обновляем локальный векторный индекс, если он построен
+        await vector_indexes.add(
+            "mcp_vectors", list(vectors), np.stack(list(vectors.values()))
+        )
+
+    async def search_similar(
+        self,
+        query_vector: List[float],
+        index: str,
+        field: str = "embedding",
+        size: int = 10,
+        min_score: float = 0.7,
+    ) -> List[Dict[str, Any]]:
+        """Поиск похожих документов по вектору
+
+        Elasticsearch выполняет приближенный kNN поиск по индексу HNSW.
+        При VECTOR_SEARCH_BACKEND=local и построенном локальном индексе
+        ближайшие векторы ищутся в индексе IVF без полного сканирования.
+        """
+        vector_index = (
+            await vector_indexes.get(index)
+            if settings.VECTOR_SEARCH_BACKEND == "local"
+            else None
+        )
+        if vector_index is not None:
+            neighbours = await asyncio.to_thread(
+                vector_index.search, query_vector, size
+            )
+            # Порог в той же шкале, что и script_score: косинус + 1.0
+            ids = [doc_id for doc_id, score in neighbours if score + 1.0 >= min_score]
+            sources = await es_storage.mget(index, ids) if ids else {}
+            return [sources[doc_id] for doc_id in ids if doc_id in sources]
+
+        # kNN по графу HNSW; порог min_score задан в шкале script_score
+        # (косинус + 1.0), а параметр similarity принимает сам косинус
+        body = {
+            "knn": {
+                "field": field,
+                "query_vector": query_vector,
+                "k": size,
+                "num_candidates": max(settings.VECTOR_SEARCH_NUM_CANDIDATES, size),
+                "similarity": min_score - 1.0,
+            },
+            "size": size,
+        }
+
+        result = await es_storage.search(index=index, body=body)
+        return [hit["_source"] for hit in result["hits"]["hits"]]
+
+    async def chunk_and_embed_text(
+        self, text: str, chunk_size: int = 256, overlap: int = 32
+    ) -> List[Dict[str, Any]]:
+        """Разбиение текста на чанки и получение эмбеддингов
+
+        Args:
+                text: Текст документа
+                chunk_size: Максимальный размер чанка в токенах модели
+                overlap: Перекрытие соседних чанков в токенах модели
+        """
+
+        async def single() -> AsyncIterator[str]:
+            yield text
+
+        return [
+            chunk
+            async for chunk in self.stream_and_embed(single(), chunk_size, overlap)
+        ]
+
+    async def stream_and_embed(
+        self,
+        stream: AsyncIterator[str],
+        chunk_size: int = 256,
+        overlap: int = 32,
+        batch_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Потоковое разбиение текста на чанки и их векторизация
+
+        Чанки считаются в токенах токенизатора модели и векторизуются
+        батчами по batch_size, поэтому память ограничена одним батчем
+        независимо от размера документа.
+
+        Args:
+                stream: Асинхронный итератор фрагментов текста
+                chunk_size: Максимальный размер чанка в токенах модели
+                        (не больше максимальной длины входа модели)
+                overlap: Перекрытие соседних чанков в токенах модели
+                batch_size: Число чанков в батче
+                        (по умолчанию settings.EMBEDDING_BATCH_SIZE)
+
+        Yields:
+                Словарь с текстом чанка, эмбеддингом и позицией
+        """
+        await self.warmup()
+        chunker = TokenChunker(
+            self.backend.count_tokens,
+            chunk_size=min(chunk_size, self.backend.max_tokens),
+            overlap=overlap,
+        )
+        batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        position = 0
+        batch: List[str] = []
+
+        async for chunk in chunker.chunk(stream):
+            batch.append(chunk)
+            if len(batch) < batch_size:
+                continue
+            embeddings = await self.get_embeddings(batch, batch_size)
+            for content, embedding in zip(batch, embeddings):
+                yield {"content": content, "embedding": embedding, "position": position}
+                position += 1
+            batch = []
+
+        if batch:
+            embeddings = await self.get_embeddings(batch, batch_size)
+            for content, embedding in zip(batch, embeddings):
+                yield {"content": content, "embedding": embedding, "position": position}
+                position += 1
+
+
+# Создаем глобальный экземпляр
+embeddings_manager = EmbeddingsManager()
+
+
+async def get_embedding(text: str) -> List[float]:
+    """Получение эмбеддинга для текста через глобальный менеджер"""
+    return await embeddings_manager.get_embedding(text)
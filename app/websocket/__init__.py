@@ -0,0 +1,8 @@
+"""
+WebSocket API сервера MCP.
+"""
+
+from app.websocket.broadcast import Connection, ConnectionManager
+from app.websocket.session import WebSocketSession
+
+__all__ = ["Connection", "ConnectionManager", "WebSocketSession"]
@@ -0,0 +1,368 @@
+"""
+Рассылка сообщений подключенным клиентам WebSocket.
+
+У каждого соединения свои ограниченные очереди отправки и задача-писатель,
+поэтому медленный клиент не задерживает рассылку остальным. Ответы на
+запросы и рассылки стоят в разных очередях: ответ никогда не отбрасывается,
+а отправитель ждет места в очереди. Если заполнена очередь рассылок,
+применяется политика WS_SLOW_CONSUMER_POLICY: drop_oldest отбрасывает самую
+старую неотправленную рассылку, disconnect закрывает соединение.
+
+Сообщение сериализуется один раз при вызове broadcast и публикуется в
+канал Redis, на который подписан каждый процесс uvicorn, поэтому его
+получают клиенты всех процессов и реплик. Пока подписка не установлена,
+сообщение доставляется только клиентам текущего процесса.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+from prometheus_client import Counter, Gauge
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+WS_CONNECTIONS = Gauge(
+    "ws_connections",
+    "Открытые соединения WebSocket в процессе",
+)
+WS_BROADCAST_MESSAGES = Counter(
+    "ws_broadcast_messages_total",
+    "Сообщения, разосланные клиентам WebSocket процесса",
+)
+WS_SLOW_CONSUMERS = Counter(
+    "ws_slow_consumer_total",
+    "Сообщения, не поставленные в очередь медленного клиента",
+    ["action"],
+)
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+
+# Код закрытия соединения для медленного клиента (Try Again Later)
+_SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """
+    Соединение WebSocket с ограниченной очередью отправки.
+
+    Все сообщения соединения отправляются одной задачей-писателем: ответы
+    на запросы в первую очередь, рассылки — когда ответов в очереди нет.
+
+    Attributes:
+        websocket: Соединение WebSocket
+        policy: Политика для медленного клиента
+        closed: Закрыто ли соединение
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int, policy: str) -> None:
+        """
+        Инициализирует соединение и запускает задачу-писатель.
+
+        Args:
+            websocket: Принятое соединение WebSocket
+            queue_size: Емкость каждой из очередей отправки
+            policy: Политика для медленного клиента
+        """
+        self.websocket = websocket
+        self.policy = policy
+        self.closed = False
+        self._responses: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._broadcasts: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Есть сообщения для отправки
+        self._ready = asyncio.Event()
+        # Соединение закрыто: ожидающие места в очереди получают ошибку
+        self._closed_event = asyncio.Event()
+        self._writer = asyncio.create_task(self._write())
+        self._closing: Optional[asyncio.Task] = None
+
+    async def send(self, text: str) -> None:
+        """
+        Ставит сообщение в очередь, ожидая свободного места.
+
+        Используется для ответов на запросы, которые нельзя отбросить.
+
+        Args:
+            text: Сериализованное сообщение
+
+        Raises:
+            WebSocketDisconnect: Если соединение закрыто, в том числе
+                пока сообщение ждало места в очереди
+        """
+        if self.closed:
+            raise WebSocketDisconnect()
+        if self._responses.full():
+            await self._wait_for_room(text)
+        else:
+            self._responses.put_nowait(text)
+        self._ready.set()
+
+    def offer(self, text: str) -> bool:
+        """
+        Ставит сообщение рассылки в очередь без ожидания.
+
+        Args:
+            text: Сериализованное сообщение
+
+        Returns:
+            bool: Поставлено ли сообщение в очередь
+        """
+        if self.closed:
+            return False
+        try:
+            self._broadcasts.put_nowait(text)
+            self._ready.set()
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "disconnect":
+            WS_SLOW_CONSUMERS.labels("disconnected").inc()
+            self._mark_closed()
+            self._closing = asyncio.create_task(
+                self._shutdown(_SLOW_CONSUMER_CLOSE_CODE)
+            )
+            return False
+
+        WS_SLOW_CONSUMERS.labels("dropped").inc()
+        self._broadcasts.get_nowait()
+        self._broadcasts.put_nowait(text)
+        return True
+
+    async def close(self, code: Optional[int] = None) -> None:
+        """
+        Останавливает задачу-писатель и при необходимости закрывает соединение.
+
+        Args:
+            code: Код закрытия WebSocket (None — соединение уже закрыто
+                клиентом)
+        """
+        if self.closed:
+            return
+        self._mark_closed()
+        await self._shutdown(code)
+
+    async def _shutdown(self, code: Optional[int]) -> None:
+        """Останавливает задачу-писатель и закрывает соединение."""
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        if code is not None:
+            try:
+                await self.websocket.close(code=code)
+            except Exception as e:
+                logger.debug(f"Не удалось закрыть соединение WebSocket: {e}")
+
+    async def _wait_for_room(self, text: str) -> None:
+        """Ждет места в очереди ответов или закрытия соединения."""
+        put = asyncio.ensure_future(self._responses.put(text))
+        closed = asyncio.ensure_future(self._closed_event.wait())
+        try:
+            await asyncio.wait({put, closed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+        if not put.done():
+            put.cancel()
+            raise WebSocketDisconnect()
+
+    def _mark_closed(self) -> None:
+        """Помечает соединение закрытым и будит ожидающих отправителей."""
+        self.closed = True
+        self._closed_event.set()
+
+    def _next_message(self) -> Optional[str]:
+        """Следующее сообщение: сначала ответы, затем рассылки."""
+        for queue in (self._responses, self._broadcasts):
+            if not queue.empty():
+                return queue.get_nowait()
+        return None
+
+    async def _write(self) -> None:
+        """Отправляет сообщения из очередей."""
+        try:
+            while True:
+                text = self._next_message()
+                if text is None:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Отправка в WebSocket прервана: {e}")
+            self._mark_closed()
+
+
+class ConnectionManager:
+    """
+    Реестр соединений WebSocket процесса с рассылкой через Redis.
+
+    Attributes:
+        client: Клиент redis.asyncio для рассылки между процессами
+            (None — рассылка только внутри процесса)
+        channel: Канал Redis для рассылки
+        connections: Открытые соединения процесса
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        channel: str = "ws:broadcast",
+        queue_size: Optional[int] = None,
+        policy: Optional[str] = None,
+    ) -> None:
+        """
+        Инициализирует реестр.
+
+        Args:
+            client: Клиент redis.asyncio с декодированием ответов
+            channel: Канал Redis для рассылки
+            queue_size: Емкость очереди отправки соединения
+                (по умолчанию WS_SEND_QUEUE_SIZE)
+            policy: Политика для медленного клиента
+                (по умолчанию WS_SLOW_CONSUMER_POLICY)
+
+        Raises:
+            ValueError: Если указана неизвестная политика
+        """
+        policy = policy or settings.WS_SLOW_CONSUMER_POLICY
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"Неизвестная политика для медленного клиента: {policy}. "
+                f"Доступные политики: {', '.join(SLOW_CONSUMER_POLICIES)}"
+            )
+
+        self.client = client
+        self.channel = channel
+        self.queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.policy = policy
+        self.connections: Set[Connection] = set()
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False
+
+    async def connect(self, websocket: WebSocket) -> Connection:
+        """
+        Принимает соединение и регистрирует его для рассылки.
+
+        Args:
+            websocket: Соединение WebSocket
+
+        Returns:
+            Connection: Зарегистрированное соединение
+        """
+        await websocket.accept()
+        connection = Connection(websocket, self.queue_size, self.policy)
+        self.connections.add(connection)
+        WS_CONNECTIONS.inc()
+        self._ensure_listener()
+        return connection
+
+    async def disconnect(self, connection: Connection) -> None:
+        """
+        Удаляет соединение из рассылки.
+
+        Args:
+            connection: Соединение
+        """
+        if connection in self.connections:
+            self.connections.discard(connection)
+            WS_CONNECTIONS.dec()
+        await connection.close()
+
+    async def broadcast(self, message: Union[str, Dict[str, Any]]) -> None:
+        """
+        Рассылает сообщение клиентам всех процессов.
+
+        Сервер пока не рассылает собственных событий: метод предназначен
+        для кода приложения, которому нужно уведомить всех клиентов.
+
+        Args:
+            message: Сообщение (словарь сериализуется в JSON один раз)
+        """
+        text = (
+            message
+            if isinstance(message, str)
+            else json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+        )
+        if self.client is not None and self._subscribed:
+            try:
+                await self.client.publish(self.channel, text)
+                return
+            except Exception as e:
+                logger.warning(f"Не удалось опубликовать рассылку: {str(e)}")
+        self.deliver(text)
+
+    def deliver(self, text: str) -> None:
+        """
+        Ставит сообщение в очереди всех соединений процесса.
+
+        Args:
+            text: Сериализованное сообщение
+        """
+        WS_BROADCAST_MESSAGES.inc()
+        for connection in list(self.connections):
+            connection.offer(text)
+
+    async def close(self) -> None:
+        """Останавливает подписку и закрывает соединения процесса."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        for connection in list(self.connections):
+            await self.disconnect(connection)
+
+    def _ensure_listener(self) -> None:
+        """Запускает подписку на рассылку при первом соединении."""
+        if self.client is None:
+            return
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        """Получает сообщения рассылки, переподключаясь при сбоях."""
+        delay = 0.1
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self._subscribed = True
+                        delay = 0.1
+                    elif message["type"] == "message":
+                        self.deliver(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Подписка на рассылку WebSocket прервана: {str(e)}")
+            finally:
+                self._subscribed = False
+                await pubsub.aclose()
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+def _create_manager() -> ConnectionManager:
+    """Создает реестр соединений с рассылкой через Redis, если она включена."""
+    if not settings.WS_BROADCAST_REDIS:
+        return ConnectionManager()
+
+    from app.storage.redis import redis_storage
+
+    return ConnectionManager(redis_storage.redis)
+
+
+# Создаем глобальный экземпляр
+manager = _create_manager()
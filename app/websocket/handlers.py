@@ -0,0 +1,273 @@
+"""
+Обработчики сообщений WebSocket.
+
+Каждый обработчик получает сеанс, id запроса и данные сообщения и
+отправляет ответы через session.send с тем же id. Ошибки, не
+обработанные здесь, сеанс отправляет клиенту сообщением error.
+"""
+
+from typing import Any, Dict
+
+from fastapi import WebSocketDisconnect
+
+from app.core.config import settings
+from app.core.rate_limit import rate_limiter
+from app.services.mcp_service import mcp_service
+from app.services.subscriptions import Subscriber, resource_subscriptions
+from app.tools.search import get_search_tool
+from app.websocket.session import Handler, WebSocketSession
+
+
+async def handle_tool_request(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Выполняет инструмент"""
+    tool_name = data.get("name", "")
+    if settings.RATE_LIMIT_ENABLED:
+        allowed, retry_after = await rate_limiter.acquire_tool(
+            tool_name, session.client
+        )
+        if not allowed:
+            await session.send(
+                "error",
+                {"message": "Too Many Requests", "retry_after": retry_after},
+                request_id,
+            )
+            return
+
+    response = await mcp_service.execute_tool(tool_name, data.get("parameters", {}))
+    await session.send("tool_response", response, request_id)
+
+
+async def handle_tool_batch_request(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Отправляет результаты пакетного вызова сообщениями tool_batch_result"""
+    results = mcp_service.execute_tools(data.get("calls", []), session.client)
+
+    total = failed = 0
+    try:
+        async for result in results:
+            total += 1
+            failed += not result["success"]
+            await session.send("tool_batch_result", result, request_id)
+    finally:
+        # Отменяет незавершенные вызовы при отмене запроса
+        await results.aclose()
+
+    await session.send(
+        "tool_batch_complete", {"total": total, "failed": failed}, request_id
+    )
+
+
+async def handle_search_stream_request(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Отправляет результаты потокового поиска сообщениями search_chunk"""
+    sent = 0
+    chunk = 0
+    try:
+        pages = get_search_tool().stream(
+            data.get("operation", "text"),
+            data.get("query", ""),
+            data.get("index", ""),
+            data.get("params"),
+        )
+        try:
+            async for hits in pages:
+                await session.send(
+                    "search_chunk", {"chunk": chunk, "hits": hits}, request_id
+                )
+                sent += len(hits)
+                chunk += 1
+        finally:
+            await pages.aclose()
+    except WebSocketDisconnect:
+        raise
+    except Exception as e:
+        await session.send(
+            "search_complete",
+            {"status": "error", "message": str(e), "total": sent},
+            request_id,
+        )
+        return
+
+    await session.send(
+        "search_complete", {"status": "success", "total": sent}, request_id
+    )
+
+
+async def handle_register_tool(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Регистрирует инструмент"""
+    from app.models.mcp import Tool
+
+    tool = Tool(
+        name=data.get("name"),
+        description=data.get("description"),
+        input_schema=data.get("input_schema", {}),
+    )
+    await mcp_service.register_tool(tool)
+    await session.send(
+        "registration_response",
+        {"status": "success", "message": f"Tool '{tool.name}' registered"},
+        request_id,
+    )
+
+
+async def handle_resource_request(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Возвращает ресурс"""
+    resource_uri = data.get("uri")
+    resource = await mcp_service.get_resource(resource_uri)
+    if resource:
+        await session.send(
+            "resource_response",
+            {"resource": resource, "status": "success"},
+            request_id,
+        )
+    else:
+        await session.send(
+            "resource_response",
+            {"status": "error", "message": f"Resource '{resource_uri}' not found"},
+            request_id,
+        )
+
+
+async def handle_prompt_request(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Выполняет промпт"""
+    messages = await mcp_service.execute_prompt(
+        data.get("name"),
+        data.get("arguments", {}),
+    )
+    await session.send(
+        "prompt_response", {"messages": messages, "status": "success"}, request_id
+    )
+
+
+async def handle_sampling_request(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Выполняет сэмплирование"""
+    # Преобразование запроса в формат MCP
+    from app.models.mcp import SamplingRequest as MCPSamplingRequest
+
+    try:
+        mcp_request = MCPSamplingRequest(
+            messages=data.get("messages", []),
+            modelPreferences=data.get("model_preferences"),
+            systemPrompt=data.get("system_prompt"),
+            includeContext=data.get("include_context", "none"),
+            temperature=data.get("temperature"),
+            maxTokens=data.get("max_tokens", 1024),
+            stopSequences=data.get("stop_sequences"),
+            metadata=data.get("metadata"),
+        )
+
+        if data.get("stream"):
+            result = await _stream_sampling(session, request_id, mcp_request)
+        else:
+            result = await mcp_service.create_sampling(mcp_request)
+        await session.send(
+            "sampling_response", {"result": result, "status": "success"}, request_id
+        )
+    except NotImplementedError:
+        await session.send(
+            "sampling_response",
+            {
+                "status": "error",
+                "message": "Sampling functionality is not implemented yet",
+            },
+            request_id,
+        )
+    except Exception as e:
+        await session.send(
+            "sampling_response", {"status": "error", "message": str(e)}, request_id
+        )
+
+
+async def _stream_sampling(
+    session: WebSocketSession, request_id: str, mcp_request: Any
+) -> Dict[str, Any]:
+    """Отправляет фрагменты сэмплирования сообщениями sampling_delta"""
+    parts = []
+    stop_reason = None
+    deltas = mcp_service.stream_sampling(mcp_request)
+    try:
+        async for delta in deltas:
+            parts.append(delta.get("text", ""))
+            stop_reason = delta.get("stop_reason", stop_reason)
+            await session.send("sampling_delta", delta, request_id)
+    finally:
+        # Отмена запроса прерывает генерацию в сэмплере
+        await deltas.aclose()
+
+    return {
+        "role": "assistant",
+        "content": {"type": "text", "text": "".join(parts)},
+        "stopReason": stop_reason,
+    }
+
+
+def _get_subscriber(session: WebSocketSession) -> Subscriber:
+    """Возвращает подписчика сеанса, создавая его при первой подписке."""
+    subscriber = session.state.get("subscriber")
+    if subscriber is None:
+
+        async def deliver(notification: Dict[str, Any]) -> None:
+            await session.send("resource_updated", notification)
+
+        subscriber = Subscriber(deliver)
+        session.state["subscriber"] = subscriber
+        session.add_cleanup(lambda: resource_subscriptions.remove(subscriber))
+    return subscriber
+
+
+async def handle_subscribe(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Подписывает сеанс на изменения ресурса"""
+    uri = data.get("uri")
+    if not uri:
+        raise ValueError("Не указан uri ресурса")
+
+    resource_subscriptions.subscribe(
+        _get_subscriber(session), uri, diff=bool(data.get("diff", False))
+    )
+    await session.send(
+        "subscribe_response", {"uri": uri, "status": "success"}, request_id
+    )
+
+
+async def handle_unsubscribe(
+    session: WebSocketSession, request_id: str, data: Dict[str, Any]
+) -> None:
+    """Отменяет подписку сеанса на изменения ресурса"""
+    uri = data.get("uri")
+    subscriber = session.state.get("subscriber")
+    found = subscriber is not None and resource_subscriptions.unsubscribe(
+        subscriber, uri
+    )
+    await session.send(
+        "unsubscribe_response",
+        {"uri": uri, "status": "success" if found else "not_subscribed"},
+        request_id,
+    )
+
+
+# Обработчики по типам сообщений
+HANDLERS: Dict[str, Handler] = {
+    "tool_request": handle_tool_request,
+    "tool_batch_request": handle_tool_batch_request,
+    "search_stream_request": handle_search_stream_request,
+    "register_tool": handle_register_tool,
+    "resource_request": handle_resource_request,
+    "prompt_request": handle_prompt_request,
+    "sampling_request": handle_sampling_request,
+    "subscribe": handle_subscribe,
+    "unsubscribe": handle_unsubscribe,
+}
@@ -0,0 +1,225 @@
+"""
+Мультиплексированный сеанс WebSocket.
+
+Каждый запрос клиента имеет вид {"type": ..., "id": ..., "data": ...} и
+выполняется отдельной задачей, поэтому медленный запрос (например,
+сэмплирование) не задерживает быстрые вызовы инструментов в том же
+соединении. Ответы помечаются id запроса. Запрос без id получает id,
+сгенерированный сервером.
+
+Число одновременно выполняемых запросов соединения ограничено семафором,
+а общее число выполняемых и ожидающих — лимитом, сверх которого запрос
+сразу отклоняется. Сообщение {"type": "cancel", "id": ...} отменяет
+запрос, клиент получает сообщение cancelled с тем же id.
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.core.config import settings
+from app.core.errors import MCPError
+from app.core.rate_limit import client_address
+from app.websocket.broadcast import Connection
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[["WebSocketSession", str, Dict[str, Any]], Awaitable[None]]
+
+
+class WebSocketSession:
+    """
+    Сеанс WebSocket с параллельной обработкой запросов.
+
+    Attributes:
+        websocket: Соединение WebSocket
+        handlers: Обработчики по типам сообщений
+        client: Адрес клиента
+        max_pending: Максимальное число выполняемых и ожидающих запросов
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        handlers: Dict[str, Handler],
+        max_concurrency: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        connection: Optional[Connection] = None,
+    ) -> None:
+        """
+        Инициализирует сеанс.
+
+        Args:
+            websocket: Принятое соединение WebSocket
+            handlers: Обработчики по типам сообщений
+            max_concurrency: Число одновременно выполняемых запросов
+                (по умолчанию WS_MAX_CONCURRENT_REQUESTS)
+            max_pending: Число выполняемых и ожидающих запросов
+                (по умолчанию WS_MAX_PENDING_REQUESTS)
+            connection: Соединение реестра рассылки, через очередь которого
+                отправляются ответы (None — отправка напрямую)
+        """
+        self.websocket = websocket
+        self.handlers = handlers
+        self.connection = connection
+        self.client = client_address(websocket.scope)
+        self.max_pending = max_pending or settings.WS_MAX_PENDING_REQUESTS
+        self._semaphore = asyncio.Semaphore(
+            max_concurrency or settings.WS_MAX_CONCURRENT_REQUESTS
+        )
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+        self._cleanups: List[Callable[[], Awaitable[None]]] = []
+        # Состояние обработчиков, живущее до закрытия сеанса
+        self.state: Dict[str, Any] = {}
+
+    async def send(
+        self, message_type: str, data: Dict[str, Any], request_id: Optional[str] = None
+    ) -> None:
+        """
+        Отправляет сообщение клиенту.
+
+        Args:
+            message_type: Тип сообщения
+            data: Данные сообщения
+            request_id: Id запроса, к которому относится сообщение
+        """
+        message: Dict[str, Any] = {"type": message_type, "data": data}
+        if request_id is not None:
+            message["id"] = request_id
+        if self.connection is not None:
+            # Ответы и рассылки отправляет задача-писатель соединения
+            await self.connection.send(
+                json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+            )
+            return
+        # Кадры разных запросов не должны перемежаться
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def run(self) -> None:
+        """Читает сообщения до отключения клиента и отменяет его запросы."""
+        try:
+            while True:
+                await self.dispatch(await self.websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self.close()
+
+    async def dispatch(self, text: str) -> None:
+        """
+        Запускает обработку сообщения, не дожидаясь ее завершения.
+
+        Args:
+            text: Текст сообщения
+        """
+        try:
+            message = json.loads(text)
+        except json.JSONDecodeError:
+            await self.send("error", {"message": "Invalid JSON"})
+            return
+        if not isinstance(message, dict):
+            await self.send("error", {"message": "Invalid message"})
+            return
+
+        message_type = message.get("type")
+        request_id = message.get("id")
+        if message_type == "cancel":
+            self.cancel(request_id)
+            return
+
+        handler = self.handlers.get(message_type)
+        if handler is None:
+            await self.send("error", {"message": "Unknown message type"}, request_id)
+            return
+
+        request_id = str(request_id) if request_id is not None else uuid.uuid4().hex
+        if request_id in self._tasks:
+            await self.send("error", {"message": "Duplicate request id"}, request_id)
+            return
+        if len(self._tasks) >= self.max_pending:
+            await self.send(
+                "error", {"message": "Too many pending requests"}, request_id
+            )
+            return
+
+        task = asyncio.create_task(
+            self._handle(handler, request_id, message.get("data") or {})
+        )
+        self._tasks[request_id] = task
+        task.add_done_callback(lambda done: self._forget(request_id, done))
+
+    def cancel(self, request_id: Any) -> bool:
+        """
+        Отменяет выполняемый запрос.
+
+        Args:
+            request_id: Id запроса
+
+        Returns:
+            bool: Был ли найден запрос
+        """
+        task = self._tasks.get(str(request_id))
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def add_cleanup(self, callback: Callable[[], Awaitable[None]]) -> None:
+        """
+        Регистрирует функцию, вызываемую при закрытии сеанса.
+
+        Args:
+            callback: Асинхронная функция без аргументов
+        """
+        self._cleanups.append(callback)
+
+    async def close(self) -> None:
+        """Отменяет все запросы сеанса и дожидается их завершения."""
+        self._closed = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for callback in self._cleanups:
+            try:
+                await callback()
+            except Exception as e:
+                logger.warning(f"Ошибка при закрытии сеанса WebSocket: {e}")
+        self._cleanups.clear()
+
+    async def _handle(
+        self, handler: Handler, request_id: str, data: Dict[str, Any]
+    ) -> None:
+        """Выполняет обработчик и сообщает клиенту об ошибке или отмене."""
+        try:
+            try:
+                async with self._semaphore:
+                    await handler(self, request_id, data)
+            except asyncio.CancelledError:
+                if not self._closed:
+                    await self.send("cancelled", {}, request_id)
+            except MCPError as e:
+                await self.send(
+                    "error",
+                    {"message": e.message, "code": e.code, "details": e.details},
+                    request_id,
+                )
+            except WebSocketDisconnect:
+                pass
+            except Exception as e:
+                await self.send("error", {"message": str(e)}, request_id)
+        except Exception as e:
+            # Соединение закрыто, сообщить клиенту уже нельзя
+            logger.debug(f"Не удалось отправить ответ на запрос {request_id}: {e}")
+
+    def _forget(self, request_id: str, task: asyncio.Task) -> None:
+        """Удаляет завершенную задачу, если id не занят новым запросом."""
+        if self._tasks.get(request_id) is task:
+            del self._tasks[request_id]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Замер времени импорта приложения и потребления памяти.
+
+Каждый прогон выполняется в отдельном процессе интерпретатора, чтобы
+кэш модулей не влиял на результат. Выводится медиана по прогонам.
+
+Пример:
+    python scripts/bench_import.py --runs 5 --max-seconds 3
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Код, выполняемый в дочернем процессе
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_mb": rss_kb / 1024,
+    "torch_loaded": "torch" in sys.modules,
+}}))
+"""
+
+
+def measure(module: str) -> Dict[str, float]:
+    """
+    Импортирует модуль в отдельном процессе и возвращает замеры.
+
+    Args:
+        module: Имя импортируемого модуля
+
+    Returns:
+        Dict[str, float]: Время импорта, пиковый RSS и признак загрузки torch
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Импортируемые модули могут печатать в stdout, замер — последняя строка
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="app.main", help="Импортируемый модуль")
+    parser.add_argument("--runs", type=int, default=5, help="Число прогонов")
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Завершиться с ошибкой, если медиана времени импорта больше",
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        default=None,
+        help="Завершиться с ошибкой, если медиана RSS больше",
+    )
+    args = parser.parse_args(argv)
+
+    samples = [measure(args.module) for _ in range(args.runs)]
+    seconds = statistics.median(sample["seconds"] for sample in samples)
+    rss_mb = statistics.median(sample["rss_mb"] for sample in samples)
+    torch_loaded = any(sample["torch_loaded"] for sample in samples)
+
+    print(f"import {args.module}: {seconds:.3f} с, RSS {rss_mb:.1f} МБ")
+    if torch_loaded:
+        print("Внимание: torch загружается при импорте")
+
+    if args.max_seconds is not None and seconds > args.max_seconds:
+        print(f"Ошибка: время импорта превышает {args.max_seconds} с")
+        return 1
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        print(f"Ошибка: RSS превышает {args.max_rss_mb} МБ")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Сравнение kNN поиска Elasticsearch с полным перебором script_score.
+
+В качестве запросов берутся векторы случайных документов индекса.
+Для каждого запроса замеряется задержка обоих режимов, полнота kNN
+считается относительно результата точного перебора.
+
+Пример:
+    python scripts/bench_semantic_search.py --index mcp_resources --field embedding
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.tools.search.strategies import SemanticSearchStrategy  # noqa: E402
+
+
+async def sample_vectors(
+    client: httpx.AsyncClient, url: str, field: str, count: int
+) -> List[List[float]]:
+    """Векторы случайных документов индекса."""
+    response = await client.post(
+        f"{url}/_search",
+        json={
+            "size": count,
+            "_source": [field],
+            "query": {
+                "function_score": {
+                    "query": {"exists": {"field": field}},
+                    "random_score": {},
+                }
+            },
+        },
+    )
+    response.raise_for_status()
+    return [hit["_source"][field] for hit in response.json()["hits"]["hits"]]
+
+
+async def timed_search(
+    client: httpx.AsyncClient, url: str, body: Dict[str, Any]
+) -> Tuple[float, List[str]]:
+    """Задержка запроса в миллисекундах и найденные ID."""
+    start = time.perf_counter()
+    response = await client.post(f"{url}/_search", json={**body, "_source": False})
+    elapsed = (time.perf_counter() - start) * 1000
+    response.raise_for_status()
+    return elapsed, [hit["_id"] for hit in response.json()["hits"]["hits"]]
+
+
+async def run(args: argparse.Namespace) -> None:
+    url = f"{args.es_url}/{args.index}"
+    params = {
+        "vector_field": args.field,
+        "size": args.k,
+        "num_candidates": args.num_candidates,
+    }
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        queries = await sample_vectors(client, url, args.field, args.queries)
+
+        knn_ms, exact_ms, recalls = [], [], []
+        for vector in queries:
+            exact_time, exact_ids = await timed_search(
+                client, url, SemanticSearchStrategy.build_exact_query(vector, params)
+            )
+            knn_time, knn_ids = await timed_search(
+                client, url, SemanticSearchStrategy.build_knn_query(vector, params)
+            )
+            exact_ms.append(exact_time)
+            knn_ms.append(knn_time)
+            if exact_ids:
+                recalls.append(len(set(knn_ids) & set(exact_ids)) / len(exact_ids))
+
+    print(f"Запросов: {len(queries)}, k={args.k}, num_candidates={args.num_candidates}")
+    print(f"script_score: медиана {statistics.median(exact_ms):.1f} мс")
+    print(f"knn:          медиана {statistics.median(knn_ms):.1f} мс")
+    print(f"recall@{args.k}: {statistics.mean(recalls) if recalls else 0.0:.3f}")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--es-url", default="http://localhost:9200")
+    parser.add_argument("--index", default="mcp_resources", help="Индекс")
+    parser.add_argument("--field", default="embedding", help="Поле с вектором")
+    parser.add_argument("--queries", type=int, default=50, help="Число запросов")
+    parser.add_argument("--k", type=int, default=10, help="Число соседей")
+    parser.add_argument("--num-candidates", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
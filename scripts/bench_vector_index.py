@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Сравнение локального индекса IVF с точным сканированием.
+
+На синтетическом кластеризованном корпусе замеряется медианная задержка
+запроса приближенного и точного поиска и полнота recall@k.
+
+Пример:
+    python scripts/bench_vector_index.py --sizes 10000 100000 --n-probe 8
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.storage.vector_index import IVFIndex, recall_at_k  # noqa: E402
+
+
+def corpus(size: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Синтетический корпус: точки вокруг случайных центров."""
+    centers = rng.normal(size=(max(1, size // 200), dim))
+    points = centers[rng.integers(0, len(centers), size)]
+    return (points + 0.5 * rng.normal(size=(size, dim))).astype(np.float32)
+
+
+def median_ms(search: Callable[[np.ndarray], object], queries: np.ndarray) -> float:
+    """Медианная задержка запроса в миллисекундах."""
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384, help="Размерность")
+    parser.add_argument("--queries", type=int, default=100, help="Число запросов")
+    parser.add_argument("--k", type=int, default=10, help="Число соседей")
+    parser.add_argument("--n-probe", type=int, default=8, help="Списков на запрос")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print("размер  построение, с  ivf, мс  точный, мс  recall@k")
+    for size in args.sizes:
+        vectors = corpus(size, args.dim, rng)
+        ids = [str(i) for i in range(size)]
+        queries = vectors[rng.choice(size, args.queries)] + 0.1 * rng.normal(
+            size=(args.queries, args.dim)
+        )
+
+        start = time.perf_counter()
+        index = IVFIndex.build(ids, vectors, n_probe=args.n_probe)
+        build_seconds = time.perf_counter() - start
+
+        ivf_ms = median_ms(
+            lambda query, index=index: index.search(query, args.k), queries
+        )
+        exact_ms = median_ms(
+            lambda query, index=index: index.exact_search(query, args.k), queries
+        )
+        recall = recall_at_k(index, queries, args.k)
+        print(
+            f"{size:>6}  {build_seconds:>13.2f}  {ivf_ms:>7.2f}  "
+            f"{exact_ms:>10.2f}  {recall:>8.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""
+Построение локального векторного индекса по документам Elasticsearch.
+
+Индекс сохраняется в каталог settings.VECTOR_INDEX_DIR и используется
+семантическим поиском при VECTOR_SEARCH_BACKEND=local.
+Каталогом индексов владеет один процесс, поэтому индекс строится, пока
+сервер, открывший локальные индексы, остановлен.
+
+Пример:
+    python scripts/build_vector_index.py mcp_resources
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.storage.elasticsearch import es_storage  # noqa: E402
+from app.storage.vector_index import vector_indexes  # noqa: E402
+
+
+async def build(index: str, field: str, n_lists: int) -> None:
+    try:
+        vector_index = await vector_indexes.build(
+            index, es_storage, field=field, n_lists=n_lists or None
+        )
+        print(f"Индекс {index}: {len(vector_index)} векторов")
+    finally:
+        await es_storage.close()
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("index", help="Индекс Elasticsearch")
+    parser.add_argument(
+        "--field",
+        default=settings.VECTOR_SEARCH_FIELD,
+        help="Поле с вектором (по умолчанию VECTOR_SEARCH_FIELD)",
+    )
+    parser.add_argument(
+        "--n-lists", type=int, default=0, help="Число списков IVF (0 — sqrt(N))"
+    )
+    args = parser.parse_args(argv)
+
+    asyncio.run(build(args.index, args.field, args.n_lists))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
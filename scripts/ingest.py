@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Массовая загрузка ресурсов или промптов в Elasticsearch.
+
+Документы читаются из файла JSON Lines (по одному JSON объекту в строке),
+разбиваются на чанки, векторизуются и индексируются через _bulk.
+
+Пример:
+    python scripts/ingest.py resources data/resources.jsonl --bulk-size 500
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.ingestion import IngestionPipeline  # noqa: E402
+from app.storage.elasticsearch import es_storage  # noqa: E402
+
+
+async def read_documents(path: Path) -> AsyncIterator[Dict[str, Any]]:
+    """Читает документы из файла JSON Lines построчно"""
+    with path.open(encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Строка {number} пропущена: {e}", file=sys.stderr)
+            # Отдаем управление стадиям конвейера между строками
+            await asyncio.sleep(0)
+
+
+async def ingest(args: argparse.Namespace) -> None:
+    pipeline = IngestionPipeline(
+        kind=args.kind,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        bulk_size=args.bulk_size,
+        queue_size=args.queue_size,
+    )
+    start = time.perf_counter()
+    try:
+        stats = await pipeline.run(read_documents(args.path))
+    finally:
+        await es_storage.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Загружено {stats['indexed']} документов ({stats['chunks']} чанков) "
+        f"за {elapsed:.1f} с, {stats['indexed'] / max(elapsed, 1e-9):.0f} док/с; "
+        f"ошибок: {stats['failed']}"
+    )
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("kind", choices=["resources", "prompts"])
+    parser.add_argument("path", type=Path, help="Файл JSON Lines с документами")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Токенов в чанке")
+    parser.add_argument("--overlap", type=int, default=32, help="Перекрытие чанков")
+    parser.add_argument(
+        "--bulk-size", type=int, default=0, help="Документов в запросе _bulk"
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=0, help="Емкость очереди между стадиями"
+    )
+    args = parser.parse_args(argv)
+
+    asyncio.run(ingest(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))